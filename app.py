@@ -1,11 +1,14 @@
 import os # <--- THIS IS CRUCIAL: Make sure this line is at the very top
-from flask import Flask, render_template, request, jsonify
+import json
+import time
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context, url_for
 from flask_cors import CORS
 
 # This is the corrected import path for scrape.py
 # It assumes your file structure is: scraper/netlify/functions/scrape.py
 # Make sure you have empty __init__.py files in both netlify/ and netlify/functions/
-from netlify.functions.scrape import scrape_reddit_posts_and_comments
+from netlify.functions.scrape_jobs import ScrapeJobManager, DEFAULT_JOB_WORKERS, DEFAULT_CACHE_TTL, DONE
+from netlify.functions.metrics import REGISTRY
 
 # Initialize Flask app
 # Use os.path.join and os.path.dirname(__file__) to create absolute paths
@@ -16,76 +19,163 @@ app = Flask(__name__,
 
 CORS(app) # Enable CORS for all routes (important for frontend to talk to backend locally)
 
+# --- Metrics ---
+# Request counts and latencies per route, next to the scraper, classifier and cache
+# metrics the library modules record. All of them are served at /metrics.
+HTTP_SECONDS = REGISTRY.histogram('http_request_seconds', "Flask request latency (streams: until the response starts).",
+                                  ['endpoint', 'method', 'status'])
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unknown',
+                             method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Every metric in the Prometheus text format, for scraping by Prometheus."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
     """Serves the main HTML page."""
     return render_template('index.html')
 
+# Scrapes run as background jobs so no request waits for Reddit.
+# SCRAPE_JOB_WORKERS scrapes run at once; further jobs queue until a worker is free.
+# Identical requests share one scrape, and a finished scrape is reused for SCRAPE_CACHE_TTL
+# seconds. Finished results are kept within roughly SCRAPE_CACHE_MAX_MB of memory.
+scrape_jobs = ScrapeJobManager(
+    max_workers=int(os.environ.get('SCRAPE_JOB_WORKERS', DEFAULT_JOB_WORKERS)),
+    cache_ttl=float(os.environ.get('SCRAPE_CACHE_TTL', DEFAULT_CACHE_TTL)),
+    cache_max_bytes=int(float(os.environ.get('SCRAPE_CACHE_MAX_MB', '64')) * 1024 * 1024)
+)
+
+def parse_scrape_request(data):
+    """
+    Validates a /scrape request body.
+
+    Returns:
+        tuple: (scrape params dict, None) or (None, error message).
+    """
+    subreddits_input = data.get('subreddits', '')
+    keywords_input = data.get('keywords', '')
+    test_run = data.get('test_run', False) # Boolean flag from the frontend checkbox
+
+    if not subreddits_input or not keywords_input:
+        return None, "Missing 'subreddits' or 'keywords' in request"
+
+    subreddits = [s.strip() for s in subreddits_input.split(',') if s.strip()]
+    keywords = [k.strip() for k in keywords_input.split(',') if k.strip()]
+
+    if not subreddits or not keywords:
+        return None, "Please provide valid subreddits and keywords"
+
+    # Adjust limits based on the 'test_run' flag
+    if test_run:
+        limit_per_search_term = 1  # Get only 1 submission per search term
+        total_post_limit = 5      # Max 5 posts overall
+    else:
+        limit_per_search_term = 10 # Default to 10 submissions per search term
+        total_post_limit = 50      # Default to 50 total posts (adjust as needed for longer runs)
+
+    return {
+        'subreddits': subreddits,
+        'search_terms': keywords,
+        'limit_per_search_term': limit_per_search_term,
+        'total_post_limit': total_post_limit,
+    }, None
+
+def job_links(job):
+    return {
+        'status_url': url_for('scrape_status', job_id=job.id),
+        'stream_url': url_for('scrape_stream', job_id=job.id),
+    }
+
 @app.route('/scrape', methods=['POST'])
 def perform_scrape():
-    """Handles the scraping request from the frontend."""
-    try:
-        data = request.json
-        subreddits_input = data.get('subreddits', '')
-        keywords_input = data.get('keywords', '')
-        test_run = data.get('test_run', False) # Boolean flag from the frontend checkbox
-
-        if not subreddits_input or not keywords_input:
-            return jsonify({"status": "error", "message": "Missing 'subreddits' or 'keywords' in request"}), 400
+    """
+    Starts a scrape job and returns its ID right away (202). Poll or stream the job for results.
 
-        subreddits = [s.strip() for s in subreddits_input.split(',') if s.strip()]
-        keywords = [k.strip() for k in keywords_input.split(',') if k.strip()]
-
-        if not subreddits or not keywords:
-            return jsonify({"status": "error", "message": "Please provide valid subreddits and keywords"}), 400
-
-        # Adjust limits based on the 'test_run' flag
-        if test_run:
-            print("Performing a quick local demo run (fewer results)...")
-            limit_per_search_term = 1  # Get only 1 submission per search term
-            total_post_limit = 5      # Max 5 posts overall
+    If the same request (same subreddits and keywords in any order or case, same limits)
+    finished within the cache TTL, its results are returned immediately (200). If it is
+    still running, the caller is attached to that job instead of starting another scrape.
+    """
+    try:
+        params, error = parse_scrape_request(request.json or {})
+        if error:
+            return jsonify({"status": "error", "message": error}), 400
+
+        job, reused = scrape_jobs.submit(**params)
+        if reused and job.status == DONE:
+            print(f"Serving scrape job {job.id} from cache.")
+            return jsonify({"status": "success", "cached": True, "job_id": job.id, **job_links(job),
+                            "posts": job.posts, "comments": job.comments})
+        if reused:
+            print(f"Attached request to in-flight scrape job {job.id}.")
         else:
-            print("Performing a full local scrape...")
-            limit_per_search_term = 10 # Default to 10 submissions per search term
-            total_post_limit = 50      # Default to 50 total posts (adjust as needed for longer runs)
-
-        # Call the scraping function from scrape.py
-        scraped_results = scrape_reddit_posts_and_comments(
-            subreddits, keywords,
-            limit_per_search_term=limit_per_search_term,
-            total_post_limit=total_post_limit
-        )
-
-        # Handle potential errors returned by the scraping function
-        if isinstance(scraped_results, dict) and "error" in scraped_results:
-            return jsonify({"status": "error", "message": scraped_results["error"]}), 500
-
-        # Separate posts and comments for easier display on frontend
-        posts_for_frontend = []
-        comments_for_frontend = []
-
-        for post in scraped_results:
-            post_copy = post.copy()
-            post_comments = post_copy.pop('comments') # Extract comments from post_copy
-            posts_for_frontend.append(post_copy)
-
-            for comment in post_comments:
-                comment_copy = comment.copy()
-                comment_copy['post_id'] = post['post_id']
-                comment_copy['post_title'] = post['post_title']
-                comment_copy['subreddit'] = post['subreddit']
-                comments_for_frontend.append(comment_copy)
-
-        return jsonify({
-            "status": "success",
-            "posts": posts_for_frontend,
-            "comments": comments_for_frontend
-        })
+            print(f"Queued scrape job {job.id} ({len(params['subreddits'])} subreddits, {len(params['search_terms'])} keywords).")
+        return jsonify({"status": "accepted", "cached": False, "job_id": job.id, **job_links(job)}), 202
 
     except Exception as e:
         print(f"Error in Flask /scrape route: {e}")
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
 
+@app.route('/scrape/<job_id>', methods=['GET'])
+def scrape_status(job_id):
+    """
+    Job status plus the posts and comments scraped so far.
+    Pass ?since_post=N&since_comment=M to get only the items after those already seen.
+    """
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Unknown scrape job '{job_id}'"}), 404
+
+    posts, comments = job.results_since(request.args.get('since_post', 0, type=int),
+                                        request.args.get('since_comment', 0, type=int))
+    return jsonify({
+        **job.summary(),
+        **job_links(job),
+        "posts": posts,
+        "comments": comments
+    })
+
+@app.route('/scrape/<job_id>/stream', methods=['GET'])
+def scrape_stream(job_id):
+    """
+    Streams a job's posts and comments as they are scraped, from the start of the job.
+
+    NDJSON by default: one {"type": "post" | "comment" | "status", "data": ...} object per line,
+    ending with the final status. Send `Accept: text/event-stream` or ?format=sse for
+    server-sent events instead (event name = type).
+    """
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Unknown scrape job '{job_id}'"}), 404
+
+    use_sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+
+    def generate():
+        for event_type, payload in job.iter_events():
+            if use_sse:
+                if event_type == 'heartbeat':
+                    yield ": heartbeat\n\n" # SSE comment line, ignored by clients
+                else:
+                    yield f"event: {event_type}\ndata: {json.dumps(payload)}\n\n"
+            elif event_type == 'heartbeat':
+                yield "\n" # Blank line keeps proxies from closing the connection
+            else:
+                yield json.dumps({"type": event_type, "data": payload}) + "\n"
+
+    mimetype = 'text/event-stream' if use_sse else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={'Cache-Control': 'no-cache'})
+
 if __name__ == '__main__':
     # Reminder: Set your Reddit API credentials as environment variables
     # in your terminal BEFORE running this script:
@@ -95,4 +185,4 @@ if __name__ == '__main__':
     # export REDDIT_PASSWORD='your_password' (or app password if 2FA)
     # export REDDIT_USER_AGENT='MyLocalRedditApp/1.0 by YourRedditUsername'
 
-    app.run(debug=True, port=8080) # Run Flask in debug mode on port 8080
\ No newline at end of file
+    app.run(debug=True, port=8080, threaded=True) # Run Flask in debug mode on port 8080; threaded so streams don't block other requests
\ No newline at end of file
@@ -0,0 +1,154 @@
+# benchmarks/corpus.py
+# Seeded synthetic Reddit corpus shaped like scrapey.py's output (post rows plus flattened
+# comment rows), for timing the pipeline stages without touching Reddit.
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from netlify.functions.classifier import CANDIDATE_LABELS
+from netlify.functions.keywords import COGNITIVE_KEYWORDS, FEELING_EXPERIENCE_KEYWORDS, PEPTIDE_KEYWORDS
+
+SUBREDDITS = ['Nootropics', 'supplements', 'Biohackers', 'Peptides', 'longevity', 'BrainHealth']
+SEARCH_TERMS = ['peptides cognitive', 'nootropics peptides', 'memory peptides', 'focus peptides', 'dihexa', 'selank']
+
+# Probability that a text mentions at least one keyword from each list. Rough figures
+# from the scraped data: most scraped posts mention a peptide, fewer mention cognition,
+# and first-person "feeling" language is mostly in comments.
+POST_KEYWORD_DENSITY = {'peptide': 0.7, 'cognitive': 0.45, 'feeling': 0.3}
+COMMENT_KEYWORD_DENSITY = {'peptide': 0.3, 'cognitive': 0.25, 'feeling': 0.45}
+MARKDOWN_DENSITY = 0.2 # Share of texts with links, emphasis, quotes or HTML entities
+
+KEYWORD_LISTS = {
+    'peptide': PEPTIDE_KEYWORDS,
+    'cognitive': COGNITIVE_KEYWORDS,
+    'feeling': FEELING_EXPERIENCE_KEYWORDS,
+}
+
+FILLER_WORDS = (
+    "the a and to of it i was is that for on with this my have but just been about so "
+    "week day dose stack started taking after before morning night months anyone else "
+    "really pretty much more less still also think know get got some any would could "
+    "cycle results post question reddit thread research study source vendor price"
+).split()
+
+# Words that make each label learnable by the benchmark's tiny classifier
+LABEL_WORDS = {
+    CANDIDATE_LABELS[0]: ['brain fog', 'foggy', 'slow thinking', 'forgetful', 'cant focus'],
+    CANDIDATE_LABELS[1]: ['tired', 'exhausted', 'muscles', 'sore', 'sleepy', 'lethargic'],
+    CANDIDATE_LABELS[2]: ['drained', 'irritable', 'depressed', 'anxious', 'burnt out'],
+    CANDIDATE_LABELS[3]: ['dosage', 'vendor', 'reconstitute', 'protocol', 'half-life'],
+    CANDIDATE_LABELS[4]: ['work stress', 'newborn', 'night shift', 'insomnia', 'long covid'],
+    CANDIDATE_LABELS[5]: ['weather', 'football', 'recipe', 'game', 'movie'],
+}
+
+MARKDOWN_SNIPPETS = [
+    "[source](https://example.com/study)", "**this**", "&amp;", "&gt; quoted reply\n",
+    "~~not~~", "*really*", ">!spoiler!<", "&#39;", "\n\n# Update\n", "- point one\n",
+]
+
+
+def _sentence(rng, length, density, label):
+    words = [rng.choice(FILLER_WORDS) for _ in range(length)]
+    for group, probability in density.items():
+        if rng.random() < probability:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(KEYWORD_LISTS[group]))
+    for _ in range(rng.randint(1, 3)):
+        words.insert(rng.randrange(len(words) + 1), rng.choice(LABEL_WORDS[label]))
+    if rng.random() < MARKDOWN_DENSITY:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(MARKDOWN_SNIPPETS))
+    return ' '.join(words)
+
+
+def generate_corpus(n_comments, comments_per_post=10, seed=0):
+    """
+    Builds a reproducible corpus of `n_comments` comments spread over posts.
+
+    Args:
+        n_comments (int): Number of comment rows.
+        comments_per_post (int): Average comments per post.
+        seed (int): Random seed; the same seed always gives the same corpus.
+
+    Returns:
+        tuple: (posts, comments, labels). `posts` and `comments` are lists of row dicts
+               with the columns scrapey.py writes; `labels` holds the label each comment
+               was generated from, for training/checking the benchmark classifier.
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    n_posts = max(1, n_comments // comments_per_post)
+    posts = []
+    for i in range(n_posts):
+        label = rng.choice(CANDIDATE_LABELS)
+        posts.append({
+            'platform': 'Reddit',
+            'subreddit': rng.choice(SUBREDDITS),
+            'post_id': f"p{i:07d}",
+            'post_title': _sentence(rng, rng.randint(4, 12), POST_KEYWORD_DENSITY, label),
+            'post_text': _sentence(rng, rng.randint(20, 200), POST_KEYWORD_DENSITY, label),
+            'score': rng.randint(0, 500),
+            'num_comments': comments_per_post,
+            'url': f"https://www.reddit.com/r/x/comments/p{i:07d}/",
+            'created_utc': start + timedelta(minutes=rng.randint(0, 525600)),
+            'search_terms_used': rng.sample(SEARCH_TERMS, rng.randint(1, 2)),
+        })
+
+    comments = []
+    labels = []
+    for i in range(n_comments):
+        post = posts[rng.randrange(n_posts)]
+        label = rng.choice(CANDIDATE_LABELS)
+        comments.append({
+            'platform': 'Reddit',
+            'subreddit': post['subreddit'],
+            'post_id': post['post_id'],
+            'post_title': post['post_title'],
+            'comment_id': f"c{i:08d}",
+            'comment_text': _sentence(rng, rng.randint(5, 120), COMMENT_KEYWORD_DENSITY, label),
+            'comment_score': rng.randint(-5, 200),
+            'comment_created_utc': post['created_utc'] + timedelta(minutes=rng.randint(1, 10000)),
+            'search_terms_used': post['search_terms_used'],
+        })
+        labels.append(label)
+    return posts, comments, labels
+
+
+def write_cassette(posts, comments, path, limit_per_search=100):
+    """
+    Writes the corpus as a reddit_replay cassette, so the scraper can be timed against it:
+    one search listing per (subreddit, search term) and one comment list per post.
+
+    Returns:
+        str: `path`.
+    """
+    import json
+    from netlify.functions.reddit_replay import search_key
+
+    comments_by_post = {}
+    for comment in comments:
+        comments_by_post.setdefault(comment['post_id'], []).append({
+            'id': comment['comment_id'],
+            'body': comment['comment_text'],
+            'score': comment['comment_score'],
+            'created_utc': comment['comment_created_utc'].timestamp(),
+        })
+    with open(path, 'w') as f:
+        for subreddit in SUBREDDITS:
+            for term in SEARCH_TERMS:
+                matches = [post for post in posts
+                           if post['subreddit'] == subreddit and term in post['search_terms_used']]
+                submissions = [{
+                    'id': post['post_id'], 'title': post['post_title'], 'selftext': post['post_text'],
+                    'score': post['score'], 'num_comments': post['num_comments'], 'url': post['url'],
+                    'created_utc': post['created_utc'].timestamp(), 'stickied': False,
+                } for post in matches[:limit_per_search]]
+                f.write(json.dumps({'kind': 'search', 'key': search_key(subreddit, term, limit_per_search, None),
+                                    'subreddit': subreddit, 'submissions': submissions}) + '\n')
+        for post in posts:
+            f.write(json.dumps({'kind': 'comments', 'submission_id': post['post_id'],
+                                'comments': comments_by_post.get(post['post_id'], [])}) + '\n')
+    return path
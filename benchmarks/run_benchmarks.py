@@ -0,0 +1,231 @@
+# benchmarks/run_benchmarks.py
+# Times each pipeline stage on the synthetic corpus at several sizes and appends the
+# results to a JSON Lines file, one record per (stage, size), so runs from different
+# commits can be compared.
+#
+# Usage (from the repository root):
+#   python benchmarks/run_benchmarks.py
+#   python benchmarks/run_benchmarks.py --sizes 1000 10000 --repeat 5
+#   python benchmarks/run_benchmarks.py --zero-shot-model typeform/distilbert-base-uncased-mnli
+#   python benchmarks/run_benchmarks.py --zero-shot-model typeform/distilbert-base-uncased-mnli --onnx
+#   python benchmarks/run_benchmarks.py --replay-latency 0.05   # Simulated Reddit round trip
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from corpus import ROOT_DIR, SEARCH_TERMS, SUBREDDITS, generate_corpus, write_cassette
+
+from netlify.functions.classifier import CANDIDATE_LABELS, PrefilterModel, _run_pipeline
+from netlify.functions.comment_shards import write_category_shards
+from netlify.functions.rate_limit import RateLimiter
+from netlify.functions.reddit_replay import ReplayReddit
+from netlify.functions.scrape_engine import ScrapeEngine
+from netlify.functions.keywords import (
+    COGNITIVE_KEYWORDS, FEELING_EXPERIENCE_KEYWORDS, KEYWORD_MATCHER, PEPTIDE_KEYWORDS, contains_any_keyword
+)
+from netlify.functions.selection import select_high_confidence
+from netlify.functions.text_cleaning import clean_series, clean_text
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, 'benchmarks', 'results.jsonl')
+CONFIDENCE_THRESHOLD = 0.70
+ZERO_SHOT_MAX_ROWS = 2000 # The zero-shot model is slow; it is timed on at most this many rows
+SCRAPE_LIMIT_PER_SEARCH = 100
+
+
+def time_call(fn, repeat):
+    """Runs fn() `repeat` times. Returns (list of seconds per run, result of the last run)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- Stages ---
+def _replay_comments(submission):
+    submission.comments.replace_more(limit=0)
+    return [{'comment_id': comment.id, 'comment_text': comment.body} for comment in submission.comments.list()]
+
+
+def bench_scrape_replay(cassette, latency):
+    # The scrape engine against a recorded Reddit, with no request budget: measures the
+    # engine's own overhead, plus `latency` seconds per simulated request
+    reddit = ReplayReddit(cassette, latency=latency)
+    engine = ScrapeEngine(reddit, limiter=RateLimiter(requests_per_minute=float('inf'), burst=1000))
+    results, errors = engine.run(SUBREDDITS, SEARCH_TERMS, SCRAPE_LIMIT_PER_SEARCH, _replay_comments)
+    if errors:
+        raise RuntimeError(f"Replay scrape failed: {errors[0][0]}: {errors[0][1]}")
+    return sum(len(result['comments']) for result in results), reddit.requests
+
+
+def bench_clean_text(comments):
+    return [clean_text(comment['comment_text']) for comment in comments]
+
+
+def bench_clean_series(comments):
+    import pandas as pd
+    return clean_series(pd.Series([comment['comment_text'] for comment in comments]))
+
+
+def bench_contains_any_keyword(texts):
+    # The per-list calls analyze_data.py used to make for every row
+    return sum(
+        1 for text in texts
+        if contains_any_keyword(text, PEPTIDE_KEYWORDS)
+        and contains_any_keyword(text, COGNITIVE_KEYWORDS)
+        and contains_any_keyword(text, FEELING_EXPERIENCE_KEYWORDS)
+    )
+
+
+def bench_keyword_matcher(texts):
+    # The single-scan matcher analyze_data.py uses now
+    return sum(1 for text in texts if KEYWORD_MATCHER.groups(text) >= {'peptide', 'cognitive', 'feeling'})
+
+
+def bench_prefilter(train_texts, train_labels, texts):
+    model = PrefilterModel.train(train_texts, train_labels)
+    return model.predict(texts)
+
+
+def bench_zero_shot(classifier, texts):
+    return _run_pipeline(classifier, texts, 16, CANDIDATE_LABELS)
+
+
+def bench_final_selection(comments_df, shard_dir):
+    _, selected = select_high_confidence(comments_df, 'comment_id', CONFIDENCE_THRESHOLD)
+    records = json.loads(selected.to_json(orient='records', date_format='iso'))
+    return write_category_shards(records, shard_dir=shard_dir)
+
+
+def run(sizes, repeat, seed, zero_shot_model=None, replay_latency=0.0, onnx=False):
+    """Times every stage at every size. Returns a list of result records."""
+    records = []
+    common = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': seed,
+    }
+
+    zero_shot = None
+    zero_shot_onnx = None
+    if zero_shot_model:
+        from transformers import pipeline
+        zero_shot = pipeline('zero-shot-classification', model=zero_shot_model)
+        if onnx:
+            from netlify.functions.onnx_backend import load_onnx_pipeline
+            zero_shot_onnx = load_onnx_pipeline(zero_shot_model)
+
+    def record(stage, size, rows, timings, **extra):
+        best = min(timings)
+        entry = {
+            **common, 'stage': stage, 'size': size, 'rows': rows, 'repeat': len(timings),
+            'best_seconds': best, 'median_seconds': statistics.median(timings),
+            'rows_per_second': rows / best if best > 0 else None, **extra,
+        }
+        records.append(entry)
+        print(f"  {stage:<22} {rows:>9} rows  best {best:8.3f}s  ({entry['rows_per_second'] or 0:,.0f} rows/s)")
+
+    for size in sizes:
+        print(f"\n--- Corpus size: {size} comments ---")
+        posts, comments, labels = generate_corpus(size, seed=seed)
+
+        with tempfile.TemporaryDirectory() as cassette_dir:
+            cassette = write_cassette(posts, comments, os.path.join(cassette_dir, 'cassette.jsonl'),
+                                      limit_per_search=SCRAPE_LIMIT_PER_SEARCH)
+            timings, (scraped, requests) = time_call(lambda: bench_scrape_replay(cassette, replay_latency), repeat)
+        record('scrape_replay', size, scraped, timings, requests=requests, replay_latency=replay_latency)
+
+        timings, cleaned = time_call(lambda: bench_clean_text(comments), repeat)
+        record('clean_text', size, len(comments), timings)
+        try:
+            timings, _ = time_call(lambda: bench_clean_series(comments), repeat)
+            record('clean_series', size, len(comments), timings)
+        except ImportError:
+            print("  clean_series           skipped (pandas is not installed)")
+
+        timings, _ = time_call(lambda: bench_contains_any_keyword(cleaned), repeat)
+        record('contains_any_keyword', size, len(cleaned), timings)
+        timings, _ = time_call(lambda: bench_keyword_matcher(cleaned), repeat)
+        record('keyword_matcher', size, len(cleaned), timings)
+
+        # Tiny local model: the TF-IDF prefilter, trained on half the corpus and run on all of it
+        half = len(cleaned) // 2
+        try:
+            timings, predictions = time_call(
+                lambda: bench_prefilter(cleaned[:half], labels[:half], cleaned), repeat)
+            accuracy = sum(label == predicted for label, (predicted, _) in zip(labels, predictions)) / len(labels)
+            record('classify_prefilter', size, len(cleaned), timings, accuracy=accuracy)
+        except ImportError:
+            predictions = None
+            print("  classify_prefilter     skipped (scikit-learn is not installed)")
+
+        if zero_shot is not None:
+            sample = cleaned[:ZERO_SHOT_MAX_ROWS]
+            timings, reference = time_call(lambda: bench_zero_shot(zero_shot, sample), repeat)
+            record('classify_zero_shot', size, len(sample), timings, model=zero_shot_model)
+            if zero_shot_onnx is not None:
+                timings, quantized = time_call(lambda: bench_zero_shot(zero_shot_onnx, sample), repeat)
+                agreeing = [abs(a[1] - b[1]) for a, b in zip(reference, quantized) if a[0] == b[0]]
+                record('classify_zero_shot_onnx', size, len(sample), timings, model=zero_shot_model,
+                       label_agreement=len(agreeing) / len(sample),
+                       mean_score_drift=sum(agreeing) / len(agreeing) if agreeing else None)
+
+        try:
+            import pandas as pd
+        except ImportError:
+            print("  final_selection        skipped (pandas is not installed)")
+            continue
+        comments_df = pd.DataFrame(comments)
+        comments_df['comment_text_cleaned'] = cleaned
+        if predictions is not None:
+            comments_df['fatigue_classification'] = [label for label, _ in predictions]
+            comments_df['classification_confidence'] = [score for _, score in predictions]
+        else:
+            comments_df['fatigue_classification'] = labels
+            comments_df['classification_confidence'] = [0.5 + (i % 50) / 100 for i in range(len(labels))]
+        with tempfile.TemporaryDirectory() as shard_dir:
+            timings, _ = time_call(lambda: bench_final_selection(comments_df, shard_dir), repeat)
+        record('final_selection', size, len(comments_df), timings)
+
+    return records
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on a synthetic Reddit corpus.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Corpus sizes (number of comments).")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage; the best is reported.")
+    parser.add_argument('--seed', type=int, default=0, help="Corpus random seed.")
+    parser.add_argument('--zero-shot-model', default=None,
+                        help="Also time a (small) zero-shot model from the Hugging Face hub.")
+    parser.add_argument('--onnx', action='store_true',
+                        help="Also time the zero-shot model as an int8-quantized ONNX export.")
+    parser.add_argument('--replay-latency', type=float, default=0.0,
+                        help="Simulated seconds per Reddit request in the scrape_replay stage.")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON Lines file the results are appended to.")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.seed, args.zero_shot_model, args.replay_latency, args.onnx)
+    with open(args.output, 'a') as f:
+        for result in results:
+            f.write(json.dumps(result) + '\n')
+    print(f"\nAppended {len(results)} results to '{args.output}'.")
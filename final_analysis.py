@@ -1,15 +1,28 @@
 # final_analysis.py (Version 5 - Inclusive for All Categories + De-duplication)
 
+import json
+import os
 import pandas as pd
 import sys
 
+from netlify.functions.comment_shards import SHARD_DIR, write_category_shards
+from netlify.functions.selection import select_high_confidence
+from netlify.functions.table_io import find_table, read_table, table_columns
+
 # Set pandas to display wider columns so you can read the text
 pd.set_option('display.max_colwidth', 200)
 
 print("--- Starting Final Analysis (Processing Both Posts and Comments for ALL Categories) ---")
 
 # This is the minimum confidence score a classification must have to be included.
-CONFIDENCE_THRESHOLD = 0.70
+CONFIDENCE_THRESHOLD = float(os.environ.get('CONFIDENCE_THRESHOLD', '0.70'))
+
+# The only comment columns the Netlify app uses (plus the ID for de-duplication, and the
+# cascade tier when the table records it). Parquet input skips every other column on disk.
+APP_COMMENT_COLUMNS = [
+    'comment_id', 'post_id', 'subreddit', 'post_title', 'comment_text_cleaned', 'comment_score',
+    'comment_created_utc', 'fatigue_classification', 'classification_confidence'
+]
 
 # ==============================================================================
 # --- Section 1: Analyzing the POSTS File ---
@@ -18,18 +31,11 @@ CONFIDENCE_THRESHOLD = 0.70
 print("\n\n--- Analyzing POSTS File ---")
 
 try:
-    classified_posts_df = pd.read_csv('classified_relevant_posts_option_b.csv')
+    classified_posts_df = read_table(find_table('classified_relevant_posts_option_b'))
     
-    # --- NEW: Remove duplicate posts based on post_id ---
-    initial_post_count = len(classified_posts_df)
-    classified_posts_df.drop_duplicates(subset=['post_id'], keep='first', inplace=True)
-    deduplicated_post_count = len(classified_posts_df)
-    print(f"Loaded and de-duplicated posts: {initial_post_count} -> {deduplicated_post_count} unique posts.")
-
-    # Apply the confidence score filter to all posts
-    high_confidence_posts = classified_posts_df[
-        classified_posts_df['classification_confidence'] >= CONFIDENCE_THRESHOLD
-    ].copy()
+    # --- Remove duplicate posts based on post_id, then apply the confidence score filter ---
+    deduplicated_posts_df, high_confidence_posts = select_high_confidence(classified_posts_df, 'post_id', CONFIDENCE_THRESHOLD)
+    print(f"Loaded and de-duplicated posts: {len(classified_posts_df)} -> {len(deduplicated_posts_df)} unique posts.")
 
     print(f"Found {len(high_confidence_posts)} high-confidence posts across all categories (Threshold >= {CONFIDENCE_THRESHOLD}).")
 
@@ -43,13 +49,13 @@ try:
 
         # Save the final, high-quality dataset of posts
         final_posts_filename = 'FINAL_HIGH_CONFIDENCE_posts.csv'
-        high_confidence_posts.sort_values(by='classification_confidence', ascending=False).to_csv(final_posts_filename, index=False)
+        high_confidence_posts.to_csv(final_posts_filename, index=False) # Already sorted by confidence
         print(f"\nSaved the final, high-quality posts dataset to '{final_posts_filename}'")
     else:
         print("\nNo high-confidence posts were found.")
 
 except FileNotFoundError:
-    print("\nError: 'classified_relevant_posts_option_b.csv' not found.")
+    print("\nError: 'classified_relevant_posts_option_b' (.parquet or .csv) not found.")
     print("This file is expected. Please ensure analyze_data.py ran correctly.")
 
 
@@ -60,18 +66,16 @@ except FileNotFoundError:
 print("\n\n--- Analyzing COMMENTS File ---")
 
 try:
-    classified_comments_df = pd.read_csv('classified_relevant_comments_option_b.csv')
+    comments_filename = find_table('classified_relevant_comments_option_b')
+    # Tables written before the cascade recorded its tier have no 'classification_tier'
+    comment_columns = APP_COMMENT_COLUMNS + [column for column in ('classification_tier',)
+                                             if column in table_columns(comments_filename)]
+    classified_comments_df = read_table(comments_filename, columns=comment_columns)
 
-    # --- NEW: Remove duplicate comments based on comment_id ---
-    initial_comment_count = len(classified_comments_df)
-    classified_comments_df.drop_duplicates(subset=['comment_id'], keep='first', inplace=True)
-    deduplicated_comment_count = len(classified_comments_df)
-    print(f"Loaded and de-duplicated comments: {initial_comment_count} -> {deduplicated_comment_count} unique comments.")
-
-    # Apply the confidence filter to EVERY comment.
-    high_confidence_all_categories = classified_comments_df[
-        classified_comments_df['classification_confidence'] >= CONFIDENCE_THRESHOLD
-    ].copy()
+    # --- Remove duplicate comments based on comment_id, then apply the confidence filter to EVERY comment ---
+    deduplicated_comments_df, high_confidence_all_categories = select_high_confidence(
+        classified_comments_df, 'comment_id', CONFIDENCE_THRESHOLD)
+    print(f"Loaded and de-duplicated comments: {len(classified_comments_df)} -> {len(deduplicated_comments_df)} unique comments.")
 
     print(f"\nFound {len(high_confidence_all_categories)} high-confidence comments across ALL categories (Threshold >= {CONFIDENCE_THRESHOLD}).")
 
@@ -80,20 +84,23 @@ try:
         print("\n--- Sample of High-Confidence Comments Found ---")
         print(high_confidence_all_categories[['comment_text_cleaned', 'fatigue_classification', 'classification_confidence']].head(10).to_string())
 
-        # --- Create the JSON file for Netlify deployment ---
-        print("\n--- Creating JSON file for Netlify deployment ---")
-        json_output_filename = 'netlify/functions/comments.json'
-        
-        # Save the de-duplicated and filtered dataframe
-        high_confidence_all_categories.to_json(json_output_filename, orient='records', indent=2)
-        print(f"Successfully created '{json_output_filename}' with {len(high_confidence_all_categories)} records.")
-        print("This file is now ready for deployment.")
+        # --- Create the JSON shards for Netlify deployment ---
+        # One file per category, sorted by confidence, plus a manifest; get-comments.js
+        # serves them a page at a time.
+        print("\n--- Creating JSON shards for Netlify deployment ---")
+        # Round-trip through pandas' JSON writer so NaN becomes null and timestamps ISO strings
+        records = json.loads(high_confidence_all_categories.to_json(orient='records', date_format='iso'))
+        manifest = write_category_shards(records)
+        for label, entry in manifest['categories'].items():
+            print(f"  {entry['file']}: {entry['count']} comments ({label})")
+        print(f"Successfully wrote {manifest['total']} records to '{SHARD_DIR}'.")
+        print("These files are now ready for deployment.")
         
     else:
         print("\nNo high-confidence comments were found for ANY category.")
 
 except FileNotFoundError:
-    print("\nError: 'classified_relevant_comments_option_b.csv' not found.")
+    print("\nError: 'classified_relevant_comments_option_b' (.parquet or .csv) not found.")
     print("This file is expected. Please ensure analyze_data.py ran correctly.")
 
 print("\n\n--- Final Analysis Complete ---")
\ No newline at end of file
@@ -22,33 +22,76 @@ document.addEventListener('DOMContentLoaded', () => {
     });
     
     // --- Main Fetch Logic ---
+    // Comments are loaded a page at a time; the next page is requested when the sentinel
+    // below the results scrolls into view.
+    const PAGE_SIZE = 20;
+    const scrollSentinel = document.getElementById('scroll-sentinel');
+    let currentCategory = null;
+    let nextCursor = null;
+    let isLoading = false;
+    let requestId = 0; // Ignores pages that arrive after the category has changed
+
     if (fetchButton) {
         fetchButton.addEventListener('click', () => {
             fetchComments(categorySelect.value);
         });
     }
 
-    async function fetchComments(category) {
+    if (scrollSentinel && 'IntersectionObserver' in window) {
+        const observer = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+        }, { rootMargin: '400px' });
+        observer.observe(scrollSentinel);
+    }
+
+    function fetchComments(category) {
         resultsContainer.innerHTML = '';
+        currentCategory = category;
+        nextCursor = null;
+        isLoading = false;
+        requestId++;
+        loadPage(null);
+    }
+
+    function loadNextPage() {
+        if (currentCategory && nextCursor && !isLoading) loadPage(nextCursor);
+    }
+
+    async function loadPage(cursor) {
+        const thisRequest = requestId;
+        isLoading = true;
         loadingArea.classList.remove('hidden');
 
         try {
-            const response = await fetch(`/.netlify/functions/get-comments?category=${category}`);
+            let url = `/.netlify/functions/get-comments?category=${encodeURIComponent(currentCategory)}&limit=${PAGE_SIZE}`;
+            if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+            const response = await fetch(url);
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
 
-            const comments = await response.json(); 
-            displayComments(comments);
+            const page = await response.json();
+            if (thisRequest !== requestId) return;
+            nextCursor = page.next_cursor;
+            displayComments(page.items, !cursor);
 
         } catch (error) {
+            if (thisRequest !== requestId) return;
             console.error('Error fetching comments:', error);
-            resultsContainer.innerHTML = `<p class="info-message">Failed to fetch comments. Check the console.</p>`;
+            nextCursor = null;
+            resultsContainer.insertAdjacentHTML('beforeend', `<p class="info-message">Failed to fetch comments. Check the console.</p>`);
         } finally {
-            loadingArea.classList.add('hidden');
+            if (thisRequest === requestId) {
+                isLoading = false;
+                loadingArea.classList.add('hidden');
+                // Keep filling the page if the sentinel is still visible (e.g. a tall screen)
+                if (nextCursor && scrollSentinel && scrollSentinel.getBoundingClientRect().top < window.innerHeight + 400) {
+                    loadNextPage();
+                }
+            }
         }
     }
 
-    function displayComments(comments) {
-        if (comments.length === 0) {
+    function displayComments(comments, isFirstPage) {
+        if (isFirstPage && comments.length === 0) {
             resultsContainer.innerHTML = `<p class="info-message">No high-confidence comments found for this category.</p>`;
             return;
         }
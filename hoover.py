@@ -1,48 +1,46 @@
 import pandas as pd
-import re # For regular expressions to clean text
+
+from netlify.functions.table_io import find_table, read_table, table_path, write_table
+from netlify.functions.text_cleaning import clean_series
 
 # --- Load the saved data ---
+# Parquet from scrapey.py when pyarrow is installed, otherwise (or from older runs) CSV
 try:
-    reddit_posts_df = pd.read_csv('reddit_peptides_cognitive_raw.csv')
-    reddit_comments_df = pd.read_csv('reddit_peptides_cognitive_comments.csv')
-    print("CSV files loaded successfully into DataFrames.")
+    reddit_posts_df = read_table(find_table('reddit_peptides_cognitive_raw'))
+    reddit_comments_df = read_table(find_table('reddit_peptides_cognitive_comments'))
+    print("Scraped tables loaded successfully into DataFrames.")
 except FileNotFoundError:
-    print("Error: Make sure 'reddit_peptides_cognitive_raw.csv' and 'reddit_peptides_cognitive_comments.csv' are in the same directory.")
-    exit()
+    print("Error: Make sure 'reddit_peptides_cognitive_raw' and 'reddit_peptides_cognitive_comments' (.parquet or .csv) are in the same directory.")
+    exit(1)
+
+# Scrapes from before search terms were merged per post have one 'search_term_used' per row
+if 'search_terms_used' not in reddit_posts_df.columns and 'search_term_used' in reddit_posts_df.columns:
+    reddit_posts_df['search_terms_used'] = reddit_posts_df['search_term_used'].map(
+        lambda term: [term] if isinstance(term, str) else [])
+    reddit_posts_df = reddit_posts_df.drop(columns=['search_term_used'])
 
 # --- Displaying Data for Better Readability ---
 
-print("\n--- Reddit Posts DataFrame (reddit_peptides_cognitive_raw.csv) ---")
+print("\n--- Reddit Posts DataFrame (reddit_peptides_cognitive_raw) ---")
 # Set pandas options to display more text without truncation
 pd.set_option('display.max_colwidth', None) # Display full content of columns
 pd.set_option('display.width', 1000) # Ensure enough width for wider output
 
 # Display some useful columns for initial inspection
 # We'll drop the 'comments' column for this view as it's a nested list and can clutter
-print(reddit_posts_df[['subreddit', 'post_title', 'post_text', 'score', 'num_comments', 'created_utc', 'search_term_used']].head())
+print(reddit_posts_df[['subreddit', 'post_title', 'post_text', 'score', 'num_comments', 'created_utc', 'search_terms_used']].head())
 
-print("\n--- Reddit Comments DataFrame (reddit_peptides_cognitive_comments.csv) ---")
+print("\n--- Reddit Comments DataFrame (reddit_peptides_cognitive_comments) ---")
 print(reddit_comments_df[['subreddit', 'post_title', 'comment_text', 'comment_score', 'comment_created_utc']].head())
 
 
-# --- Basic Text Cleaning Function ---
-# This function will remove common markdown, newlines, and potentially URLs
-def clean_text(text):
-    if isinstance(text, str): # Ensure it's a string before processing
-        text = text.replace('\n', ' ') # Replace newlines with spaces
-        text = text.replace('\r', ' ') # Replace carriage returns
-        text = re.sub(r'\[.*?\]\(.*?\)','', text) # Remove markdown links [text](url)
-        text = re.sub(r'&amp;', '&', text) # Decode HTML entities like &amp;
-        text = re.sub(r'\s+', ' ', text).strip() # Replace multiple spaces with single space
-    else:
-        text = '' # Handle non-string values (e.g., NaN)
-    return text
-
 # --- Apply Cleaning to Relevant Text Columns ---
+# clean_series (shared with the live scraper) decodes HTML entities, strips Reddit markdown
+# and collapses whitespace a whole column at a time; non-string values (e.g. NaN) become ''.
 print("\nApplying basic text cleaning...")
-reddit_posts_df['post_title_cleaned'] = reddit_posts_df['post_title'].apply(clean_text)
-reddit_posts_df['post_text_cleaned'] = reddit_posts_df['post_text'].apply(clean_text)
-reddit_comments_df['comment_text_cleaned'] = reddit_comments_df['comment_text'].apply(clean_text)
+reddit_posts_df['post_title_cleaned'] = clean_series(reddit_posts_df['post_title'])
+reddit_posts_df['post_text_cleaned'] = clean_series(reddit_posts_df['post_text'])
+reddit_comments_df['comment_text_cleaned'] = clean_series(reddit_comments_df['comment_text'])
 
 # --- Display Cleaned Data (first 5 rows of cleaned columns) ---
 print("\n--- Cleaned Reddit Posts (sample) ---")
@@ -52,19 +50,19 @@ print("\n--- Cleaned Reddit Comments (sample) ---")
 print(reddit_comments_df[['subreddit', 'post_title', 'comment_text_cleaned']].head())
 
 
-# --- Save Cleaned Data to New CSVs (Optional but Recommended) ---
+# --- Save Cleaned Data to New Tables (Optional but Recommended) ---
 # It's good practice to save cleaned data separately so you always have the raw original.
-cleaned_posts_filename = 'reddit_peptides_cognitive_cleaned_posts.csv'
-cleaned_comments_filename = 'reddit_peptides_cognitive_cleaned_comments.csv'
+cleaned_posts_filename = table_path('reddit_peptides_cognitive_cleaned_posts')
+cleaned_comments_filename = table_path('reddit_peptides_cognitive_cleaned_comments')
 
 # Select only the relevant columns to save, including the new cleaned ones
-# For posts, exclude the raw 'comments' list which is hard to use in a flat CSV
-reddit_posts_df_to_save = reddit_posts_df.drop(columns=['comments', 'post_title', 'post_text'])
+# For posts, exclude the raw 'comments' list kept by older scrapes (comments have their own table)
+reddit_posts_df_to_save = reddit_posts_df.drop(columns=['comments', 'post_title', 'post_text'], errors='ignore') # Newer scrapes have no 'comments' column
 reddit_comments_df_to_save = reddit_comments_df.drop(columns=['comment_text'])
 
 
-reddit_posts_df_to_save.to_csv(cleaned_posts_filename, index=False)
-reddit_comments_df_to_save.to_csv(cleaned_comments_filename, index=False)
+write_table(reddit_posts_df_to_save, cleaned_posts_filename)
+write_table(reddit_comments_df_to_save, cleaned_comments_filename)
 
 print(f"\nCleaned posts data saved to '{cleaned_posts_filename}'")
 print(f"Cleaned comments data saved to '{cleaned_comments_filename}'")
@@ -76,12 +74,13 @@ print(f"Total Comments: {len(reddit_comments_df)}")
 print("\nTop 5 Subreddits by Post Count:")
 print(reddit_posts_df['subreddit'].value_counts().head())
 print("\nTop 5 Search Terms by Post Count:")
-print(reddit_posts_df['search_term_used'].value_counts().head())
+# Each post lists every search term that found it
+print(reddit_posts_df['search_terms_used'].explode().value_counts().head())
 print("\nPost Score Distribution (Posts DataFrame):")
 print(reddit_posts_df['score'].describe())
 print("\nComment Score Distribution (Comments DataFrame):")
 print(reddit_comments_df['comment_score'].describe())
 
 # Check for empty posts or comments after cleaning
-print(f"\nPosts with empty cleaned text: {reddit_posts_df['post_text_cleaned'].apply(lambda x: x.strip() == '').sum()}")
-print(f"Comments with empty cleaned text: {reddit_comments_df['comment_text_cleaned'].apply(lambda x: x.strip() == '').sum()}")
\ No newline at end of file
+print(f"\nPosts with empty cleaned text: {(reddit_posts_df['post_text_cleaned'] == '').sum()}")
+print(f"Comments with empty cleaned text: {(reddit_comments_df['comment_text_cleaned'] == '').sum()}")
\ No newline at end of file
@@ -1,66 +1,46 @@
 # analyze_data.py
 
 import pandas as pd
-import re
 import os
 import sys
 
 # --- Adjust the import path to find classifier.py ---
-current_dir = os.path.dirname(__file__)
-functions_dir = os.path.join(current_dir, 'netlify', 'functions')
+current_dir = os.path.dirname(os.path.abspath(__file__))
+functions_dir = os.path.join(current_dir, 'functions')
 sys.path.insert(0, functions_dir)
 
-from classifier import classify_fatigue_comment
+from classifier import ClassificationCascade, LongTextOptions, PrefilterModel, get_default_cache
+from keywords import KEYWORD_MATCHER
+from metrics import write_summary
+from table_io import find_table, read_table, table_path, write_table
 
-print("Starting data analysis and classification (Option B: Loosened Filtering, Corrected Columns)...")
+# Number of processes used for classification. Set CLASSIFY_WORKERS to the number of
+# cores on the box for the nightly run; 1 keeps everything in this process.
+CLASSIFY_WORKERS = int(os.environ.get('CLASSIFY_WORKERS', '1'))
+
+# Set USE_PREFILTER=1 to train the cheap TF-IDF prefilter from cached model labels and
+# let it decide the rows it is sure about. Off by default: its probabilities are not on the
+# zero-shot model's scale, and the 'classification_tier' column records which rows it decided.
+USE_PREFILTER = os.environ.get('USE_PREFILTER', '0') == '1'
+
+# Posts too long for the model to read in one pass are classified in token windows (title
+# first in each), stopping at the first window whose label reaches LONG_TEXT_EARLY_EXIT
+# confidence, so later content is no longer truncated away. Posts that fit are classified
+# whole either way. LONG_POST_MODE=0 truncates long posts as before.
+LONG_POST_MODE = os.environ.get('LONG_POST_MODE', '1') == '1'
+LONG_TEXT_EARLY_EXIT = float(os.environ.get('LONG_TEXT_EARLY_EXIT', '0.70'))
 
-# --- Define Targeted Keyword Lists ---
-PEPTIDE_KEYWORDS = [
-    "peptide", "peptides", "noopept", "modafinil", "semaglutide", "tirzepatide",
-    "bpc-157", "tb-500", "cjc-1295", "ipamorelin", "dsip", "epitalon",
-    "ghrp", "melanotan", "sarms", "cortexin", "dihexa", "cerebrolysin", "selank",
-    "bpc", "thymosin", "nmn", "nr", "creatine", "choline", "alpha-gpc",
-    "agmatine", "pramiracetam", "aniracetam", "follistatin", "melanotan", "ipamorelin",
-    "gaba", "dopamine", "serotonin", "acetylcholine", "mk-677", "ghk-cu", "motc" # Added more
-]
-
-COGNITIVE_KEYWORDS = [
-    "cognitive", "brain fog", "focus", "concentration", "memory", "mental clarity",
-    "thinking", "mental energy", "alertness", "cognition", "neuroplasticity",
-    "learning", "attention", "mental performance", "mind", "mentally",
-    "sharpness", "clarity", "brain power", "mental slump", "slow thinking",
-    "recall", "retention", "executive function", "neuro", "brain", "acuity",
-    "cognition", "mental alertness" # Added more
-]
-
-FEELING_EXPERIENCE_KEYWORDS = [
-    "feel", "feeling", "felt", "experience", "experienced", "noticed", "my thoughts",
-    "how do you feel", "did anyone else", "impacts me", "effects on me", "my symptoms",
-    "i'm wondering", "i think", "i believe", "my take", "my experience", "personal account",
-    "improved", "worsened", "helped", "hurt", "effect", "struggle", "benefit", "side effect",
-    "drained", "exhausted", "tired", "fatigue", "burnt out", "my mood", "anxiety", "stress",
-    "depression", "irritable", "sleepy", "awake", "energy", "energetic", "lethargic",
-    "opinion", "feedback", "thoughts", "my state", "well-being", "mood swings", "brain dead",
-    "exhaustion", "weariness", "listless", "sluggish", "depressed", "stressed", "anxious",
-    "frustrated", "overwhelmed", "boosted", "uplifted", "calm", "relaxed" # Added more
-]
-
-# --- Helper function for robust keyword checking ---
-def contains_any_keyword(text, keywords, debug_name=""):
-    if pd.isna(text) or not str(text).strip(): # Check for NaN and empty strings
-        return False
-    text_lower = str(text).lower()
-    found_keywords = [keyword for keyword in keywords if re.search(r'\b' + re.escape(keyword) + r'\b', text_lower)]
-    # if found_keywords:
-    #     print(f"DEBUG: Found {debug_name} keywords: {found_keywords} in text snippet: '{text_lower[:100]}...'")
-    return bool(found_keywords)
+print("Starting data analysis and classification (Option B: Loosened Filtering, Corrected Columns)...")
 
 # --- Load Existing Data ---
 try:
-    posts_df = pd.read_csv('cleaned_posts.csv') #
-    comments_df = pd.read_csv('cleaned_comments.csv') #
-    print(f"Loaded {len(posts_df)} posts from cleaned_posts.csv")
-    print(f"Loaded {len(comments_df)} comments from cleaned_comments.csv")
+    # Written by hoover.py (.parquet, or .csv from older runs)
+    posts_filename = find_table('reddit_peptides_cognitive_cleaned_posts')
+    comments_filename = find_table('reddit_peptides_cognitive_cleaned_comments')
+    posts_df = read_table(posts_filename)
+    comments_df = read_table(comments_filename)
+    print(f"Loaded {len(posts_df)} posts from {posts_filename}")
+    print(f"Loaded {len(comments_df)} comments from {comments_filename}")
 
     # --- Debugging: Check actual column names and content ---
     print("\n--- DEBUG: Posts DataFrame Info ---")
@@ -76,7 +56,7 @@ try:
 
 
 except FileNotFoundError:
-    print("Error: cleaned_posts.csv or cleaned_comments.csv not found.") #
+    print("Error: reddit_peptides_cognitive_cleaned_posts or reddit_peptides_cognitive_cleaned_comments (.parquet or .csv) not found.")
     print("Please ensure these files are in the same directory as analyze_data.py or provide the correct path.")
     sys.exit(1)
 
@@ -93,9 +73,23 @@ post_lookup = posts_df.set_index('post_id')['full_post_text'].to_dict()
 #    print(f"DEBUG Post Context {post_id}: '{text[:100]}...'")
 
 
+# --- Set up the classification cascade (rules -> cache -> prefilter -> model) ---
+classification_cache = get_default_cache()
+prefilter = None
+if USE_PREFILTER and classification_cache is not None:
+    prefilter = PrefilterModel.from_cache(classification_cache)
+cascade = ClassificationCascade(prefilter=prefilter)
+# Posts get their own cascade so long-text mode (and its report) only applies to them
+post_cascade = ClassificationCascade(
+    prefilter=prefilter,
+    long_text=LongTextOptions(early_exit_threshold=LONG_TEXT_EARLY_EXIT) if LONG_POST_MODE else None)
+
+
 # --- Filter and Classify Posts (Looser filtering for posts: Peptide AND Cognitive) ---
 print("\nFiltering and classifying posts...")
 filtered_classified_posts = []
+post_texts_to_classify = []
+post_titles_to_classify = []
 debug_post_count_peptide = 0
 debug_post_count_cognitive = 0
 debug_post_count_both = 0
@@ -104,8 +98,10 @@ debug_post_count_both = 0
 for index, row in posts_df.iterrows():
     post_text = row['full_post_text']
 
-    has_peptide = contains_any_keyword(post_text, PEPTIDE_KEYWORDS, "peptide")
-    has_cognitive = contains_any_keyword(post_text, COGNITIVE_KEYWORDS, "cognitive")
+    # One scan of the text reports hits for all keyword lists at once
+    keyword_hits = KEYWORD_MATCHER.groups(post_text)
+    has_peptide = 'peptide' in keyword_hits
+    has_cognitive = 'cognitive' in keyword_hits
 
     if has_peptide: debug_post_count_peptide += 1
     if has_cognitive: debug_post_count_cognitive += 1
@@ -113,27 +109,38 @@ for index, row in posts_df.iterrows():
     # Filter posts if they contain Peptide AND Cognitive keywords (feeling can be in comments)
     if has_peptide and has_cognitive:
         debug_post_count_both += 1
-        # Apply classification for fatigue
-        predicted_label, confidence_score = classify_fatigue_comment(post_text)
-
-        post_data = row.to_dict()
-        post_data['fatigue_classification'] = predicted_label
-        post_data['classification_confidence'] = confidence_score
-        filtered_classified_posts.append(post_data)
+        filtered_classified_posts.append(row.to_dict())
+        post_texts_to_classify.append(post_text)
+        post_titles_to_classify.append(str(row.get('post_title_cleaned', '')).strip())
+
+# Apply classification for fatigue to all matching posts in batches
+post_results, post_tiers = post_cascade.classify_with_tiers(post_texts_to_classify, workers=CLASSIFY_WORKERS,
+                                                            titles=post_titles_to_classify)
+for post_data, (predicted_label, confidence_score), tier in zip(filtered_classified_posts, post_results, post_tiers):
+    post_data['fatigue_classification'] = predicted_label
+    post_data['classification_confidence'] = confidence_score
+    post_data['classification_tier'] = tier # Which cascade tier decided the row
 
 filtered_posts_df = pd.DataFrame(filtered_classified_posts)
 print(f"DEBUG: Posts with any Peptide keyword: {debug_post_count_peptide}")
 print(f"DEBUG: Posts with any Cognitive keyword: {debug_post_count_cognitive}")
 print(f"Found {len(filtered_posts_df)} relevant posts (Peptide & Cognitive).") # This is debug_post_count_both
+long_report = post_cascade.long_text_report
+if long_report['texts']:
+    print(f"Long posts: {long_report['texts']} classified in {long_report['windows_scored']} of {long_report['windows']} "
+          f"windows ({long_report['early_exits']} exited early); {long_report['tokens_scored']} of "
+          f"{long_report['tokens']} tokens processed.")
 
 
 # --- Filter and Classify Comments (Stricter filtering on combined text: Peptide AND Cognitive AND Feeling) ---
 print("\nFiltering and classifying comments...")
 filtered_classified_comments = []
+comment_texts_to_classify = []
 debug_comment_count_peptide = 0
 debug_comment_count_cognitive = 0
 debug_comment_count_feeling = 0
 debug_comment_count_all_three = 0
+post_terms = {} # post_id -> keywords found in the parent post, scanned once per post
 
 
 for index, row in comments_df.iterrows():
@@ -144,12 +151,17 @@ for index, row in comments_df.iterrows():
     # Get the parent post's text. If post_id not found, treat as empty post context.
     parent_post_text = post_lookup.get(post_id, '')
 
-    # Combine comment text with its parent post's text for more context
-    combined_text = (comment_text + ' ' + parent_post_text).strip()
-
-    has_peptide = contains_any_keyword(combined_text, PEPTIDE_KEYWORDS, "peptide (combined)")
-    has_cognitive = contains_any_keyword(combined_text, COGNITIVE_KEYWORDS, "cognitive (combined)")
-    has_feeling = contains_any_keyword(combined_text, FEELING_EXPERIENCE_KEYWORDS, "feeling (combined)")
+    # Match the comment together with its parent post's text for more context. The post is
+    # scanned once however many comments it has; the same hits as scanning
+    # comment + ' ' + post, without building and re-scanning that string per comment.
+    if post_id not in post_terms:
+        post_terms[post_id] = KEYWORD_MATCHER.matched_terms(parent_post_text)
+    terms = (KEYWORD_MATCHER.matched_terms(comment_text) | post_terms[post_id]
+             | KEYWORD_MATCHER.junction_terms(comment_text, parent_post_text))
+    keyword_hits = KEYWORD_MATCHER.groups_for_terms(terms)
+    has_peptide = 'peptide' in keyword_hits
+    has_cognitive = 'cognitive' in keyword_hits
+    has_feeling = 'feeling' in keyword_hits
 
     if has_peptide: debug_comment_count_peptide += 1
     if has_cognitive: debug_comment_count_cognitive += 1
@@ -158,12 +170,15 @@ for index, row in comments_df.iterrows():
     # Filter comments if the combined text contains Peptide AND Cognitive AND Feeling/Experience keywords
     if has_peptide and has_cognitive and has_feeling:
         debug_comment_count_all_three += 1
-        predicted_label, confidence_score = classify_fatigue_comment(comment_text)
+        filtered_classified_comments.append(row.to_dict())
+        comment_texts_to_classify.append(comment_text)
 
-        comment_data = row.to_dict()
-        comment_data['fatigue_classification'] = predicted_label
-        comment_data['classification_confidence'] = confidence_score
-        filtered_classified_comments.append(comment_data)
+comment_results, comment_tiers = cascade.classify_with_tiers(comment_texts_to_classify, workers=CLASSIFY_WORKERS)
+for comment_data, (predicted_label, confidence_score), tier in zip(
+        filtered_classified_comments, comment_results, comment_tiers):
+    comment_data['fatigue_classification'] = predicted_label
+    comment_data['classification_confidence'] = confidence_score
+    comment_data['classification_tier'] = tier
 
 filtered_comments_df = pd.DataFrame(filtered_classified_comments)
 print(f"DEBUG: Comments (combined text) with any Peptide keyword: {debug_comment_count_peptide}")
@@ -173,21 +188,35 @@ print(f"Found {len(filtered_comments_df)} relevant comments (Peptide & Cognitive
 
 
 # --- Save Filtered and Classified Results ---
-output_posts_filename = 'classified_relevant_posts_option_b.csv'
-output_comments_filename = 'classified_relevant_comments_option_b.csv'
+output_posts_filename = table_path('classified_relevant_posts_option_b')
+output_comments_filename = table_path('classified_relevant_comments_option_b')
 
 if not filtered_posts_df.empty:
     # Drop the temporary 'full_post_text' column before saving
     filtered_posts_df = filtered_posts_df.drop(columns=['full_post_text'], errors='ignore')
-    filtered_posts_df.to_csv(output_posts_filename, index=False)
+    write_table(filtered_posts_df, output_posts_filename)
     print(f"\nFiltered and classified posts saved to '{output_posts_filename}'")
 else:
     print("\nNo relevant posts found to save.")
 
 if not filtered_comments_df.empty:
-    filtered_comments_df.to_csv(output_comments_filename, index=False)
+    write_table(filtered_comments_df, output_comments_filename)
     print(f"Filtered and classified comments saved to '{output_comments_filename}'")
 else:
     print("No relevant comments found to save.")
 
-print("\nData analysis and classification complete.")
\ No newline at end of file
+print("\nRows decided by each classification tier:")
+for label, tier_cascade in (("Posts", post_cascade), ("Comments", cascade)):
+    print(f" {label}:")
+    for tier, tier_stats in tier_cascade.tier_report().items():
+        print(f"  {tier}: {tier_stats['rows']} ({tier_stats['fraction']:.1%})")
+
+if classification_cache is not None:
+    cache_stats = classification_cache.stats()
+    print(f"\nClassification cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+          f"({cache_stats['hit_rate']:.1%} hit rate), {cache_stats['entries']} entries stored.")
+
+print("\nData analysis and classification complete.")
+
+# Classifier batch latencies (p50/p99), batch sizes, tier counts and cache hit rate for this run
+write_summary('classify')
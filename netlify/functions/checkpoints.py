@@ -0,0 +1,155 @@
+# netlify/functions/checkpoints.py
+import json
+import sqlite3
+import threading
+
+DEFAULT_CHECKPOINT_PATH = 'scrape_checkpoint.sqlite'
+
+
+class ScrapeCheckpoint:
+    """
+    Persistent record of scraping progress, so a crashed run can resume and a scheduled
+    run only fetches what changed.
+
+    It keeps:
+      - which (subreddit, term) units finished in the current run,
+      - every post ID ever stored, so posts aren't fetched twice,
+      - the newest `created_utc` seen per unit (the watermark for incremental runs),
+      - the rows stored during the current run only.
+
+    A run stays "current" until finish_run() is called, so rerunning after a crash picks
+    up the same run: finished units are skipped and their rows are still returned by
+    run_rows(). finish_run() drops those rows, so the file only grows by one ID per post.
+
+    Args:
+        path (str): SQLite database file. Created if it does not exist.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE IF NOT EXISTS units ("
+            " subreddit TEXT NOT NULL,"
+            " term TEXT NOT NULL,"
+            " completed_run INTEGER,"
+            " newest_created_utc REAL,"
+            " PRIMARY KEY (subreddit, term));"
+            "CREATE TABLE IF NOT EXISTS seen_posts (post_id TEXT PRIMARY KEY);"
+            # Row payloads of the current run, for run_rows()
+            "CREATE TABLE IF NOT EXISTS posts ("
+            " post_id TEXT PRIMARY KEY,"
+            " run_id INTEGER NOT NULL,"
+            " row TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_posts_run ON posts (run_id);"
+        )
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('current_run', '1')")
+        # Checkpoints from older versions kept every run's rows: keep their IDs, drop the rows
+        self._conn.execute("INSERT OR IGNORE INTO seen_posts (post_id) SELECT post_id FROM posts")
+        self._conn.execute(
+            "DELETE FROM posts WHERE run_id < (SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'current_run')")
+        self._conn.commit()
+
+    @property
+    def current_run(self):
+        with self._lock:
+            (value,) = self._conn.execute("SELECT value FROM meta WHERE key = 'current_run'").fetchone()
+        return int(value)
+
+    def is_complete(self, subreddit, term):
+        """True if this (subreddit, term) unit already finished in the current run."""
+        run = self.current_run
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT completed_run FROM units WHERE subreddit = ? AND term = ?", (subreddit, term)
+            ).fetchone()
+        return row is not None and row[0] == run
+
+    def watermark(self, subreddit, term):
+        """Newest created_utc (epoch seconds) seen for this unit in any run, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT newest_created_utc FROM units WHERE subreddit = ? AND term = ?", (subreddit, term)
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_seen(self, post_id):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM seen_posts WHERE post_id = ?", (post_id,)).fetchone()
+        return row is not None
+
+    def add_search_term(self, post_id, term):
+        """
+        Records that another search term found a post stored in the current run. Posts from
+        earlier runs have already been handed out, so there is no row left to update.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT row FROM posts WHERE post_id = ?", (post_id,)).fetchone()
+            if row is None:
+                return
+            post = json.loads(row[0])
+            terms = post.setdefault('search_terms_used', [])
+            if term not in terms:
+                terms.append(term)
+                self._conn.execute("UPDATE posts SET row = ? WHERE post_id = ?", (json.dumps(post, default=str), post_id))
+                self._conn.commit()
+
+    def record_unit(self, subreddit, term, rows, newest_created_utc=None):
+        """
+        Stores a finished unit's post rows and marks the unit complete, in one transaction.
+        The watermark only ever moves forward.
+        """
+        run = self.current_run
+        with self._lock:
+            with self._conn: # Commits on success, rolls back on error
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO posts (post_id, run_id, row) VALUES (?, ?, ?)",
+                    [(row['post_id'], run, json.dumps(row, default=str)) for row in rows]
+                )
+                self._conn.executemany("INSERT OR IGNORE INTO seen_posts (post_id) VALUES (?)",
+                                       [(row['post_id'],) for row in rows])
+                self._conn.execute(
+                    "INSERT INTO units (subreddit, term, completed_run, newest_created_utc) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (subreddit, term) DO UPDATE SET"
+                    " completed_run = excluded.completed_run,"
+                    " newest_created_utc = MAX(COALESCE(units.newest_created_utc, excluded.newest_created_utc),"
+                    "                          COALESCE(excluded.newest_created_utc, units.newest_created_utc))",
+                    (subreddit, term, run, newest_created_utc)
+                )
+
+    def iter_run_rows(self, batch_size=1000):
+        """Yields every post row stored during the current run (including before a crash)."""
+        run = self.current_run
+        last_rowid = 0
+        while True:
+            with self._lock:
+                batch = self._conn.execute(
+                    "SELECT rowid, row FROM posts WHERE run_id = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (run, last_rowid, batch_size)
+                ).fetchall()
+            if not batch:
+                return
+            for rowid, row in batch:
+                yield json.loads(row)
+            last_rowid = batch[-1][0]
+
+    def run_rows(self):
+        """Returns every post row stored during the current run as a list."""
+        return list(self.iter_run_rows())
+
+    def finish_run(self):
+        """
+        Closes the current run and drops its rows (call it once they are saved). The next
+        scrape starts fresh but keeps seen IDs and watermarks.
+        """
+        run = self.current_run
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM posts")
+                self._conn.execute("UPDATE meta SET value = ? WHERE key = 'current_run'", (str(run + 1),))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
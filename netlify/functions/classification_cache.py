@@ -0,0 +1,171 @@
+# netlify/functions/classification_cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    from .metrics import REGISTRY, ratio_gauge
+except ImportError: # Imported as a top-level module
+    from metrics import REGISTRY, ratio_gauge
+
+DEFAULT_CACHE_PATH = os.environ.get('CLASSIFICATION_CACHE_PATH', 'classification_cache.sqlite')
+DEFAULT_MAX_ENTRIES = 2_000_000
+
+CACHE_LOOKUPS = REGISTRY.counter('classification_cache_lookups_total', "Classification cache lookups.", ['result'])
+ratio_gauge('classification_cache_hit_ratio', "Share of classification cache lookups that hit.", CACHE_LOOKUPS, 'hit')
+
+
+def normalize_text(text):
+    """Collapses whitespace so trivially different copies of a text share one cache entry."""
+    return re.sub(r'\s+', ' ', str(text)).strip()
+
+
+def label_set_key(model_name, candidate_labels):
+    """Identifies a model + label list combination, so stored examples can be filtered by it."""
+    payload = json.dumps([model_name, list(candidate_labels)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cache_key(text, model_name, candidate_labels):
+    """Hash of the normalized text, the model name and the exact (ordered) label list."""
+    payload = json.dumps([normalize_text(text), model_name, list(candidate_labels)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ClassificationCache:
+    """
+    Persistent SQLite cache of zero-shot classification results.
+
+    Entries are keyed by cache_key(), so changing the model or the candidate labels
+    never returns a stale label. When the cache grows past max_entries, the least
+    recently used entries are evicted. The normalized text is stored alongside each
+    result so cached model labels can later be used as training data
+    (see labelled_examples()).
+
+    Args:
+        path (str): SQLite database file. Created if it does not exist.
+        max_entries (int): Upper bound on the number of stored results.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            " key TEXT PRIMARY KEY,"
+            " label TEXT NOT NULL,"
+            " score REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " label_set TEXT,"
+            " text TEXT)"
+        )
+        # Caches created before texts were stored get the extra columns added in place
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(classifications)")}
+        for column in ('label_set', 'text'):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE classifications ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON classifications (last_used)")
+        self._conn.commit()
+
+    def get_many(self, texts, model_name, candidate_labels):
+        """
+        Looks up several texts at once.
+
+        Returns:
+            dict: Position in `texts` -> (label, score) for every text that was cached.
+        """
+        keys = [cache_key(text, model_name, candidate_labels) for text in texts]
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(keys), 500):
+                chunk = list(set(keys[start:start + 500]))
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, label, score FROM classifications WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update({key: (label, score) for key, label, score in rows})
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE classifications SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            results = {i: found[key] for i, key in enumerate(keys) if key in found}
+            self.hits += len(results)
+            self.misses += len(keys) - len(results)
+        CACHE_LOOKUPS.inc(len(results), result='hit')
+        CACHE_LOOKUPS.inc(len(keys) - len(results), result='miss')
+        return results
+
+    def put_many(self, texts, results, model_name, candidate_labels):
+        """Stores one (label, score) result per text and evicts old entries if needed."""
+        now = time.time()
+        label_set = label_set_key(model_name, candidate_labels)
+        rows = [
+            (cache_key(text, model_name, candidate_labels), label, float(score), now, label_set, normalize_text(text))
+            for text, (label, score) in zip(texts, results)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO classifications (key, label, score, last_used, label_set, text)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def labelled_examples(self, model_name, candidate_labels, min_score=0.0, limit=None):
+        """
+        Returns (text, label, score) tuples stored for this model and label list,
+        most recently used first.
+        """
+        query = ("SELECT text, label, score FROM classifications"
+                 " WHERE label_set = ? AND text IS NOT NULL AND score >= ?"
+                 " ORDER BY last_used DESC")
+        params = [label_set_key(model_name, candidate_labels), min_score]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM classifications WHERE key IN "
+                "(SELECT key FROM classifications ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()
+        return count
+
+    def stats(self):
+        """Returns hit/miss counters for this process plus the current number of entries."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
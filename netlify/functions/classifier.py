@@ -1,44 +1,668 @@
 # netlify/functions/classifier.py
+import atexit
+import math
+import multiprocessing
 import os
-from transformers import pipeline
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .classification_cache import ClassificationCache, DEFAULT_CACHE_PATH
+    from .metrics import REGISTRY, SIZE_BUCKETS
+    from .onnx_backend import ONNX_QUANTIZATION
+except ImportError: # Imported as a top-level module (e.g. from analyze_data.py)
+    from classification_cache import ClassificationCache, DEFAULT_CACHE_PATH
+    from metrics import REGISTRY, SIZE_BUCKETS
+    from onnx_backend import ONNX_QUANTIZATION
 
 # Load the zero-shot classification pipeline
 # 'mnli' models are good for this as they are trained on Natural Language Inference
 # You might try 'MoritzLaurer/deberta-v3-large-zeroshot' for potentially better performance
 # but it's a larger model. Start with a common one.
 # Make sure you have internet access for the first time you run this to download the model.
-try:
-    classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-except Exception as e:
-    print(f"Error loading zero-shot classification model: {e}")
-    print("Please ensure you have an active internet connection or the model is cached.")
-    classifier = None # Set to None to indicate model loading failure
+MODEL_NAME = "facebook/bart-large-mnli"
 
-def classify_fatigue_comment(comment_text):
-    if not classifier:
-        return "Model_Load_Error", 0.0 # Return default error if model failed to load
-
-    # Define your candidate labels clearly. These are what the model will try to predict.
-    # Be descriptive but concise for the model.
-    # Ensure these labels align with what you want for your dissertation analysis.
-    candidate_labels = [
-        "cognitive fatigue related to peptides",
-        "physical fatigue related to peptides",
-        "emotional fatigue related to peptides",
-        "general peptide discussion, no fatigue mentioned",
-        "fatigue mentioned, but not related to peptides",
-        "irrelevant or other topic"
+# Inference backend: 'pytorch' runs the model as published; 'onnx' runs an int8-quantized
+# ONNX export under ONNX Runtime, several times faster on CPU (see onnx_backend.py for the
+# export and the parity check against PyTorch).
+CLASSIFIER_BACKEND = os.environ.get('CLASSIFIER_BACKEND', 'pytorch')
+if CLASSIFIER_BACKEND not in ('pytorch', 'onnx'):
+    raise ValueError(f"Unknown CLASSIFIER_BACKEND '{CLASSIFIER_BACKEND}'. Use 'pytorch' or 'onnx'.")
+
+# Results are cached per model, backend *and* quantization, since quantization shifts the
+# scores slightly (and differently for each instruction set)
+MODEL_ID = MODEL_NAME if CLASSIFIER_BACKEND == 'pytorch' else f"{MODEL_NAME}+onnx-int8-{ONNX_QUANTIZATION}"
+
+# The pipeline is loaded on first use (not at import time) and shared by all threads
+_classifier = None
+_classifier_loaded = False
+_classifier_lock = threading.Lock()
+_intra_op_threads = None # Set in pool workers so they split the cores between them
+
+def _load_pipeline():
+    if CLASSIFIER_BACKEND == 'onnx':
+        try:
+            from .onnx_backend import load_onnx_pipeline
+        except ImportError: # Imported as a top-level module
+            from onnx_backend import load_onnx_pipeline
+        return load_onnx_pipeline(MODEL_NAME, threads=_intra_op_threads)
+    from transformers import pipeline
+    return pipeline("zero-shot-classification", model=MODEL_NAME)
+
+def get_classifier():
+    """Returns the shared zero-shot pipeline, loading it on first call. None if loading failed."""
+    global _classifier, _classifier_loaded
+    if not _classifier_loaded:
+        with _classifier_lock:
+            if not _classifier_loaded:
+                try:
+                    _classifier = _load_pipeline()
+                except Exception as e:
+                    print(f"Error loading zero-shot classification model: {e}")
+                    print("Please ensure you have an active internet connection or the model is cached.")
+                    _classifier = None # Set to None to indicate model loading failure
+                _classifier_loaded = True
+    return _classifier
+
+def warmup():
+    """Loads the model ahead of the first classification. Returns True if it is ready."""
+    return get_classifier() is not None
+
+# Define your candidate labels clearly. These are what the model will try to predict.
+# Be descriptive but concise for the model.
+# Ensure these labels align with what you want for your dissertation analysis.
+CANDIDATE_LABELS = [
+    "cognitive fatigue related to peptides",
+    "physical fatigue related to peptides",
+    "emotional fatigue related to peptides",
+    "general peptide discussion, no fatigue mentioned",
+    "fatigue mentioned, but not related to peptides",
+    "irrelevant or other topic"
+]
+
+DEFAULT_BATCH_SIZE = 16
+
+# --- Metrics ---
+BATCH_SECONDS = REGISTRY.histogram('classifier_batch_seconds', "Zero-shot pipeline latency per batch.")
+BATCH_SIZES = REGISTRY.histogram('classifier_batch_size', "Texts per zero-shot pipeline batch.", buckets=SIZE_BUCKETS)
+CALL_SECONDS = REGISTRY.histogram('classifier_call_seconds',
+                                  "Latency of classify_fatigue_comments() calls, cache lookups included.")
+ROWS_CLASSIFIED = REGISTRY.counter('classifier_rows_total', "Texts classified, by the tier that decided them.", ['tier'])
+
+def _token_length(classifier, text):
+    """Approximate input length used to group similar-sized texts into the same batch."""
+    tokenizer = getattr(classifier, 'tokenizer', None)
+    if tokenizer is not None:
+        return len(tokenizer(text, truncation=True)['input_ids'])
+    return len(text)
+
+def _run_pipeline(classifier, texts, batch_size, candidate_labels):
+    """Runs the pipeline over texts in length-sorted batches, returning results in input order."""
+    order = sorted(range(len(texts)), key=lambda i: _token_length(classifier, texts[i]))
+    results = [None] * len(texts)
+
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+        batch_texts = [texts[i] for i in batch_indices]
+
+        # Perform the classification
+        start_time = time.perf_counter()
+        batch_results = classifier(batch_texts, candidate_labels, batch_size=batch_size)
+        BATCH_SECONDS.observe(time.perf_counter() - start_time)
+        BATCH_SIZES.observe(len(batch_texts))
+        if isinstance(batch_results, dict): # The pipeline unwraps single-item lists
+            batch_results = [batch_results]
+
+        # Each result is a dictionary with 'sequence', 'labels', and 'scores'
+        # We want the label with the highest score
+        for i, result in zip(batch_indices, batch_results):
+            results[i] = (result['labels'][0], result['scores'][0])
+
+    return results
+
+# --- Persistent Result Cache ---
+# Set CLASSIFICATION_CACHE_PATH to '' to turn the default cache off.
+_default_cache = None
+
+def get_default_cache():
+    """Returns the shared on-disk cache, or None if caching is disabled."""
+    global _default_cache
+    if _default_cache is None and DEFAULT_CACHE_PATH:
+        _default_cache = ClassificationCache(DEFAULT_CACHE_PATH)
+    return _default_cache
+
+# --- Multi-Process Classification ---
+def _init_worker(threads_per_worker):
+    """Runs once in each pool worker: caps torch (or ONNX Runtime) threads, then loads the model."""
+    global _intra_op_threads
+    _intra_op_threads = threads_per_worker
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    REGISTRY.reset() # Forked workers start with a copy of the parent's metrics
+    warmup()
+
+def _classify_shard(shard):
+    texts, batch_size, candidate_labels = shard
+    # The parent process owns the cache; workers only run the model
+    results = _classify_uncached(texts, batch_size, candidate_labels, workers=1)
+    # Hand this shard's batch timings to the parent, which merges them into its registry
+    metrics_state = REGISTRY.dump()
+    REGISTRY.reset()
+    return results, metrics_state
+
+# One pool serves the whole run: creating it forks the workers and each loads the model, so
+# a pool per call would reload it for every table and every long-text window round.
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _prepare_model():
+    # Work the workers must not race on, done once in the parent before they start
+    if CLASSIFIER_BACKEND == 'onnx':
+        try:
+            from .onnx_backend import ensure_exported
+        except ImportError: # Imported as a top-level module
+            from onnx_backend import ensure_exported
+        ensure_exported(MODEL_NAME)
+
+def get_pool(workers):
+    """
+    Returns the shared process pool with `workers` workers, starting it on first use.
+    Asking for a different worker count replaces the pool.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown()
+            _pool = None
+        if _pool is None:
+            _prepare_model()
+            # Each worker gets an equal share of the machine's cores for torch's intra-op
+            # threads, so the workers don't oversubscribe
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+            # Fork where available so the workers don't re-run the calling script's top-level code
+            methods = multiprocessing.get_all_start_methods()
+            mp_context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                        initializer=_init_worker, initargs=(threads_per_worker,))
+            _pool_workers = workers
+        return _pool
+
+def shutdown_pool():
+    """Stops the shared pool's workers, if it was started."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+            _pool_workers = 0
+
+atexit.register(shutdown_pool)
+
+def _classify_in_pool(texts, workers, batch_size, candidate_labels):
+    """
+    Splits texts into contiguous shards over the shared process pool and returns the
+    results in input order. Each worker loads its own copy of the model once per run.
+    """
+    # A few shards per worker keeps them all busy when some shards hold longer texts
+    shard_size = max(batch_size, math.ceil(len(texts) / (workers * 4)))
+    shards = [
+        (texts[start:start + shard_size], batch_size, candidate_labels)
+        for start in range(0, len(texts), shard_size)
     ]
 
-    # Perform the classification
-    result = classifier(comment_text, candidate_labels)
+    # executor.map yields shard results in submission order, so the merge is deterministic
+    results = []
+    for shard_results, metrics_state in get_pool(workers).map(_classify_shard, shards):
+        results.extend(shard_results)
+        REGISTRY.merge(metrics_state)
+    return results
+
+def _classify_uncached(texts, batch_size, candidate_labels, workers):
+    """Runs the model over texts, in this process or in a pool. No cache involved."""
+    if workers > 1 and len(texts) > batch_size:
+        return _classify_in_pool(texts, workers, batch_size, candidate_labels)
+    # Only load the model when something actually needs classifying
+    classifier = get_classifier()
+    if not classifier:
+        return [("Model_Load_Error", 0.0)] * len(texts) # Return default error if model failed to load
+    return _run_pipeline(classifier, texts, batch_size, candidate_labels)
+
+def _store_results(cache, texts, results, candidate_labels, model_id=None):
+    # Never persist load failures, so the next run retries those texts
+    cacheable = [(text, result) for text, result in zip(texts, results) if result[0] != "Model_Load_Error"]
+    if cacheable:
+        cache.put_many([text for text, _ in cacheable], [result for _, result in cacheable],
+                       model_id if model_id is not None else MODEL_ID, candidate_labels)
+
+def classify_fatigue_comments(texts, batch_size=DEFAULT_BATCH_SIZE, candidate_labels=None, cache=None, workers=1):
+    """
+    Classifies many texts with the zero-shot pipeline in batches.
+
+    Previously classified texts are answered from the on-disk cache. The rest are
+    sorted by token length before batching so each batch pads to a similar length,
+    then the results are put back into the original order.
+
+    Args:
+        texts (list): The texts to classify.
+        batch_size (int): How many texts are sent to the pipeline per call.
+        candidate_labels (list): Labels to choose from. Defaults to CANDIDATE_LABELS.
+        cache (ClassificationCache): Cache to use. Defaults to get_default_cache();
+                                     pass False to bypass caching.
+        workers (int): Number of processes to shard uncached texts over. 1 classifies in
+                       this process.
+
+    Returns:
+        list: One (predicted_label, confidence_score) tuple per input text, in input order.
+    """
+    with CALL_SECONDS.time():
+        return _classify_fatigue_comments(texts, batch_size, candidate_labels, cache, workers)
+
+def _classify_fatigue_comments(texts, batch_size, candidate_labels, cache, workers, counter=ROWS_CLASSIFIED):
+    # `counter` gets the cache/model split; long-text windows count under their own metric
+    texts = [str(text) for text in texts]
+    if candidate_labels is None:
+        candidate_labels = CANDIDATE_LABELS
+    if cache is None:
+        cache = get_default_cache()
+    elif cache is False:
+        cache = None
+
+    results = [None] * len(texts)
+    if cache is not None:
+        for i, result in cache.get_many(texts, MODEL_ID, candidate_labels).items():
+            results[i] = result
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    counter.inc(len(texts) - len(missing), tier='cache')
+    if not missing:
+        return results
+
+    missing_texts = [texts[i] for i in missing]
+    new_results = _classify_uncached(missing_texts, batch_size, candidate_labels, workers)
+    for i, result in zip(missing, new_results):
+        results[i] = result
+    if cache is not None:
+        _store_results(cache, missing_texts, new_results, candidate_labels)
+    counter.inc(len(missing), tier='model')
+
+    return results
+
+def classify_fatigue_comment(comment_text):
+    """Classifies a single text. Returns (predicted_label, confidence_score)."""
+    return classify_fatigue_comments([comment_text], batch_size=1)[0]
+
+# --- Long Inputs ---
+# The model only reads its first 1024 tokens, and long posts are also the most expensive
+# rows. Long-text mode splits a text into token-bounded windows (each one starting with the
+# post title), scores the windows in order, and stops at the first one whose top label
+# clears the early-exit threshold. If none does, the windows' results are max-pooled.
+MODEL_MAX_TOKENS = 1024 # bart-large-mnli's input length
+# Room the pipeline needs next to the text: the "This example is {label}." hypothesis for
+# the longest candidate label, plus the special tokens around the pair
+HYPOTHESIS_TOKENS = 32
+# By default a window is everything the model can read in one pass, so only texts that
+# were being truncated are windowed; shorter texts are classified whole, exactly as before.
+LONG_TEXT_WINDOW_TOKENS = int(os.environ.get('LONG_TEXT_WINDOW_TOKENS', str(MODEL_MAX_TOKENS - HYPOTHESIS_TOKENS)))
+LONG_TEXT_OVERLAP_TOKENS = 32
+MIN_BODY_TOKENS = 32 # Every window carries at least this much body text, however long the title
+
+LONG_TEXT_TOKENS = REGISTRY.counter('classifier_long_text_tokens_total',
+                                    "Tokens in long texts, by whether a window containing them was scored.", ['outcome'])
+LONG_TEXT_EARLY_EXITS = REGISTRY.counter('classifier_long_text_early_exits_total',
+                                         "Long texts decided before their last window.")
+# Windows, not rows: the cascade counts each long row once in classifier_rows_total
+LONG_TEXT_WINDOWS = REGISTRY.counter('classifier_long_text_windows_total',
+                                     "Long-text windows scored, by whether the cache or the model answered.", ['tier'])
+
+_tokenizer = None
+_tokenizer_loaded = False
+
+def get_tokenizer():
+    """The model's tokenizer (loaded on its own, without the model). None if it can't be loaded."""
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        with _classifier_lock:
+            if not _tokenizer_loaded:
+                try:
+                    from transformers import AutoTokenizer
+                    _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+                except Exception as e:
+                    print(f"Error loading tokenizer, counting words instead of tokens: {e}")
+                    _tokenizer = None
+                _tokenizer_loaded = True
+    return _tokenizer
+
+def _tokenize(tokenizer, text):
+    if tokenizer is None:
+        return text.split()
+    return tokenizer(text, add_special_tokens=False)['input_ids']
+
+def _detokenize(tokenizer, tokens):
+    if tokenizer is None:
+        return ' '.join(tokens)
+    return tokenizer.decode(tokens, skip_special_tokens=True)
+
+class LongTextOptions:
+    """
+    Args:
+        window_tokens (int): Tokens per window, title included.
+        overlap_tokens (int): Tokens each window repeats from the end of the previous one,
+                              so a phrase cut at a boundary is still seen whole.
+        early_exit_threshold (float): Stop at the first window whose top score reaches
+                                      this (None = score every window).
+        max_windows (int): Most windows scored per text (None = all).
+    """
+
+    def __init__(self, window_tokens=LONG_TEXT_WINDOW_TOKENS, overlap_tokens=LONG_TEXT_OVERLAP_TOKENS,
+                 early_exit_threshold=0.7, max_windows=None):
+        self.window_tokens = window_tokens
+        self.overlap_tokens = min(overlap_tokens, window_tokens // 2)
+        self.early_exit_threshold = early_exit_threshold
+        self.max_windows = max_windows
+
+    @property
+    def cache_model_id(self):
+        """Cache identity of windowed results, so they never mix with whole-text ones."""
+        return f"{MODEL_ID}+windows({self.window_tokens},{self.overlap_tokens},{self.early_exit_threshold},{self.max_windows})"
+
+def split_windows(text, title, options, tokenizer=None):
+    """
+    Splits `text` into windows of at most options.window_tokens tokens, each starting with
+    `title`. If `text` itself starts with the title, it is not repeated.
+
+    Returns:
+        list: (window_text, token_count) tuples, in reading order.
+    """
+    title = (title or '').strip()
+    body = text[len(title):] if title and text.startswith(title) else text
+    title_tokens = len(_tokenize(tokenizer, title)) if title else 0
+    body_tokens = _tokenize(tokenizer, body)
+    step_tokens = max(MIN_BODY_TOKENS, options.window_tokens - title_tokens)
+    stride = max(1, step_tokens - options.overlap_tokens)
+
+    windows = []
+    for start in range(0, max(1, len(body_tokens)), stride):
+        chunk = body_tokens[start:start + step_tokens]
+        window = (title + ' ' + _detokenize(tokenizer, chunk)).strip() if title else _detokenize(tokenizer, chunk)
+        windows.append((window, title_tokens + len(chunk)))
+        if start + step_tokens >= len(body_tokens):
+            break
+    return windows
+
+def classify_long_texts(texts, titles=None, options=None, batch_size=DEFAULT_BATCH_SIZE, candidate_labels=None,
+                        cache=None, workers=1):
+    """
+    Classifies long texts window by window with early exit.
+
+    Windows are scored in rounds (the first window of every text, then the second window
+    of texts still undecided, ...) so batches stay full. Windows are cached like any other
+    text, and counted in classifier_long_text_windows_total rather than classifier_rows_total.
+
+    Args:
+        texts (list): Texts to classify.
+        titles (list): Post title per text (None = no title), put at the start of every window.
+        options (LongTextOptions): Window size, overlap and early-exit threshold.
+        Other arguments as for classify_fatigue_comments().
+
+    Returns:
+        tuple: (results, report). `results` holds one (label, confidence) per text. `report`
+               counts 'texts', 'windows' / 'windows_scored', 'tokens' / 'tokens_scored'
+               and 'early_exits'.
+    """
+    options = options if options is not None else LongTextOptions()
+    titles = titles if titles is not None else [None] * len(texts)
+    tokenizer = get_tokenizer()
+    windows = [split_windows(str(text), title, options, tokenizer) for text, title in zip(texts, titles)]
+    if options.max_windows is not None:
+        windows = [text_windows[:options.max_windows] for text_windows in windows]
+
+    results = [None] * len(texts)
+    best = [None] * len(texts)
+    report = {'texts': len(texts), 'windows': sum(len(w) for w in windows), 'windows_scored': 0,
+              'tokens': sum(count for w in windows for _, count in w), 'tokens_scored': 0, 'early_exits': 0}
+    open_rows = list(range(len(texts)))
+    round_index = 0
+    while open_rows:
+        round_results = _classify_fatigue_comments([windows[i][round_index][0] for i in open_rows],
+                                                   batch_size, candidate_labels, cache, workers, LONG_TEXT_WINDOWS)
+        still_open = []
+        for i, (label, score) in zip(open_rows, round_results):
+            report['windows_scored'] += 1
+            report['tokens_scored'] += windows[i][round_index][1]
+            if best[i] is None or score > best[i][1]:
+                best[i] = (label, score)
+            last_window = round_index + 1 >= len(windows[i])
+            if options.early_exit_threshold is not None and score >= options.early_exit_threshold:
+                results[i] = (label, score)
+                if not last_window:
+                    report['early_exits'] += 1
+            elif last_window:
+                results[i] = best[i] # Max-pool: the most confident window's label
+            else:
+                still_open.append(i)
+        open_rows = still_open
+        round_index += 1
+
+    LONG_TEXT_TOKENS.inc(report['tokens_scored'], outcome='scored')
+    LONG_TEXT_TOKENS.inc(report['tokens'] - report['tokens_scored'], outcome='skipped')
+    LONG_TEXT_EARLY_EXITS.inc(report['early_exits'])
+    return results, report
+
+# --- Classification Cascade ---
+# Most rows that reach the model are junk or clearly off-topic. The cascade lets cheap
+# tiers decide those, and only the uncertain rows pay for the ~6 NLI forward passes:
+#   1. rules      - [deleted]/[removed]/trivially short texts
+#   2. cache      - texts the model has already labelled
+#   3. prefilter  - TF-IDF + logistic regression trained on cached model labels
+#   4. model      - the zero-shot pipeline
+GENERAL_LABEL = "general peptide discussion, no fatigue mentioned"
+IRRELEVANT_LABEL = "irrelevant or other topic"
+REMOVED_MARKERS = {"[deleted]", "[removed]"}
+
+def rule_based_label(text, min_words=3, rule_confidence=0.0):
+    """
+    Labels texts that don't need a model at all. Returns (label, confidence) or None.
+
+    The default confidence of 0.0 keeps these rows out of the high-confidence exports.
+    """
+    stripped = str(text).strip()
+    if not stripped or stripped.lower() in REMOVED_MARKERS or len(stripped.split()) < min_words:
+        return IRRELEVANT_LABEL, rule_confidence
+    return None
+
+class PrefilterModel:
+    """
+    A lightweight TF-IDF + logistic regression classifier trained on the zero-shot
+    model's own (cached) labels. Requires scikit-learn.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    @classmethod
+    def train(cls, texts, labels, max_features=50000):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+
+        model = make_pipeline(
+            TfidfVectorizer(lowercase=True, ngram_range=(1, 2), min_df=2, max_features=max_features, sublinear_tf=True),
+            LogisticRegression(max_iter=1000),
+        )
+        model.fit(texts, labels)
+        return cls(model)
+
+    @classmethod
+    def from_cache(cls, cache, candidate_labels=None, min_score=0.5, max_examples=200000, min_examples=500):
+        """
+        Trains on the most recent confidently-labelled examples in the cache.
+        Returns None if there isn't enough data (or scikit-learn isn't installed).
+        """
+        if candidate_labels is None:
+            candidate_labels = CANDIDATE_LABELS
+        examples = cache.labelled_examples(MODEL_ID, candidate_labels, min_score=min_score, limit=max_examples)
+        labels = [label for _, label, _ in examples]
+        if len(examples) < min_examples or len(set(labels)) < 2:
+            print(f"Not enough cached labels to train the prefilter ({len(examples)} examples).")
+            return None
+        try:
+            return cls.train([text for text, _, _ in examples], labels)
+        except ImportError:
+            print("scikit-learn is not installed; skipping the prefilter tier.")
+            return None
+
+    def predict(self, texts):
+        """Returns one (label, probability) tuple per text."""
+        probabilities = self.model.predict_proba(texts)
+        classes = self.model.classes_
+        return [(classes[row.argmax()], float(row.max())) for row in probabilities]
+
+class ClassificationCascade:
+    """
+    Runs texts through the cascade tiers and keeps count of how many each tier decided.
+
+    Args:
+        prefilter (PrefilterModel): Optional cheap model. Without it that tier is skipped.
+        prefilter_labels (iterable): Labels the prefilter is allowed to assign on its own.
+        prefilter_threshold (float): Minimum prefilter probability to accept its label.
+        min_words (int): Texts with fewer words are decided by the rules tier.
+        rule_confidence (float): Confidence recorded for rule-decided rows.
+        long_text (LongTextOptions): If given, texts longer than one window are classified
+                                     window by window with classify_long_texts().
+    """
+
+    TIERS = ('rules', 'cache', 'prefilter', 'model')
+
+    def __init__(self, prefilter=None, prefilter_labels=(GENERAL_LABEL, IRRELEVANT_LABEL),
+                 prefilter_threshold=0.9, min_words=3, rule_confidence=0.0, long_text=None):
+        self.prefilter = prefilter
+        self.long_text = long_text
+        self.long_text_report = {'texts': 0, 'windows': 0, 'windows_scored': 0, 'tokens': 0, 'tokens_scored': 0,
+                                 'early_exits': 0}
+        self.prefilter_labels = set(prefilter_labels)
+        self.prefilter_threshold = prefilter_threshold
+        self.min_words = min_words
+        self.rule_confidence = rule_confidence
+        self.tier_counts = {tier: 0 for tier in self.TIERS}
+
+    def _is_long(self, text):
+        if self.long_text is None:
+            return False
+        # Word count is a cheap lower bound on the token count
+        if len(text.split()) > self.long_text.window_tokens:
+            return True
+        return len(_tokenize(get_tokenizer(), text)) > self.long_text.window_tokens
+
+    def _lookup(self, cache, texts, rows, long_rows, candidate_labels):
+        # Windowed results are cached under their own model ID
+        found = {}
+        for subset, model_id in (([i for i in rows if i not in long_rows], MODEL_ID),
+                                 ([i for i in rows if i in long_rows],
+                                  self.long_text.cache_model_id if self.long_text else None)):
+            if subset:
+                cached = cache.get_many([texts[i] for i in subset], model_id, candidate_labels)
+                found.update({subset[position]: result for position, result in cached.items()})
+        return found
+
+    def classify(self, texts, batch_size=DEFAULT_BATCH_SIZE, candidate_labels=None, cache=None, workers=1, titles=None):
+        """
+        Same contract as classify_fatigue_comments: (label, confidence) per text, in input order.
+        `titles` (one per text) are used by long-text mode to start every window with the post title.
+        """
+        return self.classify_with_tiers(texts, batch_size, candidate_labels, cache, workers, titles)[0]
+
+    def classify_with_tiers(self, texts, batch_size=DEFAULT_BATCH_SIZE, candidate_labels=None, cache=None, workers=1,
+                            titles=None):
+        """
+        Like classify(), but also reports which tier decided each row.
+
+        Returns:
+            tuple: (results, tiers). `tiers` holds one of TIERS per text. Only 'cache' and
+                   'model' confidences are zero-shot scores; 'prefilter' ones are the cheap
+                   model's probabilities, on a different scale.
+        """
+        texts = [str(text) for text in texts]
+        if candidate_labels is None:
+            candidate_labels = CANDIDATE_LABELS
+        if cache is None:
+            cache = get_default_cache()
+        elif cache is False:
+            cache = None
+        results = [None] * len(texts)
+        tiers = [None] * len(texts)
+
+        for i, text in enumerate(texts):
+            results[i] = rule_based_label(text, self.min_words, self.rule_confidence)
+            if results[i] is not None:
+                tiers[i] = 'rules'
+        pending = [i for i, result in enumerate(results) if result is None]
+        self.tier_counts['rules'] += len(texts) - len(pending)
+        ROWS_CLASSIFIED.inc(len(texts) - len(pending), tier='rules')
+
+        long_rows = {i for i in pending if self._is_long(texts[i])}
+
+        if cache is not None and pending:
+            cached = self._lookup(cache, texts, pending, long_rows, candidate_labels)
+            for i, result in cached.items():
+                results[i] = result
+                tiers[i] = 'cache'
+            pending = [i for i in pending if results[i] is None]
+            self.tier_counts['cache'] += len(cached)
+            ROWS_CLASSIFIED.inc(len(cached), tier='cache')
+
+        if self.prefilter is not None and pending:
+            decided = 0
+            for i, (label, probability) in zip(pending, self.prefilter.predict([texts[i] for i in pending])):
+                if label in self.prefilter_labels and probability >= self.prefilter_threshold:
+                    results[i] = (label, probability)
+                    tiers[i] = 'prefilter'
+                    decided += 1
+            pending = [i for i in pending if results[i] is None]
+            self.tier_counts['prefilter'] += decided
+            ROWS_CLASSIFIED.inc(decided, tier='prefilter')
+
+        short_pending = [i for i in pending if i not in long_rows]
+        if short_pending:
+            pending_texts = [texts[i] for i in short_pending]
+            new_results = _classify_uncached(pending_texts, batch_size, candidate_labels, workers)
+            for i, result in zip(short_pending, new_results):
+                results[i] = result
+            if cache is not None:
+                _store_results(cache, pending_texts, new_results, candidate_labels)
+
+        long_pending = [i for i in pending if i in long_rows]
+        if long_pending:
+            pending_texts = [texts[i] for i in long_pending]
+            new_results, report = classify_long_texts(
+                pending_texts, [titles[i] for i in long_pending] if titles is not None else None, self.long_text,
+                batch_size, candidate_labels, cache if cache is not None else False, workers)
+            for i, result in zip(long_pending, new_results):
+                results[i] = result
+            for key, value in report.items():
+                self.long_text_report[key] += value
+            if cache is not None:
+                _store_results(cache, pending_texts, new_results, candidate_labels, self.long_text.cache_model_id)
+
+        if pending:
+            for i in pending:
+                tiers[i] = 'model'
+            self.tier_counts['model'] += len(pending)
+            ROWS_CLASSIFIED.inc(len(pending), tier='model')
 
-    # The result is a dictionary with 'sequence', 'labels', and 'scores'
-    # We want the label with the highest score
-    predicted_label = result['labels'][0]
-    confidence_score = result['scores'][0]
+        return results, tiers
 
-    return predicted_label, confidence_score
+    def tier_report(self):
+        """Returns, per tier, the number and fraction of rows it decided."""
+        total = sum(self.tier_counts.values())
+        return {
+            tier: {'rows': count, 'fraction': count / total if total else 0.0}
+            for tier, count in self.tier_counts.items()
+        }
 
 # Example Usage (for testing the classifier function independently)
 if __name__ == "__main__":
@@ -55,7 +679,6 @@ if __name__ == "__main__":
     ]
 
     print("--- Running Classification Examples ---")
-    for i, comment in enumerate(test_comments):
+    for i, (comment, (label, score)) in enumerate(zip(test_comments, classify_fatigue_comments(test_comments))):
         print(f"\nComment {i+1}: \"{comment}\"")
-        label, score = classify_fatigue_comment(comment)
         print(f"  Predicted Label: '{label}' (Confidence: {score:.2f})")
\ No newline at end of file
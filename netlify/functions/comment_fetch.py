@@ -0,0 +1,86 @@
+# netlify/functions/comment_fetch.py
+#
+# How much of each post's comment tree to download. The sort and the per-post cap are
+# set on the submission before its comments are first loaded, so PRAW sends them with the
+# request (sort=..., limit=...) and Reddit only returns the comments we keep, instead of
+# the whole tree being transferred and parsed and most of it thrown away.
+import os
+
+COMMENT_SORTS = ('confidence', 'best', 'top', 'new', 'controversial', 'old', 'q&a')
+
+# Expanding every "load more" stub (replace_more_limit=None) makes an unknown number of
+# requests, so it is charged as this many up front: PRAW's own default expansion limit,
+# more than most threads need. Any overshoot on huge threads still shows up in Reddit's
+# rate-limit headers, which AdaptiveRateLimiter reads after each fetch.
+REPLACE_MORE_ALL_COST = 32
+
+
+class CommentFetchOptions:
+    """
+    Args:
+        sort (str): Comment order Reddit returns, one of COMMENT_SORTS (None = Reddit's default).
+        limit (int): Most comments kept per post (None = no cap). Sent as the request's
+                     comment limit.
+        depth (int): Deepest reply level kept; 0 = top-level comments only (None = any).
+                     PRAW can't send this one, so deeper comments are skipped after download.
+        replace_more_limit (int): "load more comments" stubs to expand per post, each one an
+                                  extra request (0 = none, None = all of them, budgeted as
+                                  REPLACE_MORE_ALL_COST).
+    """
+
+    def __init__(self, sort=None, limit=None, depth=None, replace_more_limit=0):
+        if sort is not None and sort not in COMMENT_SORTS:
+            raise ValueError(f"Unknown comment sort '{sort}'. Use one of {', '.join(COMMENT_SORTS)}.")
+        self.sort = sort
+        self.limit = limit
+        self.depth = depth
+        self.replace_more_limit = replace_more_limit
+
+    @classmethod
+    def from_env(cls, sort=None, limit=None, depth=None, replace_more_limit=0):
+        """
+        Options from COMMENT_SORT, COMMENT_LIMIT, COMMENT_DEPTH and COMMENT_REPLACE_MORE,
+        falling back to the given defaults. 'none' (or 'all' for COMMENT_REPLACE_MORE) means no cap.
+        """
+        def number(name, default):
+            value = os.environ.get(name)
+            if value is None:
+                return default
+            return None if value.lower() in ('none', 'all') else int(value)
+
+        return cls(sort=os.environ.get('COMMENT_SORT', sort), limit=number('COMMENT_LIMIT', limit),
+                   depth=number('COMMENT_DEPTH', depth),
+                   replace_more_limit=number('COMMENT_REPLACE_MORE', replace_more_limit))
+
+    @property
+    def request_cost(self):
+        """Requests one post's comment fetch can make: the tree itself plus each stub expanded."""
+        if self.replace_more_limit is None:
+            return 1 + REPLACE_MORE_ALL_COST
+        return 1 + self.replace_more_limit
+
+
+def iter_comments(submission, options):
+    """
+    Downloads a submission's comments as `options` describes and yields the kept ones
+    (never "load more" stubs), shallowest first, stopping at the per-post cap.
+
+    Must be called before anything else touches `submission.comments`: the sort and limit
+    only apply to the request that first loads them.
+    """
+    if options.sort is not None:
+        submission.comment_sort = options.sort
+    if options.limit is not None:
+        submission.comment_limit = options.limit
+    submission.comments.replace_more(limit=options.replace_more_limit)
+
+    kept = 0
+    for comment in submission.comments.list():
+        if type(comment).__name__ == 'MoreComments':
+            continue
+        if options.depth is not None and (getattr(comment, 'depth', 0) or 0) > options.depth:
+            continue
+        yield comment
+        kept += 1
+        if options.limit is not None and kept >= options.limit:
+            return
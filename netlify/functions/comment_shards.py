@@ -0,0 +1,76 @@
+# netlify/functions/comment_shards.py
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+# Written next to get-comments.js, which serves them (see netlify.toml included_files)
+SHARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'comments')
+MANIFEST_NAME = 'manifest.json'
+
+
+def category_slug(label):
+    """File-name-safe form of a classification label."""
+    return re.sub(r'[^a-z0-9]+', '-', label.lower()).strip('-')
+
+
+def shard_sort_key(comment):
+    """Highest confidence first; comment ID breaks ties so page cursors are stable."""
+    return (-comment['classification_confidence'], str(comment['comment_id']))
+
+
+def _write_file(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def write_category_shards(comments, shard_dir=SHARD_DIR):
+    """
+    Splits comments into one compact JSON file per `fatigue_classification`, each sorted by
+    confidence, plus a small manifest the serving function reads first.
+
+    Args:
+        comments (list): Comment dicts (JSON-safe values) with at least comment_id,
+                         fatigue_classification and classification_confidence.
+        shard_dir (str): Output directory. Shards for categories that no longer have any
+                         comments are removed.
+
+    Returns:
+        dict: The manifest: {'generated_at', 'total', 'categories': {label: {'file', 'count',
+              'version', 'max_confidence', 'min_confidence'}}}. `version` is a content hash,
+              used by the function for ETags.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    by_category = {}
+    for comment in comments:
+        by_category.setdefault(comment['fatigue_classification'], []).append(comment)
+
+    categories = {}
+    for label, category_comments in sorted(by_category.items()):
+        category_comments.sort(key=shard_sort_key)
+        data = json.dumps(category_comments, separators=(',', ':')).encode('utf-8')
+        file_name = category_slug(label) + '.json'
+        _write_file(os.path.join(shard_dir, file_name), data)
+        categories[label] = {
+            'file': file_name,
+            'count': len(category_comments),
+            'version': hashlib.sha256(data).hexdigest()[:16],
+            'max_confidence': category_comments[0]['classification_confidence'],
+            'min_confidence': category_comments[-1]['classification_confidence'],
+        }
+
+    current_files = {entry['file'] for entry in categories.values()} | {MANIFEST_NAME}
+    for file_name in os.listdir(shard_dir):
+        if file_name.endswith('.json') and file_name not in current_files:
+            os.remove(os.path.join(shard_dir, file_name))
+
+    manifest = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'total': len(comments),
+        'categories': categories,
+    }
+    _write_file(os.path.join(shard_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
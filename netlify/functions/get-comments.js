@@ -1,40 +1,131 @@
-// This is the correct, simple version that matches your frontend script.
-// It just finds the comments and sends them back in a simple array.
+// Serves the high-confidence comments for one category, a page at a time.
+// final_analysis.py writes one JSON shard per category (sorted by confidence) plus a
+// manifest into ./comments; shards are loaded on first use and kept for warm invocations.
+//
+// GET get-comments?category=cognitive[&limit=20][&cursor=...]
+//   -> { category, total, items: [...], next_cursor }   (next_cursor is null on the last page)
 
-const allComments = require('./comments.json');
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+const crypto = require('crypto');
 
-exports.handler = async (event) => {
-  const category = event.queryStringParameters.category;
+const SHARD_DIR = path.join(__dirname, 'comments');
+const DEFAULT_LIMIT = 20;
+const MAX_LIMIT = 100;
 
-  if (!category) {
+const classificationMap = {
+  'cognitive': 'cognitive fatigue related to peptides',
+  'physical': 'physical fatigue related to peptides',
+  'emotional': 'emotional fatigue related to peptides',
+  'general': 'general peptide discussion, no fatigue mentioned',
+  'fatigue-not-peptides': 'fatigue mentioned, but not related to peptides',
+  'irrelevant': 'irrelevant or other topic'
+};
+
+let manifest = null;
+const shards = {};
+
+function loadManifest() {
+  if (!manifest) {
+    manifest = JSON.parse(fs.readFileSync(path.join(SHARD_DIR, 'manifest.json'), 'utf8'));
+  }
+  return manifest;
+}
+
+function loadShard(file) {
+  if (!shards[file]) {
+    shards[file] = JSON.parse(fs.readFileSync(path.join(SHARD_DIR, file), 'utf8'));
+  }
+  return shards[file];
+}
+
+// A cursor is the (confidence, comment_id) of the last comment on the previous page, so
+// pages stay consistent even if the client holds a cursor across a redeploy.
+function encodeCursor(comment) {
+  return Buffer.from(JSON.stringify([comment.classification_confidence, String(comment.comment_id)])).toString('base64url');
+}
+
+function decodeCursor(cursor) {
+  try {
+    const [confidence, commentId] = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+    if (typeof confidence !== 'number' || typeof commentId !== 'string') return null;
+    return { confidence, commentId };
+  } catch (error) {
+    return null;
+  }
+}
+
+// Shards are sorted by confidence descending, then comment_id ascending.
+// Returns the index of the first comment that comes after the cursor (binary search).
+function startIndex(comments, cursor) {
+  let low = 0;
+  let high = comments.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    const comment = comments[mid];
+    const before = comment.classification_confidence > cursor.confidence ||
+      (comment.classification_confidence === cursor.confidence && String(comment.comment_id) <= cursor.commentId);
+    if (before) low = mid + 1; else high = mid;
+  }
+  return low;
+}
+
+function respond(event, statusCode, payload, etag) {
+  const headers = {
+    'Content-Type': 'application/json',
+    'Cache-Control': 'public, max-age=0, must-revalidate',
+    'Vary': 'Accept-Encoding'
+  };
+  if (etag) headers['ETag'] = etag;
+  const body = JSON.stringify(payload);
+
+  const acceptEncoding = (event.headers && event.headers['accept-encoding']) || '';
+  if (acceptEncoding.includes('gzip')) {
     return {
-      statusCode: 400,
-      body: JSON.stringify({ error: 'A "category" parameter is required.' }),
+      statusCode,
+      headers: { ...headers, 'Content-Encoding': 'gzip' },
+      body: zlib.gzipSync(body).toString('base64'),
+      isBase64Encoded: true
     };
   }
-  
-  const classificationMap = {
-    'cognitive': 'cognitive fatigue related to peptides',
-    'physical': 'physical fatigue related to peptides',
-    'emotional': 'emotional fatigue related to peptides',
-    'general': 'general peptide discussion, no fatigue mentioned',
-    'fatigue-not-peptides': 'fatigue mentioned, but not related to peptides',
-    'irrelevant': 'irrelevant or other topic'
-  };
+  return { statusCode, headers, body };
+}
+
+exports.handler = async (event) => {
+  const params = event.queryStringParameters || {};
+  const category = params.category;
+
+  if (!category) {
+    return respond(event, 400, { error: 'A "category" parameter is required.' });
+  }
+
+  const requestedLimit = parseInt(params.limit, 10);
+  const limit = Math.min(MAX_LIMIT, Math.max(1, Number.isNaN(requestedLimit) ? DEFAULT_LIMIT : requestedLimit));
+  const cursor = params.cursor ? decodeCursor(params.cursor) : null;
+  if (params.cursor && !cursor) {
+    return respond(event, 400, { error: 'Invalid "cursor" parameter.' });
+  }
 
   const targetClassification = classificationMap[category.toLowerCase()];
+  const entry = targetClassification && loadManifest().categories[targetClassification];
+  if (!entry) {
+    // Unknown category, or no comments in it
+    return respond(event, 200, { category, total: 0, items: [], next_cursor: null });
+  }
 
-  if (!targetClassification) {
-    return { statusCode: 200, body: JSON.stringify([]) }; // Return empty array if no match
+  // The shard's content hash identifies the data; the page is fixed by cursor and limit
+  const etag = '"' + crypto.createHash('sha256')
+    .update(`${entry.version}|${params.cursor || ''}|${limit}`).digest('hex').slice(0, 32) + '"';
+  const ifNoneMatch = event.headers && event.headers['if-none-match'];
+  if (ifNoneMatch && ifNoneMatch === etag) {
+    return { statusCode: 304, headers: { 'ETag': etag, 'Cache-Control': 'public, max-age=0, must-revalidate' }, body: '' };
   }
 
-  const filteredComments = allComments.filter(comment => 
-    comment.fatigue_classification === targetClassification
-  );
+  const comments = loadShard(entry.file);
+  const start = cursor ? startIndex(comments, cursor) : 0;
+  const items = comments.slice(start, start + limit);
+  const nextCursor = start + limit < comments.length ? encodeCursor(items[items.length - 1]) : null;
 
-  return {
-    statusCode: 200,
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(filteredComments),
-  };
-};
\ No newline at end of file
+  return respond(event, 200, { category, total: entry.count, items, next_cursor: nextCursor }, etag);
+};
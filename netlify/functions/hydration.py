@@ -0,0 +1,105 @@
+# netlify/functions/hydration.py
+#
+# Bulk refresh of stored posts and comments. Reddit's /api/info endpoint returns up to
+# 100 things per request by fullname (t3_<post id>, t1_<comment id>), so refreshing the
+# score and comment count of N stored items costs about N / 100 requests instead of one
+# request per item.
+try:
+    from .metrics import REGISTRY
+    from .rate_limit import AdaptiveRateLimiter
+except ImportError: # Imported as a top-level module
+    from metrics import REGISTRY
+    from rate_limit import AdaptiveRateLimiter
+
+INFO_BATCH_SIZE = 100 # Most fullnames Reddit accepts in one /api/info request
+POST_PREFIX = 't3_'
+COMMENT_PREFIX = 't1_'
+
+HYDRATED = REGISTRY.counter('hydrated_items_total', "Stored posts/comments refreshed from /api/info.", ['kind'])
+HYDRATION_MISSING = REGISTRY.counter('hydration_missing_total',
+                                     "Stored posts/comments /api/info did not return (deleted or unavailable).",
+                                     ['kind'])
+INFO_SECONDS = REGISTRY.histogram('reddit_info_request_seconds', "Latency of one /api/info batch.")
+
+
+def to_fullname(item_id, prefix):
+    """'abc123' -> 't3_abc123'. IDs that already carry the prefix are returned unchanged."""
+    item_id = str(item_id)
+    return item_id if item_id.startswith(prefix) else prefix + item_id
+
+
+def _unique(ids):
+    # Keeps the first occurrence of each ID, skipping blanks (NaN from missing cells)
+    seen = set()
+    unique = []
+    for item_id in ids:
+        if item_id is None or item_id != item_id or item_id == '':
+            continue
+        if item_id not in seen:
+            seen.add(item_id)
+            unique.append(item_id)
+    return unique
+
+
+def _fetch_info(reddit, fullnames):
+    with INFO_SECONDS.time():
+        return list(reddit.info(fullnames=fullnames))
+
+
+def iter_info(reddit, fullnames, limiter=None, batch_size=INFO_BATCH_SIZE):
+    """
+    Looks up things by fullname in batches, one rate-limited request per batch.
+
+    Args:
+        reddit: A praw.Reddit client (or anything with `info(fullnames=...)`).
+        fullnames (list): Fullnames such as 't3_abc123'.
+        limiter (RateLimiter): Request budget. An AdaptiveRateLimiter is created if omitted.
+        batch_size (int): Fullnames per request (Reddit's maximum is 100).
+
+    Yields:
+        list: The things Reddit returned for each batch. Deleted or inaccessible items
+              are simply absent.
+    """
+    limiter = limiter if limiter is not None else AdaptiveRateLimiter()
+    for start in range(0, len(fullnames), batch_size):
+        try:
+            yield limiter.call(_fetch_info, reddit, fullnames[start:start + batch_size])
+        finally:
+            # PRAW records the rate-limit headers of the latest response here
+            limiter.update(getattr(getattr(reddit, 'auth', None), 'limits', None))
+
+
+def hydrate(reddit, post_ids=(), comment_ids=(), limiter=None, batch_size=INFO_BATCH_SIZE):
+    """
+    Fetches the current score (and, for posts, comment count) of stored posts and comments.
+
+    Args:
+        reddit: A praw.Reddit client.
+        post_ids (iterable): Post IDs as stored in the tables (with or without 't3_').
+        comment_ids (iterable): Comment IDs as stored in the tables (with or without 't1_').
+        limiter (RateLimiter): Request budget shared by every batch.
+        batch_size (int): Fullnames per /api/info request.
+
+    Returns:
+        tuple: (posts, comments). `posts` maps each post ID as given to
+               {'score': ..., 'num_comments': ...}; `comments` maps each comment ID to
+               {'score': ...}. IDs Reddit did not return are left out.
+    """
+    limiter = limiter if limiter is not None else AdaptiveRateLimiter()
+    results = {}
+    for kind, ids, prefix in (('post', post_ids, POST_PREFIX), ('comment', comment_ids, COMMENT_PREFIX)):
+        by_fullname = {to_fullname(item_id, prefix): item_id for item_id in _unique(ids)}
+        found = {}
+        for things in iter_info(reddit, list(by_fullname), limiter, batch_size):
+            for thing in things:
+                item_id = by_fullname.get(getattr(thing, 'fullname', None) or getattr(thing, 'name', None))
+                if item_id is None:
+                    continue
+                if kind == 'post':
+                    found[item_id] = {'score': thing.score, 'num_comments': thing.num_comments}
+                else:
+                    found[item_id] = {'score': thing.score}
+        HYDRATED.inc(len(found), kind=kind)
+        HYDRATION_MISSING.inc(len(by_fullname) - len(found), kind=kind)
+        results[kind] = found
+    return results['post'], results['comment']
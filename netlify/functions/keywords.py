@@ -0,0 +1,171 @@
+# netlify/functions/keywords.py
+import math
+import re
+from functools import lru_cache
+
+# --- Define Targeted Keyword Lists ---
+PEPTIDE_KEYWORDS = [
+    "peptide", "peptides", "noopept", "modafinil", "semaglutide", "tirzepatide",
+    "bpc-157", "tb-500", "cjc-1295", "ipamorelin", "dsip", "epitalon",
+    "ghrp", "melanotan", "sarms", "cortexin", "dihexa", "cerebrolysin", "selank",
+    "bpc", "thymosin", "nmn", "nr", "creatine", "choline", "alpha-gpc",
+    "agmatine", "pramiracetam", "aniracetam", "follistatin", "melanotan", "ipamorelin",
+    "gaba", "dopamine", "serotonin", "acetylcholine", "mk-677", "ghk-cu", "motc" # Added more
+]
+
+COGNITIVE_KEYWORDS = [
+    "cognitive", "brain fog", "focus", "concentration", "memory", "mental clarity",
+    "thinking", "mental energy", "alertness", "cognition", "neuroplasticity",
+    "learning", "attention", "mental performance", "mind", "mentally",
+    "sharpness", "clarity", "brain power", "mental slump", "slow thinking",
+    "recall", "retention", "executive function", "neuro", "brain", "acuity",
+    "cognition", "mental alertness" # Added more
+]
+
+FEELING_EXPERIENCE_KEYWORDS = [
+    "feel", "feeling", "felt", "experience", "experienced", "noticed", "my thoughts",
+    "how do you feel", "did anyone else", "impacts me", "effects on me", "my symptoms",
+    "i'm wondering", "i think", "i believe", "my take", "my experience", "personal account",
+    "improved", "worsened", "helped", "hurt", "effect", "struggle", "benefit", "side effect",
+    "drained", "exhausted", "tired", "fatigue", "burnt out", "my mood", "anxiety", "stress",
+    "depression", "irritable", "sleepy", "awake", "energy", "energetic", "lethargic",
+    "opinion", "feedback", "thoughts", "my state", "well-being", "mood swings", "brain dead",
+    "exhaustion", "weariness", "listless", "sluggish", "depressed", "stressed", "anxious",
+    "frustrated", "overwhelmed", "boosted", "uplifted", "calm", "relaxed" # Added more
+]
+
+
+def _keyword_pattern(keyword):
+    return r'\b' + re.escape(keyword) + r'\b'
+
+
+class KeywordMatcher:
+    """
+    Matches several named keyword lists against a text in a single regex scan.
+
+    Gives the same answer as running re.search(r'\\b' + re.escape(keyword) + r'\\b', ...)
+    for every keyword separately, including keywords that overlap each other
+    (e.g. "brain" inside "brain fog", or "energy" inside "mental energy").
+
+    Args:
+        keyword_groups (dict): Maps a group name (e.g. 'peptide') to its list of keywords.
+    """
+
+    def __init__(self, keyword_groups):
+        self.keyword_groups = {name: list(keywords) for name, keywords in keyword_groups.items()}
+
+        # Which groups each (lowercased) keyword belongs to
+        self._groups_for_keyword = {}
+        for name, keywords in self.keyword_groups.items():
+            for keyword in keywords:
+                self._groups_for_keyword.setdefault(keyword.lower(), set()).add(name)
+        all_keywords = list(self._groups_for_keyword)
+        self._max_keyword_length = max((len(keyword) for keyword in all_keywords), default=0)
+
+        # Longest alternatives first, so at any position the regex reports the longest
+        # keyword that matches there. Every shorter keyword that also matches at that
+        # position is a prefix of it, so we precompute those "implied" prefixes.
+        all_keywords.sort(key=len, reverse=True)
+        self._implied = {}
+        for keyword in all_keywords:
+            self._implied[keyword] = [
+                shorter for shorter in all_keywords
+                if len(shorter) < len(keyword) and re.match(_keyword_pattern(shorter), keyword)
+            ]
+
+        # Zero-width lookahead so overlapping matches at later positions are still found
+        alternation = '|'.join(re.escape(keyword) for keyword in all_keywords)
+        self._regex = re.compile(r'\b(?=(' + alternation + r')\b)')
+
+    def matched_terms(self, text):
+        """Returns the set of keywords (from any group) found in the text."""
+        if text is None or (isinstance(text, float) and math.isnan(text)):
+            return set()
+        text_lower = str(text).lower()
+        if not text_lower.strip():
+            return set()
+
+        found = set()
+        for match in self._regex.finditer(text_lower):
+            keyword = match.group(1)
+            if keyword not in found:
+                found.add(keyword)
+                found.update(self._implied[keyword])
+        return found
+
+    def junction_terms(self, left, right, separator=' '):
+        """
+        Returns the keywords that only match across the join of `left + separator + right`
+        (e.g. a comment ending in "brain" joined to a post starting with "fog"). Only the
+        few characters on either side of the join are scanned, so
+
+            matched_terms(left + separator + right)
+                == matched_terms(left) | matched_terms(right) | junction_terms(left, right)
+
+        without the joined string ever being built.
+        """
+        if not self._max_keyword_length:
+            return set()
+        tail = '' if left is None else str(left).lower()[-self._max_keyword_length:]
+        head = '' if right is None else str(right).lower()[:self._max_keyword_length]
+        window = tail + separator + head
+        join_start, join_end = len(tail), len(tail) + len(separator)
+
+        found = set()
+        for match in self._regex.finditer(window):
+            keyword = match.group(1)
+            start, end = match.start(), match.start() + len(keyword)
+            # Matches inside one side are found when that side is scanned on its own. One that
+            # crosses the separator is at most max_keyword_length long, so it (and the
+            # characters its \b checks look at) never reaches a truncated edge of the window.
+            if start < join_end and end > join_start:
+                found.add(keyword)
+                found.update(self._implied[keyword])
+        return found
+
+    def groups_for_terms(self, terms):
+        """Returns the set of group names the given matched keywords belong to."""
+        names = set()
+        for keyword in terms:
+            names.update(self._groups_for_keyword[keyword])
+        return names
+
+    def match(self, text):
+        """
+        Scans the text once and reports which groups hit and on which terms.
+
+        Returns:
+            dict: Group name -> sorted list of matched keywords. Only groups with
+                  at least one hit are included.
+        """
+        hits = {}
+        for keyword in self.matched_terms(text):
+            for name in self._groups_for_keyword[keyword]:
+                hits.setdefault(name, []).append(keyword)
+        return {name: sorted(terms) for name, terms in hits.items()}
+
+    def groups(self, text):
+        """Returns the set of group names with at least one keyword in the text."""
+        return set(self.match(text))
+
+
+# The matcher used by analyze_data.py for its three filters
+KEYWORD_MATCHER = KeywordMatcher({
+    'peptide': PEPTIDE_KEYWORDS,
+    'cognitive': COGNITIVE_KEYWORDS,
+    'feeling': FEELING_EXPERIENCE_KEYWORDS,
+})
+
+
+@lru_cache(maxsize=32)
+def _matcher_for(keywords):
+    return KeywordMatcher({'keywords': keywords})
+
+
+# --- Helper function for robust keyword checking ---
+def contains_any_keyword(text, keywords, debug_name=""):
+    """Returns True if any of the keywords appears in the text as a whole word."""
+    found_keywords = _matcher_for(tuple(keywords)).matched_terms(text)
+    # if found_keywords:
+    #     print(f"DEBUG: Found {debug_name} keywords: {sorted(found_keywords)} in text snippet: '{str(text).lower()[:100]}...'")
+    return bool(found_keywords)
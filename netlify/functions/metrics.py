@@ -0,0 +1,342 @@
+# netlify/functions/metrics.py
+#
+# Process-wide metrics shared by the scrapers, the classifier and the Flask app:
+# counters, gauges and histograms kept in one registry. app.py serves the registry at
+# /metrics in the Prometheus text format, and the batch scripts dump it to a JSON
+# summary with write_summary() when they finish.
+#
+# Metrics are declared once, at import time, by the module that updates them:
+#   REQUESTS = REGISTRY.counter('reddit_api_requests_total', "Reddit API requests.")
+#   REQUESTS.inc(cost)
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_DIR = os.environ.get('METRICS_DIR', 'metrics')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+RECENT_SAMPLES = 10000 # Observations per histogram kept for the p50/p99 estimates
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _quantile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric '{self.name}' takes labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def _summary_key(self, key):
+        return ','.join(f'{name}={value}' for name, value in zip(self.labelnames, key)) or 'all'
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """Prometheus text-format lines for this metric."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._sample_lines())
+        return lines
+
+
+class Counter(_Metric):
+    """A value that only goes up (requests made, seconds slept, rows processed)."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def total(self):
+        """Sum over every label combination."""
+        with self._lock:
+            return sum(self._values.values())
+
+    def _sample_lines(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}" for key, value in items]
+
+    def summary(self, elapsed):
+        with self._lock:
+            items = sorted(self._values.items())
+        values = {self._summary_key(key): value for key, value in items}
+        total = sum(values.values())
+        return {'total': total, 'per_second': total / elapsed if elapsed > 0 else None,
+                **({'by_label': values} if self.labelnames else {})}
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, state):
+        with self._lock:
+            for key, value in state:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. Pass `fn` to compute it when read instead of setting
+    it (e.g. a cache hit rate).
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), fn=None):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        if self.fn is not None:
+            return self.fn()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _items(self):
+        if self.fn is not None:
+            return [((), self.fn())]
+        with self._lock:
+            return sorted(self._values.items())
+
+    def _sample_lines(self):
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}" for key, value in self._items()]
+
+    def summary(self, elapsed):
+        items = self._items()
+        if not self.labelnames:
+            return items[0][1] if items else None
+        return {self._summary_key(key): value for key, value in items}
+
+    def dump(self):
+        return []
+
+    def merge(self, state):
+        pass
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (latencies, batch sizes). Exported as cumulative
+    Prometheus buckets; the summary reports p50/p99 over the last RECENT_SAMPLES observations.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _state(self, key):
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0,
+                                         'recent': deque(maxlen=RECENT_SAMPLES)}
+        return state
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._state(key)
+            state['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            state['sum'] += value
+            state['count'] += 1
+            state['recent'].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the seconds spent in the `with` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantile(self, q, **labels):
+        """Estimate of the q-quantile from recent observations, or None if there are none."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return _quantile(list(state['recent']), q) if state else None
+
+    def _sample_lines(self):
+        lines = []
+        with self._lock:
+            items = sorted((key, dict(state, counts=list(state['counts']))) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {state['count']}")
+        return lines
+
+    def summary(self, elapsed):
+        summaries = {}
+        with self._lock:
+            items = [(key, state['count'], state['sum'], list(state['recent'])) for key, state in self._values.items()]
+        for key, count, total, recent in sorted(items):
+            summaries[self._summary_key(key)] = {
+                'count': count, 'sum': total, 'mean': total / count if count else None,
+                'p50': _quantile(recent, 0.5), 'p99': _quantile(recent, 0.99),
+            }
+        return summaries
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), {'counts': state['counts'], 'sum': state['sum'], 'count': state['count'],
+                                 'recent': list(state['recent'])}]
+                    for key, state in self._values.items()]
+
+    def merge(self, state):
+        with self._lock:
+            for key, other in state:
+                mine = self._state(tuple(key))
+                mine['counts'] = [a + b for a, b in zip(mine['counts'], other['counts'])]
+                mine['sum'] += other['sum']
+                mine['count'] += other['count']
+                mine['recent'].extend(other['recent'])
+
+
+class Registry:
+    """All metrics of one process, by name."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind}.")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), fn=None):
+        return self._get_or_create(Gauge, name, documentation, labelnames, fn=fn)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Every metric as plain JSON-serializable values, with per-second rates for counters."""
+        elapsed = time.time() - self.started
+        return {
+            'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            'elapsed_seconds': elapsed,
+            'metrics': {metric.name: metric.summary(elapsed) for metric in self.metrics()},
+        }
+
+    def reset(self):
+        """Zeroes every metric and restarts the clock."""
+        self.started = time.time()
+        for metric in self.metrics():
+            metric.reset()
+
+    def dump(self):
+        """Counter and histogram state, for sending to another process's merge()."""
+        return {metric.name: metric.dump() for metric in self.metrics() if not isinstance(metric, Gauge)}
+
+    def merge(self, state):
+        """Adds another process's dump() (e.g. a pool worker's) into this registry."""
+        metrics = {metric.name: metric for metric in self.metrics()}
+        for name, metric_state in state.items():
+            if name in metrics:
+                metrics[name].merge(metric_state)
+
+
+REGISTRY = Registry()
+
+
+def ratio_gauge(name, documentation, counter, numerator_label, label='result'):
+    """
+    Gauge computed from a counter labelled by outcome, e.g. the hit rate of a cache whose
+    lookups are counted with result="hit" / result="miss".
+    """
+    def ratio():
+        total = counter.total()
+        return counter.value(**{label: numerator_label}) / total if total else 0.0
+    return REGISTRY.gauge(name, documentation, fn=ratio)
+
+
+def write_summary(run_name, directory=None):
+    """
+    Writes the registry summary to <METRICS_DIR>/<run_name>_summary.json at the end of a
+    batch run. Returns the path.
+    """
+    directory = METRICS_DIR if directory is None else directory
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{run_name}_summary.json")
+    summary = {'run': run_name, 'finished': datetime.now(timezone.utc).isoformat(), **REGISTRY.summary()}
+    with open(path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Metrics summary written to '{path}'.")
+    return path
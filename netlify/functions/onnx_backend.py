@@ -0,0 +1,190 @@
+# netlify/functions/onnx_backend.py
+#
+# ONNX Runtime backend for the zero-shot classifier (CLASSIFIER_BACKEND=onnx).
+#
+# The NLI model is exported to ONNX once and its weights quantized to int8 (dynamic
+# quantization: activations are quantized on the fly, so no calibration data is needed).
+# The result is wrapped in the same transformers zero-shot pipeline the PyTorch backend
+# uses, so classifier.py's batching, caching and (label, confidence) contract are unchanged.
+#
+# Requires `pip install optimum[onnxruntime]`.
+#
+# Usage (from the repository root):
+#   python netlify/functions/onnx_backend.py --export            # Export + quantize once
+#   python netlify/functions/onnx_backend.py --parity 500        # Compare with the PyTorch backend
+import os
+import platform
+import re
+import shutil
+import tempfile
+import time
+
+ONNX_MODEL_ROOT = os.environ.get('ONNX_MODEL_DIR', 'onnx_models')
+QUANTIZED_FILE_NAME = 'model_quantized.onnx'
+
+# Instruction set the int8 kernels are tuned for: avx2 runs on any x86-64 CPU from the
+# last decade, avx512_vnni is faster where the CPU has it, arm64 for Graviton/Apple.
+ONNX_QUANTIZATION = os.environ.get('ONNX_QUANTIZATION',
+                                   'arm64' if platform.machine().lower() in ('arm64', 'aarch64') else 'avx2')
+
+
+def model_dir(model_name, root=None, quantization=None):
+    """Directory the export of `model_name` quantized for `quantization` is stored in."""
+    root = ONNX_MODEL_ROOT if root is None else root
+    quantization = ONNX_QUANTIZATION if quantization is None else quantization
+    return os.path.join(root, re.sub(r'[^A-Za-z0-9_.-]+', '--', model_name) + f'-int8-{quantization}')
+
+
+def export_quantized(model_name, output_dir=None, quantization=None):
+    """
+    Exports `model_name` to ONNX and writes a dynamically int8-quantized copy, plus the
+    tokenizer, to `output_dir`. Returns the directory.
+    """
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    quantization = ONNX_QUANTIZATION if quantization is None else quantization
+    output_dir = model_dir(model_name, quantization=quantization) if output_dir is None else output_dir
+    configs = {
+        'avx2': AutoQuantizationConfig.avx2,
+        'avx512': AutoQuantizationConfig.avx512,
+        'avx512_vnni': AutoQuantizationConfig.avx512_vnni,
+        'arm64': AutoQuantizationConfig.arm64,
+    }
+    if quantization not in configs:
+        raise ValueError(f"Unknown ONNX_QUANTIZATION '{quantization}'. Use one of {', '.join(configs)}.")
+
+    print(f"Exporting {model_name} to ONNX and quantizing to int8 ({quantization})...")
+    start = time.perf_counter()
+    model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+    quantizer = ORTQuantizer.from_pretrained(model)
+    quantizer.quantize(save_dir=output_dir,
+                       quantization_config=configs[quantization](is_static=False, per_channel=False))
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    print(f"Quantized model saved to '{output_dir}' in {time.perf_counter() - start:.0f}s.")
+    return output_dir
+
+
+def ensure_exported(model_name, quantization=None):
+    """
+    Returns the export directory for `model_name`, exporting it first if it doesn't exist.
+
+    The export is written to a temporary directory and renamed into place, so another
+    process never loads a half-written model; if two processes export at once, the first
+    rename wins and the other copy is discarded. Pool workers still shouldn't each export:
+    classifier.get_pool() calls this in the parent before starting them.
+    """
+    quantization = ONNX_QUANTIZATION if quantization is None else quantization
+    directory = model_dir(model_name, quantization=quantization)
+    if os.path.exists(os.path.join(directory, QUANTIZED_FILE_NAME)):
+        return directory
+    os.makedirs(os.path.dirname(directory) or '.', exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=os.path.basename(directory) + '.', dir=os.path.dirname(directory) or '.')
+    try:
+        export_quantized(model_name, staging, quantization)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            if not os.path.exists(os.path.join(directory, QUANTIZED_FILE_NAME)):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return directory
+
+
+def load_onnx_pipeline(model_name, threads=None):
+    """
+    Zero-shot pipeline running the quantized model under ONNX Runtime, exporting it first
+    if no export exists yet.
+
+    Args:
+        model_name (str): Hugging Face model to export (e.g. classifier.MODEL_NAME).
+        threads (int): ONNX Runtime intra-op threads (None = one per core).
+    """
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer, pipeline
+
+    directory = ensure_exported(model_name)
+    session_options = onnxruntime.SessionOptions()
+    if threads is not None:
+        session_options.intra_op_num_threads = threads
+    model = ORTModelForSequenceClassification.from_pretrained(
+        directory, file_name=QUANTIZED_FILE_NAME, provider='CPUExecutionProvider', session_options=session_options)
+    tokenizer = AutoTokenizer.from_pretrained(directory)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+
+
+def parity_check(texts, reference, candidate, candidate_labels, batch_size=16):
+    """
+    Runs two zero-shot pipelines over the same texts and compares them.
+
+    Args:
+        texts (list): Sample texts.
+        reference: The PyTorch pipeline.
+        candidate: The ONNX pipeline.
+        candidate_labels (list): Labels to classify into.
+        batch_size (int): Texts per pipeline call.
+
+    Returns:
+        dict: 'rows'; 'label_agreement' (share of texts given the same top label);
+              'mean_score_drift' / 'max_score_drift' (absolute difference of the top
+              label's score, over texts where the labels agree); 'reference_rows_per_second',
+              'candidate_rows_per_second' and 'speedup'.
+    """
+    try:
+        from .classifier import _run_pipeline
+    except ImportError: # Imported as a top-level module
+        from classifier import _run_pipeline
+
+    timings = {}
+    results = {}
+    for name, classifier in (('reference', reference), ('candidate', candidate)):
+        _run_pipeline(classifier, texts[:batch_size], batch_size, candidate_labels) # Warm-up
+        start = time.perf_counter()
+        results[name] = _run_pipeline(classifier, texts, batch_size, candidate_labels)
+        timings[name] = time.perf_counter() - start
+
+    pairs = list(zip(results['reference'], results['candidate']))
+    agreeing = [(ref_score, cand_score) for (ref_label, ref_score), (cand_label, cand_score) in pairs
+                if ref_label == cand_label]
+    drifts = [abs(ref_score - cand_score) for ref_score, cand_score in agreeing]
+    return {
+        'rows': len(texts),
+        'label_agreement': len(agreeing) / len(pairs) if pairs else None,
+        'mean_score_drift': sum(drifts) / len(drifts) if drifts else None,
+        'max_score_drift': max(drifts) if drifts else None,
+        'reference_rows_per_second': len(texts) / timings['reference'] if timings['reference'] else None,
+        'candidate_rows_per_second': len(texts) / timings['candidate'] if timings['candidate'] else None,
+        'speedup': timings['reference'] / timings['candidate'] if timings['candidate'] else None,
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from classifier import CANDIDATE_LABELS, MODEL_NAME
+    from table_io import find_table, read_table
+
+    parser = argparse.ArgumentParser(description="Export the zero-shot model to quantized ONNX and check it.")
+    parser.add_argument('--export', action='store_true', help="Export and quantize (overwrites an existing export).")
+    parser.add_argument('--parity', type=int, default=0, metavar='N',
+                        help="Compare ONNX with PyTorch on N cleaned comments.")
+    parser.add_argument('--batch-size', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.export:
+        export_quantized(MODEL_NAME)
+    if args.parity:
+        from transformers import pipeline
+        comments_df = read_table(find_table('reddit_peptides_cognitive_cleaned_comments'),
+                                 columns=['comment_text_cleaned'])
+        sample = comments_df['comment_text_cleaned'].dropna().astype(str)
+        sample = sample[sample.str.len() > 0].sample(n=min(args.parity, len(sample)), random_state=0).tolist()
+        report = parity_check(sample, pipeline("zero-shot-classification", model=MODEL_NAME),
+                              load_onnx_pipeline(MODEL_NAME), CANDIDATE_LABELS, args.batch_size)
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,210 @@
+# netlify/functions/rate_limit.py
+import random
+import threading
+import time
+
+try:
+    from .metrics import REGISTRY
+except ImportError: # Imported as a top-level module
+    from metrics import REGISTRY
+
+# Reddit allows 100 requests per minute per OAuth client; keep a little headroom.
+DEFAULT_REQUESTS_PER_MINUTE = 90
+DEFAULT_BURST = 10
+# Refills accumulate float rounding error (0.9999999999999998 tokens instead of 1); a
+# shortfall this small would mean sleeping for less than the clock can represent.
+TOKEN_EPSILON = 1e-9
+
+API_REQUESTS = REGISTRY.counter('reddit_api_requests_total', "Reddit API requests let through the rate limiter.")
+RATE_LIMIT_SLEEP = REGISTRY.counter('rate_limit_sleep_seconds_total',
+                                    "Seconds spent deliberately waiting for the Reddit request budget.")
+RATE_LIMITED = REGISTRY.counter('reddit_rate_limited_total', "Units of work retried after a 429 from Reddit.")
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every scraping thread, so the whole run stays within the
+    Reddit request budget instead of relying on fixed sleeps.
+
+    Args:
+        requests_per_minute (float): Sustained request rate.
+        burst (int): How many requests may go out back-to-back after an idle period.
+        clock (callable): Returns the current time in seconds. Swap in a fake for tests.
+        sleep (callable): Sleeps for the given number of seconds. Swap in a fake for tests.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, burst=DEFAULT_BURST,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.requests = 0 # Total requests let through
+        self.total_sleep = 0.0 # Seconds spent waiting for the budget
+        self._tokens = float(burst)
+        self._last = clock()
+        self._paused_until = None
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, cost=1):
+        """Blocks until `cost` requests fit in the budget, then spends them."""
+        # The bucket never holds more than `burst` tokens, so pay for big requests in pieces
+        while cost > self.burst:
+            self.acquire(self.burst)
+            cost -= self.burst
+        while True:
+            with self._lock:
+                self._refill()
+                if self._paused_until is not None and self._last < self._paused_until:
+                    wait = self._paused_until - self._last
+                    self.total_sleep += wait
+                elif self._tokens + TOKEN_EPSILON >= cost:
+                    self._tokens = max(0.0, self._tokens - cost)
+                    self.requests += cost
+                    API_REQUESTS.inc(cost)
+                    return
+                else:
+                    wait = (cost - self._tokens) / self.rate
+                    self.total_sleep += wait
+            RATE_LIMIT_SLEEP.inc(wait)
+            self.sleep(wait)
+
+    def pause(self, seconds):
+        """Holds back every thread for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            until = self.clock() + seconds
+            if self._paused_until is None or until > self._paused_until:
+                self._paused_until = until
+
+    def update(self, limits):
+        """Hook for the API's rate-limit state after each request. The fixed-rate limiter ignores it."""
+
+    def call(self, fn, *args, cost=1):
+        """Waits for budget, then calls fn(*args)."""
+        self.acquire(cost)
+        return fn(*args)
+
+
+# --- Adaptive pacing from the API's rate-limit headers ---
+def is_rate_limit_error(error):
+    """True for HTTP 429 errors (prawcore's TooManyRequests, or anything carrying a 429 response)."""
+    if type(error).__name__ == 'TooManyRequests':
+        return True
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) == 429
+
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Rate limiter that paces itself from the remaining/used/reset values Reddit returns
+    with every response (PRAW exposes them as `reddit.auth.limits`).
+
+    After each request the sustained rate is set so the remaining budget lasts exactly
+    until the window resets: fast when quota is plentiful, slow when it is nearly
+    exhausted, and paused until the reset when it runs out. A 429 pauses every thread
+    with exponential backoff plus jitter, and call() retries the failed unit of work.
+
+    Args:
+        wall_clock (callable): Epoch time in seconds, used to read `reset_timestamp`.
+        max_retries (int): How many times call() retries after a 429.
+        backoff_base (float): First backoff delay in seconds; doubles on each retry.
+        backoff_max (float): Upper bound on a single backoff delay.
+        min_requests_per_minute (float): Slowest pace used while quota remains.
+        max_requests_per_minute (float): Fastest pace allowed when quota is plentiful.
+        jitter (callable): Returns a float in [0, 1). Swap in a fixed value for tests.
+        Other arguments as for RateLimiter.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, burst=DEFAULT_BURST,
+                 clock=time.monotonic, sleep=time.sleep, wall_clock=time.time,
+                 max_retries=5, backoff_base=1.0, backoff_max=60.0,
+                 min_requests_per_minute=6, max_requests_per_minute=600, jitter=random.random):
+        super().__init__(requests_per_minute, burst, clock, sleep)
+        self.wall_clock = wall_clock
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.min_rate = min_requests_per_minute / 60.0
+        self.max_rate = max_requests_per_minute / 60.0
+        self.jitter = jitter
+        self.retries = 0 # Units of work retried after a 429
+        self.remaining = None
+        self.used = None
+
+    def update(self, limits):
+        """
+        Re-paces from a `reddit.auth.limits` dict
+        ({'remaining': ..., 'used': ..., 'reset_timestamp': ...}). Missing values are ignored.
+        """
+        if not limits:
+            return
+        remaining = limits.get('remaining')
+        reset_timestamp = limits.get('reset_timestamp')
+        self.used = limits.get('used', self.used)
+        if remaining is None or reset_timestamp is None:
+            return
+        self.remaining = remaining
+
+        seconds_left = max(reset_timestamp - self.wall_clock(), 0.0)
+        if remaining < 1:
+            self.pause(seconds_left)
+            return
+        with self._lock:
+            self._refill() # Settle tokens earned at the old rate before switching
+            self.rate = min(self.max_rate, max(self.min_rate, remaining / max(seconds_left, 1.0)))
+
+    def backoff(self, attempt, retry_after=None):
+        """Pauses all threads after a 429: Retry-After if given, else exponential backoff with jitter."""
+        if retry_after is None:
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+            delay += delay * self.jitter()
+        else:
+            delay = retry_after
+        self.pause(delay)
+        return delay
+
+    def call(self, fn, *args, cost=1):
+        """Waits for budget, then calls fn(*args), retrying with backoff if Reddit answers 429."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(cost)
+            try:
+                return fn(*args)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                RATE_LIMITED.inc()
+                delay = self.backoff(attempt, _retry_after(e))
+                print(f"  Rate limited by Reddit; retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries}).")
+
+
+class FakeClock:
+    """
+    Deterministic stand-in for time.monotonic/time.time and time.sleep in tests:
+    sleeping just moves the clock forward.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
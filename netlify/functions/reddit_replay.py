@@ -0,0 +1,318 @@
+# netlify/functions/reddit_replay.py
+#
+# Record/replay Reddit transport. RecordingReddit wraps a real praw.Reddit client and
+# saves every search listing and comment list it returns to a "cassette" file (JSON Lines,
+# appended as responses arrive). ReplayReddit serves a cassette back through the same small
+# interface the scrapers use, with optional simulated latency and rate limiting, so the
+# scraping code can be profiled and benchmarked with no network or credentials.
+#
+# Interface used by the scrapers (and provided here):
+#   reddit.subreddit(name).search(term, limit=..., sort=...) -> iterable of submissions
+#   submission.comments.replace_more(limit=0); submission.comments.list()
+#   reddit.info(fullnames=[...]) -> the posts/comments among them that still exist
+#   reddit.auth.limits -> {'remaining', 'used', 'reset_timestamp'}
+import json
+import math
+import os
+import random
+import threading
+import time
+
+SEARCH_PAGE_SIZE = 100 # Reddit returns at most 100 listing items per request
+
+SUBMISSION_FIELDS = ('id', 'title', 'selftext', 'score', 'num_comments', 'url', 'created_utc', 'stickied')
+COMMENT_FIELDS = ('id', 'body', 'score', 'created_utc', 'depth')
+
+
+def search_key(subreddit_name, term, limit, sort):
+    return json.dumps([subreddit_name.lower(), term, limit, sort or 'relevance'])
+
+
+def _is_more_comments(comment):
+    return type(comment).__name__ == 'MoreComments'
+
+
+# --- Recording ---
+class RecordingReddit:
+    """
+    Wraps a praw.Reddit client and appends every search listing and comment list it
+    returns to a cassette file. Everything else is passed through to the real client.
+
+    Args:
+        reddit: The real praw.Reddit client.
+        path (str): Cassette file (JSON Lines). Appended to if it exists.
+    """
+
+    def __init__(self, reddit, path):
+        self._reddit = reddit
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._reddit, name)
+
+    def _write(self, record):
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+    def subreddit(self, name):
+        return _RecordingSubreddit(self, self._reddit.subreddit(name), name)
+
+    def info(self, fullnames=None, **kwargs):
+        things = list(self._reddit.info(fullnames=fullnames, **kwargs))
+        self._write({'kind': 'info', 'things': [
+            {'fullname': thing.fullname,
+             **{field: getattr(thing, field) for field in
+                (SUBMISSION_FIELDS if thing.fullname.startswith('t3_') else COMMENT_FIELDS)}}
+            for thing in things
+        ]})
+        return things
+
+
+class _RecordingSubreddit:
+    def __init__(self, recorder, subreddit, name):
+        self._recorder = recorder
+        self._subreddit = subreddit
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._subreddit, name)
+
+    def search(self, term, limit=None, sort=None, **kwargs):
+        # Records what the caller actually iterated, even if it stops early
+        if sort is not None:
+            kwargs['sort'] = sort
+        submissions = []
+        try:
+            for submission in self._subreddit.search(term, limit=limit, **kwargs):
+                submissions.append({field: getattr(submission, field) for field in SUBMISSION_FIELDS})
+                yield _RecordingSubmission(self._recorder, submission)
+        finally:
+            self._recorder._write({'kind': 'search', 'key': search_key(self._name, term, limit, sort),
+                                   'subreddit': self._name, 'submissions': submissions})
+
+
+class _RecordingSubmission:
+    def __init__(self, recorder, submission):
+        self._recorder = recorder
+        self._submission = submission
+
+    def __getattr__(self, name):
+        return getattr(self._submission, name)
+
+    def __setattr__(self, name, value):
+        # comment_sort / comment_limit must reach the real submission before it loads comments
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._submission, name, value)
+
+    @property
+    def comments(self):
+        return _RecordingCommentForest(self._recorder, self._submission)
+
+
+class _RecordingCommentForest:
+    def __init__(self, recorder, submission):
+        self._recorder = recorder
+        self._submission = submission
+
+    def replace_more(self, limit=32, **kwargs):
+        return self._submission.comments.replace_more(limit=limit, **kwargs)
+
+    def list(self):
+        comments = self._submission.comments.list()
+        self._recorder._write({
+            'kind': 'comments', 'submission_id': self._submission.id,
+            'comments': [{field: getattr(comment, field, None) for field in COMMENT_FIELDS}
+                         for comment in comments if not _is_more_comments(comment)],
+        })
+        return comments
+
+
+# --- Replay ---
+class ReplayTooManyRequests(Exception):
+    """Simulated HTTP 429. Carries a 429 response, so rate_limit.is_rate_limit_error() recognises it."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"received 429 HTTP response (simulated, retry after {retry_after:.0f}s)")
+        self.response = _ReplayResponse(429, {'retry-after': str(int(math.ceil(retry_after)))})
+
+
+class _ReplayResponse:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class _ReplayAuth:
+    def __init__(self):
+        self.limits = {}
+
+
+class _ReplayObject:
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+
+class ReplayReddit:
+    """
+    Serves a recorded cassette through the subset of the PRAW interface the scrapers use.
+
+    Args:
+        path (str): Cassette written by RecordingReddit.
+        latency (float): Seconds each simulated request takes.
+        latency_jitter (float): Extra random latency, up to this many seconds per request.
+        requests_per_window (int): Simulated Reddit quota per window (None = unlimited).
+            Requests past the quota raise a 429 until the window resets, and `auth.limits`
+            reports remaining/used/reset_timestamp the way PRAW does.
+        window_seconds (float): Length of the quota window (Reddit uses 600).
+        clock (callable): Epoch time in seconds. Swap in a rate_limit.FakeClock for tests.
+        sleep (callable): Used for simulated latency.
+        seed (int): Seed for the latency jitter.
+    """
+
+    def __init__(self, path, latency=0.0, latency_jitter=0.0, requests_per_window=None, window_seconds=600.0,
+                 clock=time.time, sleep=time.sleep, seed=0):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.requests_per_window = requests_per_window
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.auth = _ReplayAuth()
+        self.requests = 0 # Simulated requests served
+        self.rate_limited = 0 # Simulated 429s raised
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = None
+        self._used = 0
+        self.searches, self.comments, self.things = self.load(path)
+
+    @staticmethod
+    def load(path):
+        """
+        Reads a cassette into ({search key: submissions}, {submission ID: comments},
+        {fullname: fields}). Every recorded post and comment can be looked up by fullname;
+        later records (e.g. info lookups) override earlier ones.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Replay cassette '{path}' not found. Record one with RecordingReddit first.")
+        searches, comments, things = {}, {}, {}
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['kind'] == 'search':
+                    searches[record['key']] = (record['subreddit'], record['submissions'])
+                    things.update(('t3_' + fields['id'], fields) for fields in record['submissions'])
+                elif record['kind'] == 'comments':
+                    comments[record['submission_id']] = record['comments']
+                    things.update(('t1_' + fields['id'], fields) for fields in record['comments'])
+                elif record['kind'] == 'info':
+                    things.update((fields['fullname'], fields) for fields in record['things'])
+        return searches, comments, things
+
+    def _request(self, cost=1):
+        """Simulates `cost` API requests: latency, quota accounting and 429s."""
+        with self._lock:
+            now = self.clock()
+            if self._window_start is None or now - self._window_start >= self.window_seconds:
+                self._window_start = now
+                self._used = 0
+            reset_timestamp = self._window_start + self.window_seconds
+            if self.requests_per_window is not None and self._used + cost > self.requests_per_window:
+                self.rate_limited += 1
+                self.auth.limits = {'remaining': 0, 'used': self._used, 'reset_timestamp': reset_timestamp}
+                raise ReplayTooManyRequests(reset_timestamp - now)
+            self._used += cost
+            self.requests += cost
+            if self.requests_per_window is not None:
+                self.auth.limits = {'remaining': self.requests_per_window - self._used, 'used': self._used,
+                                    'reset_timestamp': reset_timestamp}
+            delay = cost * (self.latency + self.latency_jitter * self._random.random())
+        if delay > 0:
+            self.sleep(delay)
+
+    def subreddit(self, name):
+        return _ReplaySubreddit(self, name)
+
+    def info(self, fullnames=None, **kwargs):
+        """One simulated request per 100 fullnames; unknown fullnames are left out, like deleted items."""
+        fullnames = list(fullnames or [])
+        self._request(max(1, math.ceil(len(fullnames) / SEARCH_PAGE_SIZE)))
+        return [_ReplayObject({**self.things[fullname], 'fullname': fullname})
+                for fullname in fullnames if fullname in self.things]
+
+
+class _ReplaySubreddit:
+    def __init__(self, reddit, name):
+        self._reddit = reddit
+        self.display_name = name
+
+    def search(self, term, limit=None, sort=None, **kwargs):
+        key = search_key(self.display_name, term, limit, sort)
+        if key not in self._reddit.searches:
+            raise LookupError(f"No recorded search of r/{self.display_name} for '{term}' "
+                              f"(limit={limit}, sort={sort or 'relevance'}) in the cassette.")
+        display_name, submissions = self._reddit.searches[key]
+        self.display_name = display_name
+        self._reddit._request(max(1, math.ceil(len(submissions) / SEARCH_PAGE_SIZE)))
+        return [_ReplaySubmission(self._reddit, fields) for fields in submissions]
+
+
+class _ReplaySubmission(_ReplayObject):
+    def __init__(self, reddit, fields):
+        super().__init__(fields)
+        self.comment_sort = None
+        self.comment_limit = None
+        self.comments = _ReplayCommentForest(reddit, self)
+
+
+# Approximations of Reddit's comment sorts over the recorded fields
+_REPLAY_SORT_KEYS = {
+    'top': lambda fields: -(fields.get('score') or 0),
+    'new': lambda fields: -(fields.get('created_utc') or 0),
+    'old': lambda fields: fields.get('created_utc') or 0,
+}
+
+
+class _ReplayCommentForest:
+    def __init__(self, reddit, submission):
+        self._reddit = reddit
+        self._submission = submission
+
+    def replace_more(self, limit=32, **kwargs):
+        return []
+
+    def list(self):
+        """The recorded comments, honouring the submission's comment_sort and comment_limit like a real request."""
+        submission_id = self._submission.id
+        if submission_id not in self._reddit.comments:
+            raise LookupError(f"No recorded comments for post {submission_id} in the cassette.")
+        self._reddit._request()
+        comments = self._reddit.comments[submission_id]
+        sort_key = _REPLAY_SORT_KEYS.get(self._submission.comment_sort)
+        if sort_key is not None:
+            # Stable, so the recorded (breadth-first) order breaks ties
+            comments = sorted(comments, key=lambda fields: ((fields.get('depth') or 0), sort_key(fields)))
+        if self._submission.comment_limit is not None:
+            comments = comments[:self._submission.comment_limit]
+        return [_ReplayObject(fields) for fields in comments]
+
+
+def wrap_reddit_client(reddit, record_path=None, replay_path=None, **replay_options):
+    """
+    Chooses the Reddit transport: a ReplayReddit if `replay_path` is set, a RecordingReddit
+    around `reddit` if `record_path` is set, otherwise `reddit` itself.
+    """
+    if replay_path:
+        print(f"Replaying Reddit responses from '{replay_path}'.")
+        return ReplayReddit(replay_path, **replay_options)
+    if record_path and reddit is not None:
+        print(f"Recording Reddit responses to '{record_path}'.")
+        return RecordingReddit(reddit, record_path)
+    return reddit
@@ -1,11 +1,22 @@
 import json
 import os
-import re
-import time
-import pandas as pd
+import threading
 import praw
 from datetime import datetime # Import datetime for ISO format
 
+try:
+    from .comment_fetch import CommentFetchOptions, iter_comments
+    from .rate_limit import AdaptiveRateLimiter
+    from .scrape_engine import ScrapeEngine, DEFAULT_MAX_WORKERS
+    from .text_cleaning import clean_text
+    from .reddit_replay import wrap_reddit_client
+except ImportError: # Run directly as a script
+    from comment_fetch import CommentFetchOptions, iter_comments
+    from rate_limit import AdaptiveRateLimiter
+    from scrape_engine import ScrapeEngine, DEFAULT_MAX_WORKERS
+    from text_cleaning import clean_text
+    from reddit_replay import wrap_reddit_client
+
 
 # --- Reddit API Credentials (from environment variables) ---
 # For local, ensure these are set in your shell before running Flask
@@ -15,97 +26,122 @@ USERNAME = os.environ.get('REDDIT_USERNAME')
 PASSWORD = os.environ.get('REDDIT_PASSWORD') # Or app password if 2FA is on
 USER_AGENT = os.environ.get('REDDIT_USER_AGENT', 'NeuroPsychiatryResearchApp/1.0 by DiamondKJ125')
 
-reddit = None
-try:
-    if CLIENT_ID and CLIENT_SECRET and USERNAME and PASSWORD:
-        reddit = praw.Reddit(client_id=CLIENT_ID,
-                            client_secret=CLIENT_SECRET,
-                            user_agent=USER_AGENT,
-                            username=USERNAME,
-                            password=PASSWORD)
-        print("PRAW client initialized.")
-    else:
-        print("Reddit API credentials are not fully set as environment variables. Scraping will fail.")
-except Exception as e:
-    print(f"Error initializing PRAW client: {e}")
-    reddit = None
-
-# --- Basic Text Cleaning Function ---
-def clean_text(text):
-    if isinstance(text, str):
-        text = text.replace('\n', ' ').replace('\r', ' ')
-        text = re.sub(r'\[.*?\]\(.*?\)','', text) # Remove markdown links [text](url)
-        text = re.sub(r'&amp;', '&', text) # Decode HTML entities like &amp;
-        text = re.sub(r'\s+', ' ', text).strip() # Replace multiple spaces with single space
-    else:
-        text = ''
-    return text
+# Set REDDIT_RECORD_PATH to save every Reddit response to a cassette file, or
+# REDDIT_REPLAY_PATH to serve a saved cassette instead of calling Reddit (no credentials
+# needed). REDDIT_REPLAY_LATENCY adds simulated seconds per request when replaying.
+REDDIT_RECORD_PATH = os.environ.get('REDDIT_RECORD_PATH')
+REDDIT_REPLAY_PATH = os.environ.get('REDDIT_REPLAY_PATH')
+REDDIT_REPLAY_LATENCY = float(os.environ.get('REDDIT_REPLAY_LATENCY', '0'))
+
+# The client is created on first use (not at import time) and shared by all threads
+_reddit = None
+_reddit_lock = threading.Lock()
+
+def get_reddit():
+    """Returns the shared PRAW client, creating it on first call. None if it can't be created."""
+    global _reddit
+    if _reddit is None:
+        with _reddit_lock:
+            if _reddit is None:
+                try:
+                    if REDDIT_REPLAY_PATH:
+                        _reddit = wrap_reddit_client(None, replay_path=REDDIT_REPLAY_PATH, latency=REDDIT_REPLAY_LATENCY)
+                    elif CLIENT_ID and CLIENT_SECRET and USERNAME and PASSWORD:
+                        _reddit = wrap_reddit_client(praw.Reddit(client_id=CLIENT_ID,
+                                                                 client_secret=CLIENT_SECRET,
+                                                                 user_agent=USER_AGENT,
+                                                                 username=USERNAME,
+                                                                 password=PASSWORD),
+                                                     record_path=REDDIT_RECORD_PATH)
+                        print("PRAW client initialized.")
+                    else:
+                        print("Reddit API credentials are not fully set as environment variables. Scraping will fail.")
+                except Exception as e:
+                    print(f"Error initializing PRAW client: {e}")
+                    _reddit = None
+    return _reddit
+
+def warmup():
+    """Creates the Reddit client ahead of the first scrape. Returns True if it is ready."""
+    return get_reddit() is not None
 
 # --- Scraping Logic ---
-def scrape_reddit_posts_and_comments(subreddits, search_terms, limit_per_search_term=5, total_post_limit=10):
+# One request budget for the whole process, shared by concurrent scrapes
+rate_limiter = AdaptiveRateLimiter()
+
+# The demo shows the first 5 comments per post in Reddit's default order, so only those are
+# requested. Override with COMMENT_SORT / COMMENT_LIMIT / COMMENT_DEPTH / COMMENT_REPLACE_MORE.
+COMMENT_FETCH = CommentFetchOptions.from_env(limit=5, replace_more_limit=0)
+
+def fetch_top_comments(submission, options=COMMENT_FETCH):
+    """Returns the cleaned comments `options` selects (by default the first 5) from a submission."""
+    return [{
+        'comment_id': comment.id,
+        'comment_text': clean_text(comment.body),
+        'comment_score': comment.score,
+        'comment_created_utc': datetime.fromtimestamp(comment.created_utc).isoformat()
+    } for comment in iter_comments(submission, options)]
+
+def build_post(result):
+    """Turns one scrape result (submission + its comments) into the post dict returned to clients."""
+    submission = result['submission']
+    return {
+        'platform': 'Reddit',
+        'subreddit': result['subreddit'].display_name,
+        'post_id': submission.id,
+        'post_title': clean_text(submission.title),
+        'post_text': clean_text(submission.selftext),
+        'score': submission.score,
+        'num_comments': submission.num_comments,
+        'url': submission.url,
+        'created_utc': datetime.fromtimestamp(submission.created_utc).isoformat(), # Use datetime for ISO
+        'search_term_used': result['search_terms'][0],
+        'comments': result['comments']
+    }
+
+def iter_reddit_posts_and_comments(subreddits, search_terms, limit_per_search_term=5, total_post_limit=10,
+                                   max_workers=DEFAULT_MAX_WORKERS, client=None, errors=None):
     """
-    Scrapes Reddit posts and their comments, returning structured data.
+    Same as scrape_reddit_posts_and_comments(), but yields each post as soon as it has been
+    fetched, so callers can pass partial results on while the scrape runs.
+
+    Args:
+        errors (list): If given, (description, exception) tuples are appended for searches
+                       and comment fetches that failed.
+
+    Raises:
+        RuntimeError: If the Reddit client can't be created.
     """
+    reddit = client if client is not None else get_reddit()
     if not reddit:
-        return {"error": "Reddit API not initialized. Check your environment variables and PRAW setup."}
-
-    data = []
-    items_collected = 0
-
-    for subreddit_name in subreddits:
-        if items_collected >= total_post_limit:
-            break
-        try:
-            subreddit = reddit.subreddit(subreddit_name)
-            for term in search_terms:
-                if items_collected >= total_post_limit:
-                    break
-                print(f"Searching r/{subreddit_name} for '{term}'...")
-                for submission in subreddit.search(term, limit=limit_per_search_term):
-                    if submission.stickied:
-                        continue
-
-                    post_info = {
-                        'platform': 'Reddit',
-                        'subreddit': subreddit.display_name,
-                        'post_id': submission.id,
-                        'post_title': clean_text(submission.title),
-                        'post_text': clean_text(submission.selftext),
-                        'score': submission.score,
-                        'num_comments': submission.num_comments,
-                        'url': submission.url,
-                        'created_utc': datetime.fromtimestamp(submission.created_utc).isoformat(), # Use datetime for ISO
-                        'search_term_used': term,
-                        'comments': []
-                    }
-
-                    # Limit comments to avoid excessive data
-                    submission.comments.replace_more(limit=0) # Get all top-level comments
-                    # submission.comments.replace_more(limit=None) # Get ALL comments including replies, can be slow
-                    comment_count = 0
-                    for comment in submission.comments.list():
-                        if isinstance(comment, praw.models.Comment):
-                            post_info['comments'].append({
-                                'comment_id': comment.id,
-                                'comment_text': clean_text(comment.body),
-                                'comment_score': comment.score,
-                                'comment_created_utc': datetime.fromtimestamp(comment.created_utc).isoformat()
-                            })
-                            comment_count += 1
-                            if comment_count >= 5: # Limit to max 5 comments per post for a reasonable local demo
-                                break
-                    data.append(post_info)
-                    items_collected += 1
-                    time.sleep(0.5) # Small delay to be polite to Reddit API
-
-                time.sleep(1) # Delay between search terms
-        except praw.exceptions.PRAWException as pe:
-            print(f"PRAW error during scraping for r/{subreddit_name}: {pe}")
-            return {"error": f"Scraping error for r/{subreddit_name}: {pe}"}
-        except Exception as e:
-            print(f"An unexpected error occurred during scraping for r/{subreddit_name}: {e}")
-            return {"error": f"An unexpected error occurred: {e}"}
-        time.sleep(2) # Delay between subreddits
+        raise RuntimeError("Reddit API not initialized. Check your environment variables and PRAW setup.")
+
+    engine = ScrapeEngine(reddit, limiter=rate_limiter, max_workers=max_workers,
+                          comment_cost=COMMENT_FETCH.request_cost)
+    for result in engine.iter_results(subreddits, search_terms, limit_per_search_term, fetch_top_comments,
+                                      total_post_limit=total_post_limit, errors=errors):
+        yield build_post(result)
+
+def scrape_reddit_posts_and_comments(subreddits, search_terms, limit_per_search_term=5, total_post_limit=10,
+                                     max_workers=DEFAULT_MAX_WORKERS, client=None):
+    """
+    Scrapes Reddit posts and their comments, returning structured data.
+
+    Searches and comment downloads run concurrently, paced by the shared rate limiter.
+    Pass `client` to scrape with something other than the default PRAW client.
+    """
+    errors = []
+    try:
+        data = list(iter_reddit_posts_and_comments(subreddits, search_terms, limit_per_search_term, total_post_limit,
+                                                   max_workers, client, errors))
+    except RuntimeError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        print(f"An unexpected error occurred during scraping: {e}")
+        return {"error": f"An unexpected error occurred: {e}"}
+    if errors:
+        description, error = errors[0]
+        return {"error": f"Scraping error while {description}: {error}"}
 
     return data
 
@@ -0,0 +1,245 @@
+# netlify/functions/scrape_engine.py
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .metrics import REGISTRY
+    from .rate_limit import AdaptiveRateLimiter
+except ImportError: # Imported as a top-level module
+    from metrics import REGISTRY
+    from rate_limit import AdaptiveRateLimiter
+
+DEFAULT_MAX_WORKERS = 8
+SEARCH_PAGE_SIZE = 100 # Reddit returns at most 100 listing items per request
+
+POSTS_SCRAPED = REGISTRY.counter('scrape_posts_total', "Unique posts scraped (with their comments).")
+COMMENTS_SCRAPED = REGISTRY.counter('scrape_comments_total', "Comments scraped.")
+REDDIT_SECONDS = REGISTRY.histogram('reddit_request_seconds',
+                                    "Time spent in Reddit calls, excluding rate-limit waits.", ['kind'])
+
+
+class ScrapeEngine:
+    """
+    Runs (subreddit, search term) searches and comment fetches on a thread pool.
+
+    Every request goes through one shared rate limiter, so adding threads never exceeds
+    the Reddit request budget. After each request the limiter is told Reddit's current
+    rate-limit state, which an AdaptiveRateLimiter uses to pace the rest of the run.
+    The engine only needs `reddit.subreddit(name).search(term, limit=...)` from the
+    client, so it can be run offline against a stub.
+
+    Results always come back in (subreddit, term, search rank) order regardless of
+    which thread finished first, and each submission appears once even if several
+    search terms found it.
+
+    Args:
+        reddit: A praw.Reddit client (or anything with the same interface).
+        limiter (RateLimiter): Shared request budget. An AdaptiveRateLimiter is created if omitted.
+        max_workers (int): Number of threads used for searches and comment fetches.
+        comment_cost (int): Requests one comment fetch may make (1, plus any "load more"
+                            expansions), reserved from the limiter before it runs.
+    """
+
+    def __init__(self, reddit, limiter=None, max_workers=DEFAULT_MAX_WORKERS, comment_cost=1):
+        self.reddit = reddit
+        self.limiter = limiter if limiter is not None else AdaptiveRateLimiter()
+        self.max_workers = max_workers
+        self.comment_cost = comment_cost
+
+    def _report_limits(self):
+        # PRAW records the rate-limit headers of the latest response here
+        auth = getattr(self.reddit, 'auth', None)
+        self.limiter.update(getattr(auth, 'limits', None))
+
+    def _run_search(self, subreddit_name, term, limit, watermark=None):
+        with REDDIT_SECONDS.time(kind='search'):
+            return self._read_listing(subreddit_name, term, limit, watermark)
+
+    def _read_listing(self, subreddit_name, term, limit, watermark):
+        subreddit = self.reddit.subreddit(subreddit_name)
+        submissions = []
+        newest_created_utc = None
+        if watermark is None:
+            listing = subreddit.search(term, limit=limit)
+        else:
+            # Newest first, so we can stop at the first post we've already seen
+            listing = subreddit.search(term, limit=limit, sort='new')
+        for submission in listing:
+            if watermark is not None and submission.created_utc <= watermark:
+                break
+            if newest_created_utc is None or submission.created_utc > newest_created_utc:
+                newest_created_utc = submission.created_utc
+            if submission.stickied: # Skip pinned posts often used for rules/announcements
+                continue
+            submissions.append(submission)
+        return subreddit, submissions, newest_created_utc
+
+    def _search(self, subreddit_name, term, limit, watermark=None):
+        # A listing is fetched in pages of SEARCH_PAGE_SIZE, each one a separate request.
+        # If Reddit answers 429 the limiter backs off and the whole search is retried.
+        cost = max(1, math.ceil(limit / SEARCH_PAGE_SIZE))
+        try:
+            return self.limiter.call(self._run_search, subreddit_name, term, limit, watermark, cost=cost)
+        finally:
+            self._report_limits()
+
+    def _fetch_comments(self, fetch_comments, submission):
+        try:
+            return self.limiter.call(self._timed_fetch, fetch_comments, submission, cost=self.comment_cost)
+        finally:
+            self._report_limits()
+
+    @staticmethod
+    def _timed_fetch(fetch_comments, submission):
+        with REDDIT_SECONDS.time(kind='comments'):
+            return fetch_comments(submission)
+
+    def iter_results(self, subreddits, search_terms, limit_per_search_term, fetch_comments, total_post_limit=None,
+                     checkpoint=None, build_row=None, errors=None, on_new_term=None):
+        """
+        Searches every (subreddit, term) pair and fetches comments once for each unique submission,
+        yielding each result as soon as its (subreddit, term) unit has been fully fetched.
+
+        Only submission IDs and their search terms are kept for the whole run, so memory
+        does not grow with the comments already handed to the caller.
+
+        Args:
+            subreddits (list): Subreddit names.
+            search_terms (list): Search terms to run in every subreddit.
+            limit_per_search_term (int): Maximum submissions per search.
+            fetch_comments (callable): Called once per unique submission; its return value
+                                       is stored under 'comments'.
+            total_post_limit (int): Stop after this many unique submissions (None = no cap).
+            checkpoint (ScrapeCheckpoint): If given, units finished in the current run are
+                                           skipped, posts it has already stored are not
+                                           fetched again, searches only go back to each
+                                           unit's watermark, and every fully fetched unit
+                                           is recorded as soon as it finishes.
+            build_row (callable): Turns a result dict into the row stored in the checkpoint.
+                                  Required with `checkpoint`.
+            errors (list): If given, (description, exception) tuples are appended for
+                           searches and comment fetches that failed. Posts whose comments
+                           could not be fetched are skipped, and their units are not
+                           checkpointed.
+            on_new_term (callable): Called as on_new_term(post_id, term) when a later search
+                                    term matches a submission that was already found.
+
+        Yields:
+            dict: 'subreddit', 'submission', 'search_terms' and 'comments' for each submission,
+                  in (subreddit, term, search rank) order.
+        """
+        if errors is None:
+            errors = []
+        units = [(subreddit_name, term) for subreddit_name in subreddits for term in search_terms]
+        if checkpoint is not None:
+            skipped = [unit for unit in units if checkpoint.is_complete(*unit)]
+            if skipped:
+                print(f"  Resuming: skipping {len(skipped)} search units already completed in this run.")
+            units = [unit for unit in units if unit not in skipped]
+
+        # Submission ID -> the list of search terms that found it
+        seen_terms = {}
+        found_count = 0
+        # Units whose searches are done but whose comment fetches may still be running
+        open_units = []
+
+        def finish_units(block):
+            # Close units in order; a unit is done once all of its comment fetches are
+            while open_units:
+                unit = open_units[0]
+                if not block and not all(entry['future'].done() for entry in unit['entries']):
+                    return
+                open_units.pop(0)
+                ok = unit['ok']
+                fetched = []
+                for entry in unit['entries']:
+                    try:
+                        entry['comments'] = entry.pop('future').result()
+                    except Exception as e:
+                        description = f"fetching comments for post {entry['submission'].id}"
+                        print(f"  Error {description}: {e}")
+                        errors.append((description, e))
+                        ok = False
+                        continue
+                    fetched.append(entry)
+                    POSTS_SCRAPED.inc()
+                    COMMENTS_SCRAPED.inc(len(entry['comments']))
+                if checkpoint is not None and ok:
+                    rows = [build_row(entry) for entry in fetched]
+                    checkpoint.record_unit(unit['subreddit'], unit['term'], rows, unit['newest_created_utc'])
+                yield from fetched
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # --- Searches, consumed in unit order with a bounded look-ahead ---
+            pending = []
+            next_unit = 0
+            while next_unit < len(units) or pending:
+                while next_unit < len(units) and len(pending) < self.max_workers:
+                    subreddit_name, term = units[next_unit]
+                    watermark = checkpoint.watermark(subreddit_name, term) if checkpoint is not None else None
+                    future = executor.submit(self._search, subreddit_name, term, limit_per_search_term, watermark)
+                    pending.append((units[next_unit], future))
+                    next_unit += 1
+
+                (subreddit_name, term), future = pending.pop(0)
+                try:
+                    subreddit, submissions, newest_created_utc = future.result()
+                except Exception as e:
+                    description = f"searching r/{subreddit_name} for '{term}'"
+                    print(f"  Error {description}: {e}")
+                    errors.append((description, e))
+                    continue
+
+                unit = {'subreddit': subreddit_name, 'term': term, 'entries': [],
+                        'newest_created_utc': newest_created_utc, 'ok': True}
+                for submission in submissions:
+                    already_seen = submission.id in seen_terms
+                    if already_seen or (checkpoint is not None and checkpoint.is_seen(submission.id)):
+                        if already_seen and term not in seen_terms[submission.id]:
+                            # Rows not yet handed out share this list, so they pick the term up
+                            seen_terms[submission.id].append(term)
+                        if checkpoint is not None:
+                            checkpoint.add_search_term(submission.id, term)
+                        if on_new_term is not None:
+                            on_new_term(submission.id, term)
+                        continue
+                    if total_post_limit is not None and found_count >= total_post_limit:
+                        # This unit was cut short, so it must not be marked complete
+                        unit['ok'] = False
+                        break
+                    seen_terms[submission.id] = [term]
+                    found_count += 1
+                    unit['entries'].append({
+                        'subreddit': subreddit,
+                        'submission': submission,
+                        'search_terms': seen_terms[submission.id],
+                        'comments': None,
+                        # Start downloading the comment tree while the other searches run
+                        'future': executor.submit(self._fetch_comments, fetch_comments, submission),
+                    })
+                open_units.append(unit)
+                yield from finish_units(block=False)
+
+                if total_post_limit is not None and found_count >= total_post_limit:
+                    for _, future in pending:
+                        future.cancel()
+                    break
+
+            # --- Collect the remaining comment fetches, one per unique submission ---
+            yield from finish_units(block=True)
+
+    def run(self, subreddits, search_terms, limit_per_search_term, fetch_comments, total_post_limit=None,
+            checkpoint=None, build_row=None):
+        """
+        Same as iter_results(), but collects everything.
+
+        Returns:
+            tuple: (results, errors). `results` is the list of result dicts; `errors` is a
+                   list of (description, exception) for searches and comment fetches that
+                   failed.
+        """
+        errors = []
+        results = list(self.iter_results(subreddits, search_terms, limit_per_search_term, fetch_comments,
+                                         total_post_limit=total_post_limit, checkpoint=checkpoint,
+                                         build_row=build_row, errors=errors))
+        return results, errors
@@ -0,0 +1,260 @@
+# netlify/functions/scrape_jobs.py
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .metrics import REGISTRY, ratio_gauge
+except ImportError: # Imported as a top-level module
+    from metrics import REGISTRY, ratio_gauge
+
+DEFAULT_JOB_WORKERS = 2 # Scrapes running at once; the rest wait in the queue
+MAX_FINISHED_JOBS = 100 # Finished jobs kept for polling/reuse before the least recently used are dropped
+DEFAULT_CACHE_TTL = 600 # Seconds a finished scrape is reused for an identical request
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024 # Rough bound on the results kept by finished jobs
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'error'
+
+# result: "hit" (finished job reused), "shared" (attached to an in-flight job) or "miss"
+JOB_LOOKUPS = REGISTRY.counter('scrape_job_cache_lookups_total', "Scrape requests by cache outcome.", ['result'])
+ratio_gauge('scrape_job_cache_hit_ratio', "Share of scrape requests answered from a finished job.", JOB_LOOKUPS, 'hit')
+JOBS_FINISHED = REGISTRY.counter('scrape_jobs_finished_total', "Scrape jobs finished.", ['status'])
+
+
+def scrape_cache_key(params):
+    """
+    Normalized form of a scrape request: subreddits and search terms sorted, de-duplicated
+    and lowercased (Reddit treats both case-insensitively), plus every limit.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name in ('subreddits', 'search_terms'):
+            value = sorted({item.strip().lower() for item in value})
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True)
+
+
+def split_post(post):
+    """Splits a scraped post into (post without comments, comments tagged with their post)."""
+    post_copy = post.copy()
+    post_comments = post_copy.pop('comments') or []
+    comments = []
+    for comment in post_comments:
+        comment_copy = comment.copy()
+        comment_copy['post_id'] = post['post_id']
+        comment_copy['post_title'] = post['post_title']
+        comment_copy['subreddit'] = post['subreddit']
+        comments.append(comment_copy)
+    return post_copy, comments
+
+
+class ScrapeJob:
+    """
+    One scrape running in the background. Posts and comments are appended as they arrive,
+    so clients can read partial results (poll) or follow them (iter_events) while it runs.
+    """
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = QUEUED
+        self.error = None
+        self.posts = []
+        self.comments = []
+        self.created_at = time.time()
+        self.finished_at = None
+        self.size_bytes = 0 # Approximate size of the results, set when the job finishes
+        self._events = [] # ('post' | 'comment', dict), in arrival order
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def _add_post(self, post):
+        post_copy, comments = split_post(post)
+        with self._changed:
+            self.posts.append(post_copy)
+            self._events.append(('post', post_copy))
+            for comment in comments:
+                self.comments.append(comment)
+                self._events.append(('comment', comment))
+            self._changed.notify_all()
+
+    def _set_status(self, status, error=None, now=None):
+        with self._changed:
+            self.status = status
+            self.error = error
+            if self.finished:
+                self.finished_at = now if now is not None else time.time()
+            self._changed.notify_all()
+
+    def summary(self):
+        """Status fields for polling (no posts or comments)."""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'post_count': len(self.posts),
+            'comment_count': len(self.comments),
+            'params': self.params,
+            'finished_at': self.finished_at,
+        }
+
+    def results_since(self, since_post=0, since_comment=0):
+        """
+        Returns (posts, comments) after the first `since_post` posts and `since_comment`
+        comments, i.e. what a client that has already received those counts hasn't seen.
+        Both are read at once, so a post never arrives without its comments.
+        """
+        with self._changed:
+            return self.posts[max(0, since_post):], self.comments[max(0, since_comment):]
+
+    def iter_events(self, heartbeat=15.0):
+        """
+        Yields ('post', post), ('comment', comment) from the start of the job, waiting for
+        new ones while it runs, then a final ('status', summary). While nothing new arrives,
+        ('heartbeat', None) is yielded every `heartbeat` seconds so idle connections stay open.
+        """
+        position = 0
+        while True:
+            with self._changed:
+                if position >= len(self._events) and not self.finished:
+                    self._changed.wait(heartbeat)
+                events = self._events[position:]
+                finished = self.finished
+            position += len(events)
+            if not events and not finished:
+                yield 'heartbeat', None
+            for event in events:
+                yield event
+            if finished and position >= len(self._events):
+                yield 'status', self.summary()
+                return
+
+
+class ScrapeJobManager:
+    """
+    Runs scrape jobs on a bounded thread pool and keeps them for polling.
+
+    Identical requests (see scrape_cache_key) share one job: while it is queued or running
+    every caller gets the same in-flight scrape, and once it has finished successfully its
+    results are reused for `cache_ttl` seconds. Finished jobs are evicted least recently
+    used first once there are more than `max_finished_jobs` of them or their results
+    exceed `cache_max_bytes`.
+
+    Every job shares the scraper's process-wide rate limiter, so running several at once
+    spreads the Reddit budget between them rather than exceeding it.
+
+    Args:
+        max_workers (int): Scrapes run concurrently; later jobs stay queued.
+        max_finished_jobs (int): Finished jobs kept in memory.
+        cache_ttl (float): Seconds a finished job is reused for identical requests (0 = never).
+        cache_max_bytes (int): Approximate memory bound on the results of finished jobs.
+        scrape (callable): Generator of post dicts, called with the job's params (and an
+                           `errors` list) as keyword arguments. Defaults to
+                           scrape.iter_reddit_posts_and_comments.
+        clock (callable): Returns the current time in seconds. Swap in a fake for tests.
+    """
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, max_finished_jobs=MAX_FINISHED_JOBS,
+                 cache_ttl=DEFAULT_CACHE_TTL, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, scrape=None, clock=time.time):
+        if scrape is None:
+            # Imported here so the job manager can run without praw when given a scrape function
+            try:
+                from .scrape import iter_reddit_posts_and_comments
+            except ImportError: # Imported as a top-level module
+                from scrape import iter_reddit_posts_and_comments
+            scrape = iter_reddit_posts_and_comments
+        self.scrape = scrape
+        self.max_finished_jobs = max_finished_jobs
+        self.cache_ttl = cache_ttl
+        self.cache_max_bytes = cache_max_bytes
+        self.clock = clock
+        self.cache_hits = 0 # Requests answered by a finished job
+        self.shared = 0 # Requests attached to a job that was still running
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape-job')
+        self._jobs = OrderedDict() # Job ID -> job, least recently used first
+        self._by_key = {} # Cache key -> job ID
+        self._lock = threading.Lock()
+
+    def _reusable(self, job):
+        if not job.finished:
+            return True
+        return job.status == DONE and self.clock() - job.finished_at < self.cache_ttl
+
+    def submit(self, **params):
+        """
+        Queues a scrape and returns (job, reused) immediately. `reused` is True if an
+        identical request's job (in flight, or finished within the TTL) was returned instead.
+        """
+        key = scrape_cache_key(params)
+        with self._lock:
+            job_id = self._by_key.get(key)
+            job = self._jobs.get(job_id) if job_id is not None else None
+            if job is not None and self._reusable(job):
+                self._jobs.move_to_end(job.id)
+                if job.finished:
+                    self.cache_hits += 1
+                    JOB_LOOKUPS.inc(result='hit')
+                else:
+                    self.shared += 1
+                    JOB_LOOKUPS.inc(result='shared')
+                return job, True
+
+            JOB_LOOKUPS.inc(result='miss')
+            job = ScrapeJob(params)
+            job.created_at = self.clock()
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+        self._executor.submit(self._run, job)
+        return job, False
+
+    def get(self, job_id):
+        """The job with this ID, or None if it is unknown or was evicted."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs.move_to_end(job_id)
+            return job
+
+    def _evict(self):
+        finished = [job for job in self._jobs.values() if job.finished] # Least recently used first
+        total_bytes = sum(job.size_bytes for job in finished)
+        while finished and (len(finished) > self.max_finished_jobs or total_bytes > self.cache_max_bytes):
+            job = finished.pop(0)
+            total_bytes -= job.size_bytes
+            del self._jobs[job.id]
+            key = scrape_cache_key(job.params)
+            if self._by_key.get(key) == job.id:
+                del self._by_key[key]
+
+    def _finish(self, job, status, error=None):
+        job.size_bytes = len(json.dumps([job.posts, job.comments], default=str))
+        # Evict in the same step, so no caller sees the job finished but not yet evicted
+        with self._lock:
+            job._set_status(status, error, now=self.clock())
+            self._evict()
+        JOBS_FINISHED.inc(status=status)
+
+    def _run(self, job):
+        job._set_status(RUNNING)
+        errors = []
+        try:
+            for post in self.scrape(errors=errors, **job.params):
+                job._add_post(post)
+        except Exception as e:
+            print(f"Scrape job {job.id} failed: {e}")
+            self._finish(job, FAILED, str(e))
+            return
+        if errors:
+            description, error = errors[0]
+            self._finish(job, FAILED, f"Scraping error while {description}: {error}")
+        else:
+            self._finish(job, DONE)
@@ -0,0 +1,215 @@
+# netlify/functions/scrape_output.py
+import os
+
+import pandas as pd
+
+try:
+    from .table_io import TIMESTAMP_COLUMNS, is_parquet, iter_table_chunks, table_columns
+except ImportError: # Imported as a top-level module
+    from table_io import TIMESTAMP_COLUMNS, is_parquet, iter_table_chunks, table_columns
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Columns of the flattened comments file, in order
+COMMENT_COLUMNS = [
+    'platform', 'subreddit', 'post_id', 'post_title', 'comment_id', 'comment_text',
+    'comment_score', 'comment_created_utc', 'search_terms_used'
+]
+
+
+class CsvChunkWriter:
+    """
+    Writes rows to a CSV file in chunks, so only `chunk_size` rows are ever held in memory.
+    Any existing file at `path` is replaced.
+    """
+
+    def __init__(self, path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._buffer = []
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_frame(self, chunk_df):
+        """Writes a whole DataFrame as one chunk (after any buffered rows)."""
+        self.flush()
+        if self.columns is None:
+            self.columns = list(chunk_df.columns) # Later chunks keep the same column order
+        else:
+            chunk_df = chunk_df.reindex(columns=self.columns)
+        for column in TIMESTAMP_COLUMNS:
+            if column in chunk_df.columns:
+                # Rows replayed from the checkpoint carry their timestamps as text
+                chunk_df[column] = pd.to_datetime(chunk_df[column])
+        self._write_chunk(chunk_df)
+        self.rows_written += len(chunk_df)
+
+    def _write_chunk(self, chunk_df):
+        chunk_df.to_csv(self.path, mode='a', header=not os.path.exists(self.path), index=False)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        buffer, self._buffer = self._buffer, []
+        self.write_frame(pd.DataFrame(buffer, columns=self.columns))
+
+    def close(self):
+        self.flush()
+
+
+class ParquetChunkWriter(CsvChunkWriter):
+    """
+    Same as CsvChunkWriter, but each chunk becomes one row group of a Parquet file, with
+    list and timestamp columns kept as native types.
+    """
+
+    def __init__(self, path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        super().__init__(path, columns, chunk_size)
+        self._writer = None
+
+    def _write_chunk(self, chunk_df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self._writer is None:
+            table = pa.Table.from_pandas(chunk_df, preserve_index=False)
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = pa.Table.from_pandas(chunk_df, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        super().close()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def open_chunk_writer(path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Chunked writer for `path`: Parquet or CSV, depending on the file extension."""
+    writer_class = ParquetChunkWriter if is_parquet(path) else CsvChunkWriter
+    return writer_class(path, columns=columns, chunk_size=chunk_size)
+
+
+def flatten_comments(post_row):
+    """Splits a post row into (post row without comments, list of comment rows with post context)."""
+    post = {key: value for key, value in post_row.items() if key != 'comments'}
+    comment_rows = [
+        {
+            'platform': post['platform'],
+            'subreddit': post['subreddit'],
+            'post_id': post['post_id'],
+            'post_title': post['post_title'],
+            'comment_id': comment['comment_id'],
+            'comment_text': comment['comment_text'],
+            'comment_score': comment['comment_score'],
+            'comment_created_utc': comment['comment_created_utc'],
+            'search_terms_used': post['search_terms_used']
+        }
+        for comment in post_row.get('comments') or []
+    ]
+    return post, comment_rows
+
+
+class ScrapeOutputSink:
+    """
+    Streams scraped posts to a posts table and their flattened comments to a comments
+    table while the scrape runs. Each path may be a .parquet or a .csv file.
+
+    Search terms that match a post after it was written are remembered (post ID and term
+    only) and patched into both files by close().
+
+    Args:
+        posts_path (str): File for post rows (without the nested comments).
+        comments_path (str): File with one row per comment.
+        chunk_size (int): Rows buffered per file before they are appended to disk.
+    """
+
+    def __init__(self, posts_path, comments_path, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.posts = open_chunk_writer(posts_path, chunk_size=chunk_size)
+        self.comments = open_chunk_writer(comments_path, columns=COMMENT_COLUMNS, chunk_size=chunk_size)
+        self._late_terms = {}
+
+    def write_post(self, post_row):
+        post, comment_rows = flatten_comments(post_row)
+        self.posts.write(post)
+        for comment_row in comment_rows:
+            self.comments.write(comment_row)
+
+    def add_search_term(self, post_id, term):
+        terms = self._late_terms.setdefault(post_id, [])
+        if term not in terms:
+            terms.append(term)
+
+    def close(self):
+        self.posts.close()
+        self.comments.close()
+        if self._late_terms:
+            for path in (self.posts.path, self.comments.path):
+                _patch_search_terms(path, self._late_terms)
+
+
+def _temp_path(path):
+    root, extension = os.path.splitext(path)
+    return root + '.tmp' + extension # Keep the extension so the writer picks the same format
+
+
+def _patch_search_terms(path, late_terms, chunk_size=DEFAULT_CHUNK_SIZE * 10):
+    """Adds late search terms to the rows of a table, rewriting it chunk by chunk."""
+    if not os.path.exists(path):
+        return
+    patched_path = _temp_path(path)
+    writer = open_chunk_writer(patched_path, chunk_size=chunk_size)
+    for chunk_df in iter_table_chunks(path, chunk_size):
+        def add_terms(row):
+            terms = list(row['search_terms_used'])
+            for term in late_terms.get(row['post_id'], []):
+                if term not in terms:
+                    terms.append(term)
+            return terms
+        chunk_df['search_terms_used'] = chunk_df.apply(add_terms, axis=1)
+        writer.write_frame(chunk_df)
+    writer.close()
+    os.replace(patched_path, path)
+
+
+def append_table(source_path, dest_path, chunk_size=DEFAULT_CHUNK_SIZE * 10):
+    """
+    Appends one pipeline table to another chunk by chunk, then removes the source.
+    Two CSVs with the same header are concatenated line by line; anything else (Parquet,
+    mixed formats, or new columns) is rewritten through a chunked writer in the format
+    of `dest_path`.
+    """
+    if not os.path.exists(source_path):
+        return
+    if not os.path.exists(dest_path):
+        if is_parquet(source_path) == is_parquet(dest_path):
+            os.replace(source_path, dest_path)
+            return
+        dest_columns = []
+    else:
+        dest_columns = table_columns(dest_path)
+
+    source_columns = table_columns(source_path)
+    if not is_parquet(source_path) and not is_parquet(dest_path) and source_columns == dest_columns:
+        with open(source_path) as source, open(dest_path, 'a') as dest:
+            source.readline() # Skip the header
+            for line in source:
+                dest.write(line)
+    else:
+        columns = dest_columns + [column for column in source_columns if column not in dest_columns]
+        merged_path = _temp_path(dest_path)
+        writer = open_chunk_writer(merged_path, columns=columns, chunk_size=chunk_size)
+        for path in (dest_path, source_path):
+            if os.path.exists(path):
+                for chunk_df in iter_table_chunks(path, chunk_size):
+                    writer.write_frame(chunk_df)
+        writer.close()
+        os.replace(merged_path, dest_path)
+    os.remove(source_path)
@@ -0,0 +1,27 @@
+# netlify/functions/selection.py
+
+# Cascade tiers whose confidence is not a zero-shot score (see classifier.ClassificationCascade)
+NON_MODEL_TIERS = ('rules', 'prefilter')
+
+
+def select_high_confidence(df, id_column, threshold, exclude_tiers=NON_MODEL_TIERS):
+    """
+    Final selection step: drops duplicate rows (keeping the first per ID), then keeps the
+    rows classified with at least `threshold` confidence, highest confidence first.
+
+    Args:
+        df (pandas.DataFrame): Classified rows with a 'classification_confidence' column.
+        id_column (str): Column that identifies a row ('post_id' or 'comment_id').
+        threshold (float): Minimum classification confidence.
+        exclude_tiers (tuple): Rows whose 'classification_tier' is one of these are never
+                               selected, since the threshold is on the zero-shot model's
+                               scale. Ignored for tables without that column.
+
+    Returns:
+        tuple: (de-duplicated DataFrame, selected DataFrame)
+    """
+    deduplicated = df.drop_duplicates(subset=[id_column], keep='first')
+    selected = deduplicated[deduplicated['classification_confidence'] >= threshold]
+    if exclude_tiers and 'classification_tier' in selected.columns:
+        selected = selected[~selected['classification_tier'].isin(exclude_tiers)]
+    return deduplicated, selected.sort_values(by='classification_confidence', ascending=False, kind='stable')
@@ -0,0 +1,102 @@
+# netlify/functions/table_io.py
+import ast
+import os
+
+import pandas as pd
+
+PARQUET_EXTENSION = '.parquet'
+CSV_EXTENSION = '.csv'
+
+# Columns the pipeline stores as lists / timestamps. Parquet keeps these types natively;
+# in CSV they are text and are converted back when read.
+LIST_COLUMNS = ('search_terms_used',)
+TIMESTAMP_COLUMNS = ('created_utc', 'comment_created_utc')
+
+
+def parquet_available():
+    """True if pyarrow is installed, so stages can exchange Parquet files."""
+    try:
+        import pyarrow.parquet # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def table_path(stem):
+    """
+    Output path for a pipeline table: '<stem>.parquet', or '<stem>.csv' if pyarrow is
+    not installed.
+    """
+    return stem + (PARQUET_EXTENSION if parquet_available() else CSV_EXTENSION)
+
+
+def find_table(stem):
+    """
+    Existing file for a pipeline table, preferring Parquet over a CSV left by older runs.
+
+    Raises:
+        FileNotFoundError: If neither '<stem>.parquet' nor '<stem>.csv' exists.
+    """
+    for extension in (PARQUET_EXTENSION, CSV_EXTENSION):
+        if os.path.exists(stem + extension):
+            return stem + extension
+    raise FileNotFoundError(f"'{stem}{PARQUET_EXTENSION}' or '{stem}{CSV_EXTENSION}'")
+
+
+def is_parquet(path):
+    return path.endswith(PARQUET_EXTENSION)
+
+
+def normalize_types(df):
+    """Converts list and timestamp columns that went through CSV (or JSON) text back to their types."""
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].map(lambda value: ast.literal_eval(value) if isinstance(value, str) else value)
+    for column in TIMESTAMP_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+
+def read_table(path, columns=None):
+    """
+    Loads a pipeline table.
+
+    Args:
+        path (str): A .parquet or .csv file.
+        columns (list): Only load these columns (None = all). Parquet skips the others
+                        on disk instead of parsing them.
+
+    Returns:
+        pandas.DataFrame: With list and timestamp columns typed in both formats.
+    """
+    if is_parquet(path):
+        return pd.read_parquet(path, columns=columns)
+    return normalize_types(pd.read_csv(path, usecols=columns))
+
+
+def iter_table_chunks(path, chunk_size=10000, columns=None):
+    """Yields a pipeline table as DataFrames of at most `chunk_size` rows."""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        for chunk_df in pd.read_csv(path, chunksize=chunk_size, usecols=columns):
+            yield normalize_types(chunk_df)
+
+
+def table_columns(path):
+    """Column names of a pipeline table, read from its schema or header only."""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def write_table(df, path):
+    """Saves a DataFrame as Parquet or CSV, depending on the file extension."""
+    if is_parquet(path):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
@@ -0,0 +1,87 @@
+# netlify/functions/text_cleaning.py
+import html
+import re
+
+# Every pattern below sticks to syntax shared by Python's `re` and RE2 (what pandas uses
+# for Arrow-backed strings), so clean_text() and clean_series() give the same result.
+
+# Unicode spaces spelled out: RE2's \s only matches ASCII whitespace, and unescaping
+# &nbsp; produces \xa0.
+WHITESPACE = '[ \t\n\r\f\v\xa0\u1680\u2000-\u200b\u2028\u2029\u202f\u205f\u3000]+'
+
+# Reddit markdown -> plain text, applied in order (line-based rules run before newlines
+# are collapsed).
+MARKDOWN_RULES = [
+    (r'!?\[([^\]]*)\]\([^)]*\)', r'\1'), # [text](url) and ![alt](url) -> text
+    (r'>!(.*?)!<', r'\1'), # >!spoiler!<
+    (r'(?m)^[ \t]{0,3}#{1,6}[ \t]*', ''), # # Headings
+    (r'(?m)^[ \t]*(?:>[ \t]?)+', ''), # > Quotes
+    (r'(?m)^[ \t]*[-*+][ \t]+', ''), # - List bullets
+    (r'\^\(([^)]*)\)', r'\1'), # ^(superscript)
+    (r'``([^\n]+?)``', r'\1'), # ``code``
+    (r'`([^`\n]+)`', r'\1'), # `code`
+    # Bold, italics and strikethrough: only delimiters that come in pairs around text that
+    # starts and ends with a non-space, opening at the start or after a non-word character,
+    # so '2*3*4 mg', 'dose 5 * 3' and 'snake_case__name__' are left as written. RE2 (used by
+    # clean_series) has no lookarounds or backreferences, hence one rule per delimiter.
+    (r'(^|[^\w*\\])\*\*\*(\S|\S.*?\S)\*\*\*', r'\1\2'), # ***bold italics***
+    (r'(^|[^\w*\\])\*\*(\S|\S.*?\S)\*\*', r'\1\2'), # **bold**
+    (r'(^|[^\w*\\])\*(\S|\S.*?\S)\*', r'\1\2'), # *italics*
+    (r'(^|[^\w\\])__(\S|\S.*?\S)__', r'\1\2'), # __bold__
+    (r'(^|[^\w\\])_(\S|\S.*?\S)_', r'\1\2'), # _italics_
+    (r'(^|[^~\\])~~(\S|\S.*?\S)~~', r'\1\2'), # ~~strikethrough~~
+    (r'\\([\\`*_{}\[\]()#+\-.!>~^|])', r'\1'), # Backslash-escaped markdown characters
+]
+
+_COMPILED_RULES = [(re.compile(pattern), replacement) for pattern, replacement in MARKDOWN_RULES]
+_WHITESPACE_RE = re.compile(WHITESPACE)
+
+
+def clean_text(text):
+    """
+    Cleans one Reddit title/body: decodes HTML entities, turns markdown into plain text
+    (links keep their text) and collapses whitespace. Non-strings (e.g. NaN) become ''.
+    """
+    if not isinstance(text, str):
+        return ''
+    if '&' in text:
+        text = html.unescape(text)
+    for pattern, replacement in _COMPILED_RULES:
+        text = pattern.sub(replacement, text)
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def _string_dtype():
+    # Arrow-backed strings run the regex replacements in Arrow's C++ kernels
+    try:
+        import pyarrow # noqa: F401
+    except ImportError:
+        return 'string'
+    return 'string[pyarrow]'
+
+
+def clean_series(values):
+    """
+    Column-level clean_text(): cleans a whole pandas Series (or any list-like of texts) with
+    one vectorized pass per rule instead of calling clean_text() row by row.
+
+    Returns:
+        pandas.Series: Cleaned text (object dtype), with the same index as the input.
+    """
+    import pandas as pd
+
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    is_text = series.map(lambda value: isinstance(value, str)).astype(bool)
+    cleaned = series.where(is_text, '').astype(_string_dtype())
+
+    # Entity decoding has no vectorized form, so only rows that contain '&' go through it
+    has_entity = cleaned.str.contains('&', regex=False)
+    if has_entity.any():
+        cleaned = cleaned.astype(object)
+        cleaned[has_entity] = cleaned[has_entity].map(html.unescape)
+        cleaned = cleaned.astype(_string_dtype())
+
+    for pattern, replacement in MARKDOWN_RULES:
+        cleaned = cleaned.str.replace(pattern, replacement, regex=True)
+    cleaned = cleaned.str.replace(WHITESPACE, ' ', regex=True).str.strip()
+    return cleaned.astype(object)
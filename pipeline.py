@@ -0,0 +1,228 @@
+# pipeline.py
+# Runs the whole pipeline: scrape -> (refresh scores) -> clean -> filter/classify -> final selection.
+#
+# Each stage is one of the existing scripts, run as its own process. Before running a
+# stage, the runner hashes everything its outputs depend on (input tables, the stage's
+# code, and the environment variables it reads). If that hash matches the last run and
+# the outputs on disk are unchanged, the stage is skipped. Because inputs are hashed by
+# content, a stage that reruns but produces identical output does not invalidate the
+# stages after it.
+#
+# Usage:
+#   python pipeline.py                 # Scrape, then rerun whatever is out of date
+#   python pipeline.py --no-scrape     # Reuse the scraped data already on disk
+#   python pipeline.py --refresh       # Also bring stored scores up to date (reruns every later stage)
+#   python pipeline.py --dry-run       # Show which stages would run
+#   python pipeline.py --force classify
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from netlify.functions.metrics import METRICS_DIR, REGISTRY, write_summary
+from netlify.functions.table_io import find_table
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(ROOT_DIR, 'pipeline_state.json')
+
+# Each stage writes its own metrics summary (metrics/<stage>_summary.json); the runner
+# records how long each stage took and which were skipped in metrics/pipeline_summary.json.
+STAGE_SECONDS = REGISTRY.histogram('pipeline_stage_seconds', "Wall time of each pipeline stage.", ['stage'])
+STAGE_RUNS = REGISTRY.counter('pipeline_stage_runs_total', "Pipeline stages by outcome.", ['stage', 'outcome'])
+
+# --- Stage declarations ---
+# inputs/outputs: table stems (resolved to .parquet or .csv) or plain file paths.
+# code: the script plus every repo module it imports, directly or indirectly (keyword
+#       lists, model name and labels live in keywords.py and classifier.py, the output
+#       format in table_io.py, the threshold in final_analysis.py).
+# env: environment variables that change the outputs.
+# external: the stage reads data from outside the repo (Reddit), so it is never skipped.
+# opt_in: only run when asked for (--refresh). Refreshing rewrites the raw tables with new
+#         scores, which changes their hashes and reruns every stage after it.
+STAGES = [
+    {
+        'name': 'scrape',
+        'script': 'scrapey.py',
+        'inputs': [],
+        'outputs': ['reddit_peptides_cognitive_raw', 'reddit_peptides_cognitive_comments'],
+        'code': ['scrapey.py', 'netlify/functions/checkpoints.py', 'netlify/functions/comment_fetch.py',
+                 'netlify/functions/metrics.py', 'netlify/functions/rate_limit.py',
+                 'netlify/functions/reddit_replay.py', 'netlify/functions/scrape_engine.py',
+                 'netlify/functions/scrape_output.py', 'netlify/functions/table_io.py'],
+        'env': [],
+        'external': True,
+    },
+    {
+        # Refreshes score/num_comments of everything stored, 100 items per request
+        'name': 'refresh',
+        'script': 'refresh_scores.py',
+        'inputs': ['reddit_peptides_cognitive_raw', 'reddit_peptides_cognitive_comments'],
+        'outputs': ['reddit_peptides_cognitive_raw', 'reddit_peptides_cognitive_comments'],
+        'code': ['refresh_scores.py', 'netlify/functions/comment_fetch.py', 'netlify/functions/hydration.py',
+                 'netlify/functions/metrics.py', 'netlify/functions/rate_limit.py',
+                 'netlify/functions/reddit_replay.py', 'netlify/functions/scrape.py',
+                 'netlify/functions/scrape_engine.py', 'netlify/functions/table_io.py',
+                 'netlify/functions/text_cleaning.py'],
+        'env': [],
+        'external': True,
+        'opt_in': True,
+    },
+    {
+        'name': 'clean',
+        'script': 'hoover.py',
+        'inputs': ['reddit_peptides_cognitive_raw', 'reddit_peptides_cognitive_comments'],
+        'outputs': ['reddit_peptides_cognitive_cleaned_posts', 'reddit_peptides_cognitive_cleaned_comments'],
+        'code': ['hoover.py', 'netlify/functions/table_io.py', 'netlify/functions/text_cleaning.py'],
+        'env': [],
+    },
+    {
+        'name': 'classify',
+        'script': 'netlify/analyze_data.py',
+        'inputs': ['reddit_peptides_cognitive_cleaned_posts', 'reddit_peptides_cognitive_cleaned_comments'],
+        'outputs': ['classified_relevant_posts_option_b', 'classified_relevant_comments_option_b'],
+        'code': ['netlify/analyze_data.py', 'netlify/functions/classification_cache.py',
+                 'netlify/functions/classifier.py', 'netlify/functions/keywords.py', 'netlify/functions/metrics.py',
+                 'netlify/functions/onnx_backend.py', 'netlify/functions/table_io.py'],
+        'env': ['USE_PREFILTER', 'CLASSIFIER_BACKEND', 'ONNX_QUANTIZATION', 'LONG_POST_MODE', 'LONG_TEXT_EARLY_EXIT',
+                'LONG_TEXT_WINDOW_TOKENS'],
+    },
+    {
+        'name': 'final',
+        'script': 'final_analysis.py',
+        'inputs': ['classified_relevant_posts_option_b', 'classified_relevant_comments_option_b'],
+        'outputs': ['FINAL_HIGH_CONFIDENCE_posts.csv', 'netlify/functions/comments/manifest.json'],
+        'code': ['final_analysis.py', 'netlify/functions/comment_shards.py', 'netlify/functions/selection.py',
+                 'netlify/functions/table_io.py'],
+        'env': ['CONFIDENCE_THRESHOLD'],
+    },
+]
+
+
+# --- Hashing ---
+def file_hash(path):
+    """sha256 of a file's content, read in blocks so large tables are not loaded at once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve(name):
+    """Path of an input/output on disk, or None if it doesn't exist."""
+    path = os.path.join(ROOT_DIR, name)
+    if os.path.exists(path):
+        return path
+    try:
+        return find_table(path)
+    except FileNotFoundError:
+        return None
+
+
+def current_hashes(names):
+    """{name: content hash, or None if missing} for stage inputs or outputs."""
+    hashes = {}
+    for name in names:
+        path = resolve(name)
+        hashes[name] = file_hash(path) if path is not None else None
+    return hashes
+
+
+def stage_key(stage):
+    """Hash of everything the stage's outputs depend on."""
+    parts = {
+        'inputs': current_hashes(stage['inputs']),
+        'code': {path: file_hash(os.path.join(ROOT_DIR, path)) for path in stage['code']},
+        'env': {name: os.environ.get(name) for name in stage['env']},
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# --- State ---
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    with open(STATE_PATH, 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def is_current(stage, state):
+    """True if the stage's inputs, code and env are unchanged and its outputs are as it left them."""
+    previous = state.get(stage['name'])
+    if previous is None or stage.get('external'):
+        return False
+    return previous['key'] == stage_key(stage) and previous['outputs'] == current_hashes(stage['outputs'])
+
+
+# --- Runner ---
+def run_pipeline(scrape=True, force=(), dry_run=False, refresh=False):
+    """
+    Runs each stage whose outputs are out of date, in order.
+
+    Args:
+        scrape (bool): Run the scrape stage. If False, the scraped tables on disk are used.
+        refresh (bool): Run the opt-in refresh stage (also when it is named in `force`).
+        force (iterable): Names of stages to run even if they are current.
+        dry_run (bool): Only print what would run.
+
+    Returns:
+        bool: True if every stage that ran succeeded.
+    """
+    state = load_state()
+    for stage in STAGES:
+        name = stage['name']
+        if stage.get('opt_in') and not (refresh or name in force):
+            print(f"[{name}] skipped (opt-in; use --{name})")
+            STAGE_RUNS.inc(stage=name, outcome='skipped')
+            continue
+        if stage.get('external') and not scrape:
+            print(f"[{name}] skipped (--no-scrape)")
+            STAGE_RUNS.inc(stage=name, outcome='skipped')
+            continue
+        if name not in force and is_current(stage, state):
+            print(f"[{name}] up to date")
+            STAGE_RUNS.inc(stage=name, outcome='up_to_date')
+            continue
+        if dry_run:
+            print(f"[{name}] would run {stage['script']}")
+            continue
+
+        print(f"[{name}] running {stage['script']}...")
+        key = stage_key(stage)
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, os.path.join(ROOT_DIR, stage['script'])], cwd=ROOT_DIR)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+        if result.returncode != 0:
+            print(f"[{name}] failed with exit code {result.returncode}; stopping.")
+            STAGE_RUNS.inc(stage=name, outcome='failed')
+            return False
+        STAGE_RUNS.inc(stage=name, outcome='ran')
+        state[name] = {'key': key, 'outputs': current_hashes(stage['outputs'])}
+        save_state(state)
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the scrape -> refresh -> clean -> classify -> final pipeline.")
+    parser.add_argument('--no-scrape', action='store_true',
+                        help="Don't scrape or refresh scores; use the tables already on disk.")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Refresh the scores of stored posts and comments after scraping.")
+    parser.add_argument('--force', nargs='*', default=[], choices=[stage['name'] for stage in STAGES],
+                        help="Stages to run even if they are up to date.")
+    parser.add_argument('--dry-run', action='store_true', help="Only show which stages would run.")
+    args = parser.parse_args()
+    ok = run_pipeline(scrape=not args.no_scrape, force=set(args.force), dry_run=args.dry_run, refresh=args.refresh)
+    if not args.dry_run:
+        # Next to the stages' summaries, which they write relative to ROOT_DIR
+        write_summary('pipeline', directory=os.path.join(ROOT_DIR, METRICS_DIR))
+    sys.exit(0 if ok else 1)
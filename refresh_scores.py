@@ -0,0 +1,68 @@
+# refresh_scores.py
+# Brings the score and comment count of every stored post, and the score of every stored
+# comment, up to date, then writes them back into the raw tables scrapey.py produced.
+#
+# Items are looked up 100 at a time through Reddit's /api/info endpoint, so refreshing
+# 50,000 posts and their comments costs a few hundred requests. Posts or comments that
+# Reddit no longer returns (deleted, removed, private subreddit) keep their stored values.
+#
+# Uses the REDDIT_* environment variables (or REDDIT_REPLAY_PATH) like the Flask app.
+from netlify.functions.hydration import hydrate
+from netlify.functions.metrics import write_summary
+from netlify.functions.scrape import get_reddit, rate_limiter
+from netlify.functions.table_io import find_table, read_table, write_table
+
+
+def apply_updates(df, id_column, updates, columns):
+    """
+    Writes refreshed values into `df` in place.
+
+    Args:
+        df (pandas.DataFrame): Table to update.
+        id_column (str): Column holding the IDs `updates` is keyed by.
+        updates (dict): ID -> {field: value}, from hydrate().
+        columns (dict): Table column -> field name in `updates`.
+
+    Returns:
+        int: Number of rows updated.
+    """
+    mask = df[id_column].isin(updates.keys())
+    for column, field in columns.items():
+        df.loc[mask, column] = df.loc[mask, id_column].map(lambda item_id: updates[item_id][field])
+    return int(mask.sum())
+
+
+# --- Load the stored tables ---
+try:
+    posts_filename = find_table('reddit_peptides_cognitive_raw')
+    comments_filename = find_table('reddit_peptides_cognitive_comments')
+except FileNotFoundError as e:
+    print(f"Error: no scraped table found ({e}). Run scrapey.py first.")
+    exit(1)
+
+posts_df = read_table(posts_filename)
+comments_df = read_table(comments_filename)
+print(f"Loaded {len(posts_df)} posts from {posts_filename} and {len(comments_df)} comments from {comments_filename}.")
+
+reddit = get_reddit()
+if reddit is None:
+    print("Error: no Reddit client. Set the REDDIT_* environment variables (or REDDIT_REPLAY_PATH).")
+    exit(1)
+
+# --- Refresh in batches of 100 ---
+requests_before = rate_limiter.requests
+post_updates, comment_updates = hydrate(reddit, posts_df['post_id'], comments_df['comment_id'], limiter=rate_limiter)
+print(f"Made {rate_limiter.requests - requests_before} API requests "
+      f"(waited {rate_limiter.total_sleep:.1f}s for the rate limit).")
+
+updated_posts = apply_updates(posts_df, 'post_id', post_updates, {'score': 'score', 'num_comments': 'num_comments'})
+updated_comments = apply_updates(comments_df, 'comment_id', comment_updates, {'comment_score': 'score'})
+print(f"Refreshed {updated_posts} of {len(posts_df)} posts and {updated_comments} of {len(comments_df)} comments "
+      f"(the rest are no longer available on Reddit and keep their stored values).")
+
+# --- Save Results ---
+write_table(posts_df, posts_filename)
+write_table(comments_df, comments_filename)
+print(f"Updated '{posts_filename}' and '{comments_filename}'.")
+
+write_summary('refresh')
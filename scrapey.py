@@ -1,8 +1,15 @@
 import praw
 import pandas as pd
-import time
 import os
 
+from netlify.functions.checkpoints import ScrapeCheckpoint
+from netlify.functions.comment_fetch import CommentFetchOptions, iter_comments
+from netlify.functions.metrics import write_summary
+from netlify.functions.reddit_replay import wrap_reddit_client
+from netlify.functions.scrape_engine import ScrapeEngine, DEFAULT_MAX_WORKERS
+from netlify.functions.scrape_output import ScrapeOutputSink, append_table, DEFAULT_CHUNK_SIZE
+from netlify.functions.table_io import table_path
+
 # --- Reddit API Credentials ---
 # IMPORTANT SECURITY NOTE:
 # It's best practice NOT to hardcode sensitive information like passwords directly in your script.
@@ -42,85 +49,149 @@ except Exception as e:
     print(f"Error initializing PRAW. Please check your credentials: {e}")
     print("Ensure you've replaced 'YOUR_REDDIT_PASSWORD_HERE' with your actual password.")
     # Exit if initialization fails, as we can't proceed without it.
-    exit()
+    exit(1)
+
+# --- Optional record/replay ---
+# REDDIT_RECORD_PATH saves every search and comment response to a cassette file;
+# REDDIT_REPLAY_PATH serves a saved cassette instead of calling Reddit, with
+# REDDIT_REPLAY_LATENCY simulated seconds per request.
+reddit = wrap_reddit_client(reddit,
+                            record_path=os.environ.get('REDDIT_RECORD_PATH'),
+                            replay_path=os.environ.get('REDDIT_REPLAY_PATH'),
+                            latency=float(os.environ.get('REDDIT_REPLAY_LATENCY', '0')))
+
+# --- Comment fetching ---
+# By default every comment Reddit returns with the thread is kept ('load more' stubs are not
+# expanded). For large runs, cap what is downloaded per post, e.g.
+#   COMMENT_SORT=top COMMENT_LIMIT=50 COMMENT_DEPTH=1 python scrapey.py
+# The sort and cap are sent with the request, so unwanted comments are never transferred.
+COMMENT_FETCH = CommentFetchOptions.from_env(replace_more_limit=0)
+
+def fetch_comments(submission):
+    """Downloads a submission's comments (as COMMENT_FETCH selects) as a flat list of dicts."""
+    return [{
+        'comment_id': comment.id,
+        'comment_text': comment.body,
+        'comment_score': comment.score,
+        'comment_created_utc': pd.to_datetime(comment.created_utc, unit='s')
+    } for comment in iter_comments(submission, COMMENT_FETCH)]
 
-def scrape_reddit(subreddits, search_terms, limit_per_search_term=500):
+def build_post_row(result):
+    """Turns one scrape result (submission + its comments) into a post row."""
+    submission = result['submission']
+    # Store post details
+    return {
+        'platform': 'Reddit',
+        'subreddit': result['subreddit'].display_name,
+        'post_id': submission.id, # Unique ID for the post
+        'post_title': submission.title,
+        'post_text': submission.selftext, # The body of the text post
+        'score': submission.score, # Upvotes minus downvotes
+        'num_comments': submission.num_comments,
+        'url': submission.url,
+        'created_utc': pd.to_datetime(submission.created_utc, unit='s'), # Convert timestamp to datetime
+        'search_terms_used': result['search_terms'], # Which search terms found this post
+        'comments': result['comments']
+    }
+
+def iter_scrape_reddit(subreddits, search_terms, limit_per_search_term=500, max_workers=DEFAULT_MAX_WORKERS,
+                       client=None, checkpoint=None, on_new_term=None):
     """
-    Scrapes Reddit posts and their top comments based on subreddits and search terms.
+    Scrapes Reddit posts and their top comments, yielding each post row as soon as its
+    (subreddit, search term) unit has been fetched.
+
+    The (subreddit, search term) searches and the comment downloads run concurrently,
+    paced by one shared rate limiter instead of fixed sleeps.
 
     Args:
         subreddits (list): A list of subreddit names (e.g., ['Nootropics', 'supplements']).
         search_terms (list): A list of keywords to search for within each subreddit.
         limit_per_search_term (int): Maximum number of submissions to retrieve for each
                                       search term within each subreddit.
+        max_workers (int): Number of concurrent requests in flight.
+        client: Reddit client to use. Defaults to the module-level `reddit`.
+        checkpoint (ScrapeCheckpoint): Progress store. Each finished (subreddit, term) is
+                                       saved as it completes; rerunning after a crash skips
+                                       those units, and posts older than a unit's last
+                                       watermark or already stored are not fetched again.
+        on_new_term (callable): Called as on_new_term(post_id, term) when a later search
+                                term matches a post that was already yielded.
 
-    Returns:
-        pandas.DataFrame: A DataFrame containing the scraped data.
+    Yields:
+        dict: One post row, with its comments under 'comments'.
     """
-    data = []
-    print(f"Starting Reddit scraping for {len(subreddits)} subreddits and {len(search_terms)} search terms.")
-
-    for subreddit_name in subreddits:
-        try:
-            subreddit = reddit.subreddit(subreddit_name)
-            print(f"\n--- Scraping r/{subreddit_name} ---")
-
-            for term in search_terms:
-                print(f"  Searching for posts containing: '{term}' (limit: {limit_per_search_term} per search term)...")
-                # Using subreddit.search() allows you to target specific keywords.
-                # You can also use subreddit.hot(), subreddit.new(), subreddit.top() if preferred.
-                count = 0
-                for submission in subreddit.search(term, limit=limit_per_search_term):
-                    if submission.stickied: # Skip pinned posts often used for rules/announcements
-                        continue
-
-                    # Store post details
-                    post_info = {
-                        'platform': 'Reddit',
-                        'subreddit': subreddit.display_name,
-                        'post_id': submission.id, # Unique ID for the post
-                        'post_title': submission.title,
-                        'post_text': submission.selftext, # The body of the text post
-                        'score': submission.score, # Upvotes minus downvotes
-                        'num_comments': submission.num_comments,
-                        'url': submission.url,
-                        'created_utc': pd.to_datetime(submission.created_utc, unit='s'), # Convert timestamp to datetime
-                        'search_term_used': term, # Which search term found this post
-                        'comments': [] # Initialize an empty list to store comments
-                    }
-
-                    # Fetch comments for the submission
-                    # .replace_more(limit=0) is crucial to expand 'More comments' links
-                    # .list() flattens the comment tree into a list
-                    submission.comments.replace_more(limit=0)
-                    for comment in submission.comments.list():
-                        if isinstance(comment, praw.models.Comment): # Ensure it's a real comment object
-                            post_info['comments'].append({
-                                'comment_id': comment.id,
-                                'comment_text': comment.body,
-                                'comment_score': comment.score,
-                                'comment_created_utc': pd.to_datetime(comment.created_utc, unit='s')
-                            })
-                    data.append(post_info)
-                    count += 1
-                    # Small delay after processing each submission to be polite to the API
-                    time.sleep(0.5)
-
-                print(f"  Finished searching for '{term}'. Found {count} relevant submissions.")
-                # Add a slightly longer delay between different search terms within the same subreddit
-                time.sleep(2)
-
-        except praw.exceptions.PRAWException as pe:
-            print(f"  PRAW error while scraping r/{subreddit_name}: {pe}")
-            print("  This might be due to rate limits or invalid subreddit name.")
-        except Exception as e:
-            print(f"  An unexpected error occurred while scraping r/{subreddit_name}: {e}")
-
-        # Add a longer delay between subreddits to be extra cautious with rate limits
-        time.sleep(5)
+    print(f"Starting Reddit scraping for {len(subreddits)} subreddits and {len(search_terms)} search terms "
+          f"(limit: {limit_per_search_term} per search term, {max_workers} workers).")
 
+    # The engine keeps a per-run registry of submission IDs: a thread returned by several
+    # search terms has its comment tree downloaded once, and every matching term is
+    # recorded on its one row.
+    engine = ScrapeEngine(client if client is not None else reddit, max_workers=max_workers,
+                          comment_cost=COMMENT_FETCH.request_cost)
+    errors = []
+    for result in engine.iter_results(subreddits, search_terms, limit_per_search_term, fetch_comments,
+                                      checkpoint=checkpoint, build_row=build_post_row, errors=errors,
+                                      on_new_term=on_new_term):
+        yield build_post_row(result)
+
+    if errors:
+        print(f"\n{len(errors)} searches or comment fetches failed (see messages above).")
+        print("  This might be due to rate limits or invalid subreddit names.")
+    print(f"Made {engine.limiter.requests} API requests ({engine.limiter.retries} retried after a 429), "
+          f"waited {engine.limiter.total_sleep:.1f}s for the rate limit.")
     print("\n--- Reddit Scraping Complete ---")
-    return pd.DataFrame(data)
+
+def scrape_reddit(subreddits, search_terms, limit_per_search_term=500, max_workers=DEFAULT_MAX_WORKERS, client=None,
+                  checkpoint=None):
+    """
+    Same as iter_scrape_reddit(), but collects every post into one DataFrame.
+    Fine for small scrapes; use scrape_reddit_to_files() for large runs.
+
+    Returns:
+        pandas.DataFrame: A DataFrame containing the scraped data. With a checkpoint this
+                          is every post stored in the current run, including ones saved
+                          before a crash.
+    """
+    rows = iter_scrape_reddit(subreddits, search_terms, limit_per_search_term, max_workers, client, checkpoint)
+    if checkpoint is None:
+        return pd.DataFrame(list(rows))
+    for _ in rows: # Every row is stored in the checkpoint as its unit finishes
+        pass
+    data_df = pd.DataFrame(checkpoint.run_rows())
+    if not data_df.empty:
+        # Rows read back from the checkpoint store their timestamps as text
+        data_df['created_utc'] = pd.to_datetime(data_df['created_utc'])
+    return data_df
+
+def scrape_reddit_to_files(subreddits, search_terms, posts_path, comments_path, limit_per_search_term=500,
+                           max_workers=DEFAULT_MAX_WORKERS, client=None, checkpoint=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Scrapes Reddit and streams the posts and their flattened comments to two tables
+    while the run is in progress, so memory stays flat however large the scrape gets.
+    Parquet paths get one row group per chunk with native list and timestamp columns;
+    CSV paths are appended to chunk by chunk.
+
+    Both files are overwritten. With a checkpoint, posts saved in the current run before
+    a crash are written first, then the newly scraped ones.
+
+    Args:
+        posts_path (str): .parquet or .csv file for post rows (one row per post, without comments).
+        comments_path (str): .parquet or .csv file with one row per comment.
+        chunk_size (int): Rows buffered per file before they are appended to disk.
+        Other arguments as for iter_scrape_reddit().
+
+    Returns:
+        tuple: (number of posts written, number of comments written)
+    """
+    sink = ScrapeOutputSink(posts_path, comments_path, chunk_size=chunk_size)
+    if checkpoint is not None:
+        for row in checkpoint.iter_run_rows():
+            sink.write_post(row)
+    for row in iter_scrape_reddit(subreddits, search_terms, limit_per_search_term, max_workers, client, checkpoint,
+                                  on_new_term=sink.add_search_term):
+        sink.write_post(row)
+    sink.close()
+    return sink.posts.rows_written, sink.comments.rows_written
 
 # --- Define Your Scraping Parameters ---
 # Consider a wider range of subreddits that might discuss cognitive enhancement or related topics.
@@ -153,65 +224,44 @@ search_terms = [
     'semaglutide cognitive' # Newer peptides also being explored for CNS effects
 ]
 
+# Scraping progress is checkpointed here: rerun after a crash to resume, or on a
+# schedule to fetch only posts newer than the last run. Delete the file to start over.
+CHECKPOINT_PATH = 'scrape_checkpoint.sqlite'
+
 # --- Run the Scraper ---
+# Posts and comments are streamed to per-run files while scraping, then appended to the
+# cumulative tables (earlier runs' rows stay; the checkpoint keeps posts from being stored twice).
+# Tables are Parquet when pyarrow is installed, CSV otherwise.
+output_filename = table_path('reddit_peptides_cognitive_raw')
+comments_output_filename = table_path('reddit_peptides_cognitive_comments')
+run_output_filename = table_path('reddit_peptides_cognitive_raw.run')
+run_comments_output_filename = table_path('reddit_peptides_cognitive_comments.run')
+
 print("Initiating Reddit data collection...")
-reddit_data_df = scrape_reddit(subreddits_to_scrape, search_terms, limit_per_search_term=200) # Reduced limit for initial test
-
-# --- Display and Save Results ---
-if not reddit_data_df.empty:
-    print(f"\nSuccessfully scraped {len(reddit_data_df)} Reddit posts (with comments).")
-    print("First 5 rows of the DataFrame:")
-    print(reddit_data_df.head())
-
-    print("\nColumns in the DataFrame:")
-    print(reddit_data_df.columns)
-
-    # You can expand the 'comments' list column into separate rows if you want to analyze comments independently
-    # For now, it's stored as a list of dictionaries within each row.
-
-    # Save the raw data
-    output_filename = 'reddit_peptides_cognitive_raw.csv'
-    reddit_data_df.to_csv(output_filename, index=False)
-    print(f"\nRaw Reddit data saved to '{output_filename}'")
-
-    # If you want to expand comments into separate rows for easier analysis:
-    print("\nProcessing comments for separate analysis...")
-    all_comments = []
-    for index, row in reddit_data_df.iterrows():
-        post_id = row['post_id']
-        post_title = row['post_title']
-        subreddit = row['subreddit']
-        search_term_used = row['search_term_used']
-
-        if row['comments']:
-            for comment in row['comments']:
-                comment_data = {
-                    'platform': 'Reddit',
-                    'subreddit': subreddit,
-                    'post_id': post_id,
-                    'post_title': post_title,
-                    'comment_id': comment['comment_id'],
-                    'comment_text': comment['comment_text'],
-                    'comment_score': comment['comment_score'],
-                    'comment_created_utc': comment['comment_created_utc'],
-                    'search_term_used': search_term_used
-                }
-                all_comments.append(comment_data)
-        else:
-            # Include posts that have no comments, or handle them as a separate case if needed
-            pass # Or add a row with empty comment info if you want to explicitly track no-comment posts
-
-    if all_comments:
-        comments_df = pd.DataFrame(all_comments)
-        print(f"Extracted {len(comments_df)} individual comments.")
-        print("First 5 rows of the comments DataFrame:")
-        print(comments_df.head())
-        comments_output_filename = 'reddit_peptides_cognitive_comments.csv'
-        comments_df.to_csv(comments_output_filename, index=False)
+checkpoint = ScrapeCheckpoint(CHECKPOINT_PATH)
+post_count, comment_count = scrape_reddit_to_files(subreddits_to_scrape, search_terms,
+                                                   run_output_filename, run_comments_output_filename,
+                                                   limit_per_search_term=200, # Reduced limit for initial test
+                                                   checkpoint=checkpoint)
+
+# --- Save Results ---
+if post_count:
+    print(f"\nSuccessfully scraped {post_count} Reddit posts with {comment_count} comments.")
+    append_table(run_output_filename, output_filename)
+    print(f"Raw Reddit data saved to '{output_filename}'")
+    if comment_count:
+        append_table(run_comments_output_filename, comments_output_filename)
         print(f"Comments data saved to '{comments_output_filename}'")
     else:
         print("No comments were extracted based on the current scraping parameters.")
+else:
+    print("No new data was scraped from Reddit. Check your parameters and network connection.")
+for filename in (run_output_filename, run_comments_output_filename):
+    if os.path.exists(filename):
+        os.remove(filename)
 
+# Everything from this run is on disk, so the next run starts fresh from the new watermarks
+checkpoint.finish_run()
 
-else:
-    print("No data was scraped from Reddit. Check your parameters and network connection.")
+# Request counts, rate-limit waits, posts/comments per second and Reddit latencies for this run
+write_summary('scrape')
@@ -0,0 +1,59 @@
+# tests/test_checkpoints.py
+import json
+import sqlite3
+
+from netlify.functions.checkpoints import ScrapeCheckpoint
+
+
+def row_count(path, table):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_finish_run_keeps_ids_and_watermarks_but_drops_rows(tmp_path):
+    path = str(tmp_path / 'checkpoint.sqlite')
+    checkpoint = ScrapeCheckpoint(path)
+    checkpoint.record_unit('a', 'x', [{'post_id': 'p1', 'comments': ['long'] * 100}], newest_created_utc=50.0)
+    checkpoint.add_search_term('p1', 'y')
+    assert checkpoint.run_rows() == [{'post_id': 'p1', 'comments': ['long'] * 100, 'search_terms_used': ['y']}]
+
+    checkpoint.finish_run()
+
+    assert checkpoint.run_rows() == []
+    assert checkpoint.is_seen('p1')
+    assert checkpoint.watermark('a', 'x') == 50.0
+    assert not checkpoint.is_complete('a', 'x')
+    checkpoint.close()
+    assert row_count(path, 'posts') == 0
+
+
+def test_rows_survive_a_crash_within_the_run(tmp_path):
+    path = str(tmp_path / 'checkpoint.sqlite')
+    checkpoint = ScrapeCheckpoint(path)
+    checkpoint.record_unit('a', 'x', [{'post_id': 'p1'}, {'post_id': 'p2'}])
+    checkpoint.close()
+
+    reopened = ScrapeCheckpoint(path)
+    assert reopened.is_complete('a', 'x')
+    assert [row['post_id'] for row in reopened.run_rows()] == ['p1', 'p2']
+    reopened.close()
+
+
+def test_old_checkpoints_keep_ids_and_lose_old_rows(tmp_path):
+    # Layout written before seen_posts existed: rows of every run kept in 'posts'
+    path = str(tmp_path / 'checkpoint.sqlite')
+    with sqlite3.connect(path) as conn:
+        conn.executescript(
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE posts (post_id TEXT PRIMARY KEY, run_id INTEGER NOT NULL, row TEXT NOT NULL);"
+            "INSERT INTO meta VALUES ('current_run', '3');"
+        )
+        conn.executemany("INSERT INTO posts VALUES (?, ?, ?)",
+                         [('old1', 1, json.dumps({'post_id': 'old1'})), ('old2', 2, json.dumps({'post_id': 'old2'})),
+                          ('current', 3, json.dumps({'post_id': 'current'}))])
+
+    checkpoint = ScrapeCheckpoint(path)
+    assert all(checkpoint.is_seen(post_id) for post_id in ('old1', 'old2', 'current'))
+    assert [row['post_id'] for row in checkpoint.run_rows()] == ['current']
+    checkpoint.close()
+    assert row_count(path, 'posts') == 1
@@ -0,0 +1,53 @@
+# tests/test_comment_fetch.py
+from netlify.functions.comment_fetch import REPLACE_MORE_ALL_COST, CommentFetchOptions, iter_comments
+
+
+class StubComment:
+    def __init__(self, comment_id, depth=0):
+        self.id = comment_id
+        self.depth = depth
+
+
+class MoreComments:
+    """Named like PRAW's "load more comments" stub."""
+
+
+class StubForest:
+    def __init__(self, comments):
+        self.comments = comments
+        self.replace_more_calls = []
+
+    def replace_more(self, limit=32):
+        self.replace_more_calls.append(limit)
+        return []
+
+    def list(self):
+        return self.comments
+
+
+class StubSubmission:
+    def __init__(self, comments):
+        self.comments = StubForest(comments)
+
+
+def test_request_cost():
+    assert CommentFetchOptions().request_cost == 1
+    assert CommentFetchOptions(replace_more_limit=3).request_cost == 4
+    # "Expand everything" has no fixed cost, so it must not be budgeted as a single request
+    assert CommentFetchOptions(replace_more_limit=None).request_cost == 1 + REPLACE_MORE_ALL_COST
+
+
+def test_sort_and_limit_are_set_before_loading():
+    submission = StubSubmission([StubComment(f'c{i}') for i in range(10)])
+    kept = list(iter_comments(submission, CommentFetchOptions(sort='top', limit=3)))
+
+    assert submission.comment_sort == 'top' and submission.comment_limit == 3
+    assert submission.comments.replace_more_calls == [0]
+    assert [comment.id for comment in kept] == ['c0', 'c1', 'c2']
+
+
+def test_stubs_and_deep_replies_are_skipped():
+    submission = StubSubmission([StubComment('top'), MoreComments(), StubComment('reply', depth=1),
+                                 StubComment('deep', depth=2)])
+    kept = list(iter_comments(submission, CommentFetchOptions(depth=1)))
+    assert [comment.id for comment in kept] == ['top', 'reply']
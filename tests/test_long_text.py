@@ -0,0 +1,98 @@
+# tests/test_long_text.py
+# Long-text mode with a stub pipeline and no tokenizer (windows are counted in words).
+import re
+
+import pytest
+
+from netlify.functions import classifier
+from netlify.functions.classifier import (LONG_TEXT_WINDOWS, ROWS_CLASSIFIED, ClassificationCascade, LongTextOptions,
+                                          classify_long_texts, split_windows)
+
+
+class StubPipeline:
+    """Scores a text by the highest 'scoreX.Y' word in it (0.1 if there is none)."""
+
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts, candidate_labels, batch_size=None):
+        self.texts.extend(texts)
+        results = []
+        for text in texts:
+            score = max([float(value) for value in re.findall(r'score(\d\.\d)', text)], default=0.1)
+            results.append({'labels': [f'label {score}', 'other'], 'scores': [score, 1 - score]})
+        return results
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    pipeline = StubPipeline()
+    monkeypatch.setattr(classifier, 'get_classifier', lambda: pipeline)
+    monkeypatch.setattr(classifier, 'get_tokenizer', lambda: None)
+    return pipeline
+
+
+def body(length, **markers):
+    """`length` words w0, w1, ...; markers={'w50': 'score0.9'} replaces words."""
+    return ' '.join(markers.get(f'w{i}', f'w{i}') for i in range(length))
+
+
+# Title (1 word) + 40 body words per window; windows start 36 words apart
+OPTIONS = LongTextOptions(window_tokens=41, overlap_tokens=4, early_exit_threshold=0.7)
+
+
+def test_cascade_counts_long_rows_once(stub):
+    cascade = ClassificationCascade(long_text=LongTextOptions(window_tokens=41, overlap_tokens=4,
+                                                              early_exit_threshold=None))
+    model_rows = ROWS_CLASSIFIED.value(tier='model')
+    model_windows = LONG_TEXT_WINDOWS.value(tier='model')
+
+    results, tiers = cascade.classify_with_tiers(['a short text about peptides', body(100)], cache=False)
+
+    assert tiers == ['model', 'model'] and len(results) == 2
+    assert ROWS_CLASSIFIED.value(tier='model') - model_rows == 2
+    assert LONG_TEXT_WINDOWS.value(tier='model') - model_windows == 3
+
+
+def test_split_windows_boundaries_and_title():
+    windows = split_windows(body(100), 'Title', OPTIONS)
+
+    assert [(text.split()[1], text.split()[-1], count) for text, count in windows] == [
+        ('w0', 'w39', 41), ('w36', 'w75', 41), ('w72', 'w99', 29)]
+    assert all(text.startswith('Title ') for text, _ in windows)
+
+
+def test_split_windows_does_not_repeat_a_leading_title():
+    windows = split_windows('Title ' + body(10), 'Title', OPTIONS)
+    assert windows == [('Title ' + body(10), 11)]
+    assert split_windows(body(10), None, OPTIONS) == [(body(10), 10)]
+
+
+def test_options_cap_overlap_and_key_the_cache():
+    assert LongTextOptions(window_tokens=40, overlap_tokens=30).overlap_tokens == 20
+    assert LongTextOptions().cache_model_id != LongTextOptions(early_exit_threshold=None).cache_model_id
+
+
+def test_scoring_stops_at_the_first_confident_window(stub):
+    results, report = classify_long_texts([body(100, w50='score0.9')], ['Title'], OPTIONS, cache=False)
+
+    assert results == [('label 0.9', 0.9)]
+    assert len(stub.texts) == 2 # The third window is never scored
+    assert report == {'texts': 1, 'windows': 3, 'windows_scored': 2, 'tokens': 111, 'tokens_scored': 82,
+                      'early_exits': 1}
+
+
+def test_unconfident_windows_are_max_pooled(stub):
+    results, report = classify_long_texts([body(100, w10='score0.5', w90='score0.6')], ['Title'], OPTIONS,
+                                          cache=False)
+
+    assert results == [('label 0.6', 0.6)]
+    assert report['windows_scored'] == 3 and report['early_exits'] == 0
+
+
+def test_rounds_only_rescore_undecided_texts(stub):
+    texts = [body(100, w0='score0.8'), body(100), body(30)]
+    results, report = classify_long_texts(texts, options=OPTIONS, cache=False)
+
+    assert [score for _, score in results] == [0.8, 0.1, 0.1]
+    assert report['windows'] == 7 and report['windows_scored'] == 5 and report['early_exits'] == 1
@@ -0,0 +1,59 @@
+# tests/test_pipeline.py
+import ast
+import os
+
+import pytest
+
+import pipeline
+from pipeline import ROOT_DIR, STAGES
+
+FUNCTIONS_DIR = 'netlify/functions'
+
+
+def local_imports(path):
+    """Repo modules a source file imports (as repo-relative paths)."""
+    with open(os.path.join(ROOT_DIR, path)) as f:
+        tree = ast.parse(f.read())
+    found = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module:
+            names = [node.module]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            continue
+        for name in names:
+            module = name.split('.')[-1] if name.startswith('netlify.functions.') else name
+            for candidate in (f'{FUNCTIONS_DIR}/{module}.py', f'{module}.py'):
+                if os.path.exists(os.path.join(ROOT_DIR, candidate)):
+                    found.add(candidate)
+                    break
+    return found
+
+
+def import_closure(script):
+    seen = {script}
+    pending = [script]
+    while pending:
+        for module in local_imports(pending.pop()):
+            if module not in seen:
+                seen.add(module)
+                pending.append(module)
+    return seen
+
+
+@pytest.mark.parametrize('stage', STAGES, ids=[stage['name'] for stage in STAGES])
+def test_stage_code_lists_every_imported_module(stage):
+    # A module missing from 'code' could change the outputs without rerunning the stage
+    missing = import_closure(stage['script']) - set(stage['code'])
+    assert not missing, f"{stage['name']} stage imports {sorted(missing)} but does not hash them"
+
+
+def test_refresh_only_runs_when_asked_for(monkeypatch, capsys):
+    monkeypatch.setattr(pipeline, 'load_state', lambda: {})
+
+    pipeline.run_pipeline(dry_run=True)
+    assert '[refresh] skipped' in capsys.readouterr().out
+
+    pipeline.run_pipeline(dry_run=True, refresh=True)
+    assert '[refresh] would run' in capsys.readouterr().out
@@ -0,0 +1,170 @@
+# tests/test_rate_limit.py
+# Rate limiters driven by a FakeClock, so no test ever really sleeps.
+import pytest
+
+from netlify.functions.rate_limit import AdaptiveRateLimiter, FakeClock, RateLimiter, is_rate_limit_error
+
+
+class TooManyRequests(Exception):
+    """Named like prawcore's 429 exception."""
+
+
+class StubResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = StubResponse(status_code, headers)
+
+
+def make_limiter(cls=RateLimiter, **kwargs):
+    clock = FakeClock()
+    kwargs.setdefault('clock', clock)
+    kwargs.setdefault('sleep', clock.sleep)
+    return cls(**kwargs), clock
+
+
+def test_burst_goes_out_without_waiting():
+    limiter, clock = make_limiter(requests_per_minute=60, burst=5)
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.now == 0.0
+    assert limiter.requests == 5
+
+
+def test_sustained_rate_after_the_burst():
+    # Used to loop forever: rounding left 0.9999999999999998 tokens and a wait too
+    # small to move the clock
+    limiter, clock = make_limiter()
+    for _ in range(30):
+        limiter.acquire()
+    assert limiter.requests == 30
+    assert clock.now == pytest.approx(20 / 1.5) # 20 requests past the burst at 90/minute
+    assert limiter.total_sleep == pytest.approx(clock.now)
+
+
+def test_long_run_on_a_large_clock_value():
+    clock = FakeClock(start=1e6)
+    limiter = RateLimiter(requests_per_minute=90, burst=10, clock=clock, sleep=clock.sleep)
+    for _ in range(1000):
+        limiter.acquire()
+    assert clock.now - 1e6 == pytest.approx(990 / 1.5)
+
+
+def test_cost_larger_than_burst_is_paid_in_pieces():
+    limiter, clock = make_limiter(requests_per_minute=60, burst=10)
+    limiter.acquire(25)
+    assert limiter.requests == 25
+    assert clock.now == pytest.approx(15.0)
+
+
+def test_pause_holds_back_requests():
+    limiter, clock = make_limiter(requests_per_minute=60, burst=5)
+    limiter.pause(30)
+    limiter.acquire()
+    assert clock.now == pytest.approx(30.0)
+
+
+def test_update_paces_remaining_budget_until_reset():
+    limiter, clock = make_limiter(AdaptiveRateLimiter, wall_clock=lambda: 1000.0)
+    limiter.update({'remaining': 300, 'used': 300, 'reset_timestamp': 1100.0})
+    assert limiter.rate == pytest.approx(3.0)
+    assert limiter.remaining == 300 and limiter.used == 300
+
+
+def test_update_respects_min_and_max_rate():
+    limiter, _ = make_limiter(AdaptiveRateLimiter, wall_clock=lambda: 0.0,
+                              min_requests_per_minute=6, max_requests_per_minute=600)
+    limiter.update({'remaining': 10000, 'reset_timestamp': 10.0})
+    assert limiter.rate == pytest.approx(10.0)
+    limiter.update({'remaining': 1, 'reset_timestamp': 600.0})
+    assert limiter.rate == pytest.approx(0.1)
+
+
+def test_update_ignores_missing_values():
+    limiter, _ = make_limiter(AdaptiveRateLimiter)
+    rate = limiter.rate
+    limiter.update(None)
+    limiter.update({'used': 5})
+    assert limiter.rate == rate and limiter.used == 5
+
+
+def test_exhausted_quota_pauses_until_reset():
+    limiter, clock = make_limiter(AdaptiveRateLimiter, wall_clock=lambda: 1000.0)
+    limiter.update({'remaining': 0, 'used': 600, 'reset_timestamp': 1045.0})
+    limiter.acquire()
+    assert clock.now == pytest.approx(45.0)
+
+
+def test_backoff_doubles_with_jitter_and_caps():
+    limiter, _ = make_limiter(AdaptiveRateLimiter, backoff_base=1.0, backoff_max=10.0, jitter=lambda: 0.5)
+    assert [limiter.backoff(attempt) for attempt in range(5)] == [1.5, 3.0, 6.0, 12.0, 15.0]
+
+
+def test_backoff_prefers_retry_after():
+    limiter, clock = make_limiter(AdaptiveRateLimiter, jitter=lambda: 0.0)
+    assert limiter.backoff(3, retry_after=7.0) == 7.0
+    limiter.acquire()
+    assert clock.now == pytest.approx(7.0)
+
+
+def test_call_retries_after_429():
+    limiter, clock = make_limiter(AdaptiveRateLimiter, backoff_base=2.0, jitter=lambda: 0.0)
+    attempts = []
+
+    def flaky():
+        attempts.append(clock.now)
+        if len(attempts) < 3:
+            raise TooManyRequests()
+        return 'ok'
+
+    assert limiter.call(flaky) == 'ok'
+    assert limiter.retries == 2
+    assert attempts == pytest.approx([0.0, 2.0, 6.0])
+
+
+def test_call_uses_retry_after_header():
+    limiter, clock = make_limiter(AdaptiveRateLimiter, jitter=lambda: 0.0)
+    attempts = []
+
+    def flaky():
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise HTTPError(429, {'retry-after': '12'})
+        return 'ok'
+
+    assert limiter.call(flaky) == 'ok'
+    assert attempts == pytest.approx([0.0, 12.0])
+
+
+def test_call_gives_up_after_max_retries():
+    limiter, _ = make_limiter(AdaptiveRateLimiter, max_retries=2, jitter=lambda: 0.0)
+
+    def always_limited():
+        raise TooManyRequests()
+
+    with pytest.raises(TooManyRequests):
+        limiter.call(always_limited)
+    assert limiter.retries == 2
+
+
+def test_call_does_not_retry_other_errors():
+    limiter, _ = make_limiter(AdaptiveRateLimiter)
+
+    def broken():
+        raise HTTPError(500)
+
+    with pytest.raises(HTTPError):
+        limiter.call(broken)
+    assert limiter.retries == 0
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(TooManyRequests())
+    assert is_rate_limit_error(HTTPError(429))
+    assert not is_rate_limit_error(HTTPError(503))
+    assert not is_rate_limit_error(ValueError())
@@ -0,0 +1,171 @@
+# tests/test_scrape_engine.py
+# ScrapeEngine run offline against a stub Reddit client.
+import pytest
+
+from netlify.functions.checkpoints import ScrapeCheckpoint
+from netlify.functions.rate_limit import FakeClock, RateLimiter
+from netlify.functions.scrape_engine import ScrapeEngine
+
+
+class StubSubmission:
+    def __init__(self, post_id, created_utc, stickied=False):
+        self.id = post_id
+        self.created_utc = created_utc
+        self.stickied = stickied
+
+
+class StubSubreddit:
+    def __init__(self, reddit, name):
+        self.reddit = reddit
+        self.display_name = name
+
+    def search(self, term, limit=None, sort=None):
+        self.reddit.searches.append((self.display_name, term, sort))
+        listing = self.reddit.listings.get((self.display_name, term), [])
+        if sort == 'new':
+            listing = sorted(listing, key=lambda submission: submission.created_utc, reverse=True)
+        return iter(listing[:limit])
+
+
+class StubReddit:
+    """Just enough of praw.Reddit for the engine: subreddit(name).search(term, ...)."""
+
+    def __init__(self, listings):
+        self.listings = listings
+        self.searches = []
+
+    def subreddit(self, name):
+        return StubSubreddit(self, name)
+
+
+def make_engine(reddit, max_workers=4):
+    # Plenty of budget, so the fake clock never has to move
+    clock = FakeClock()
+    return ScrapeEngine(reddit, limiter=RateLimiter(6000, burst=1000, clock=clock, sleep=clock.sleep),
+                        max_workers=max_workers)
+
+
+def fetch_comments(submission):
+    return [f"{submission.id}-comment"]
+
+
+def build_row(entry):
+    return {'post_id': entry['submission'].id, 'search_terms_used': list(entry['search_terms'])}
+
+
+def test_results_come_back_in_unit_and_rank_order():
+    reddit = StubReddit({
+        ('a', 'x'): [StubSubmission('p1', 10), StubSubmission('p2', 20)],
+        ('a', 'y'): [StubSubmission('p3', 30)],
+        ('b', 'x'): [StubSubmission('p4', 40), StubSubmission('p5', 50)],
+    })
+    results, errors = make_engine(reddit).run(['a', 'b'], ['x', 'y'], 10, fetch_comments)
+
+    assert errors == []
+    assert [result['submission'].id for result in results] == ['p1', 'p2', 'p3', 'p4', 'p5']
+    assert results[0]['comments'] == ['p1-comment']
+
+
+def test_duplicate_submissions_are_fetched_once_with_every_term():
+    shared = StubSubmission('p1', 10)
+    reddit = StubReddit({
+        ('a', 'x'): [shared, StubSubmission('p2', 20)],
+        ('a', 'y'): [shared, StubSubmission('p3', 30)],
+    })
+    fetched = []
+
+    def counting_fetch(submission):
+        fetched.append(submission.id)
+        return []
+
+    results, _ = make_engine(reddit).run(['a'], ['x', 'y'], 10, counting_fetch)
+
+    assert sorted(fetched) == ['p1', 'p2', 'p3']
+    by_id = {result['submission'].id: result for result in results}
+    assert by_id['p1']['search_terms'] == ['x', 'y']
+    assert by_id['p3']['search_terms'] == ['y']
+
+
+def test_stickied_posts_are_skipped():
+    reddit = StubReddit({('a', 'x'): [StubSubmission('rules', 5, stickied=True), StubSubmission('p1', 10)]})
+    results, _ = make_engine(reddit).run(['a'], ['x'], 10, fetch_comments)
+    assert [result['submission'].id for result in results] == ['p1']
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_total_post_limit_caps_unique_submissions(max_workers):
+    reddit = StubReddit({
+        ('a', term): [StubSubmission(f'{term}{rank}', rank) for rank in range(5)] for term in 'xyz'
+    })
+    results, _ = make_engine(reddit, max_workers).run(['a'], ['x', 'y', 'z'], 10, fetch_comments,
+                                                     total_post_limit=7)
+    assert [result['submission'].id for result in results] == ['x0', 'x1', 'x2', 'x3', 'x4', 'y0', 'y1']
+
+
+def test_failed_comment_fetch_is_reported_and_skipped():
+    reddit = StubReddit({('a', 'x'): [StubSubmission('p1', 10), StubSubmission('bad', 20)]})
+
+    def flaky_fetch(submission):
+        if submission.id == 'bad':
+            raise RuntimeError("boom")
+        return []
+
+    results, errors = make_engine(reddit).run(['a'], ['x'], 10, flaky_fetch)
+
+    assert [result['submission'].id for result in results] == ['p1']
+    assert len(errors) == 1 and 'bad' in errors[0][0]
+
+
+def test_checkpoint_resumes_after_a_crash(tmp_path):
+    reddit = StubReddit({
+        ('a', 'x'): [StubSubmission('p1', 10), StubSubmission('p2', 20)],
+        ('a', 'y'): [StubSubmission('p2', 20), StubSubmission('p3', 30)],
+    })
+    checkpoint = ScrapeCheckpoint(str(tmp_path / 'checkpoint.sqlite'))
+
+    def crashing_fetch(submission):
+        if submission.id == 'p3':
+            raise RuntimeError("connection reset")
+        return []
+
+    # First attempt: unit (a, x) finishes, unit (a, y) fails part-way and is not recorded
+    _, errors = make_engine(reddit).run(['a'], ['x', 'y'], 10, crashing_fetch,
+                                        checkpoint=checkpoint, build_row=build_row)
+    assert len(errors) == 1
+    assert checkpoint.is_complete('a', 'x') and not checkpoint.is_complete('a', 'y')
+
+    # Resume: (a, x) is not searched again and p2, already stored, is not fetched again
+    reddit.searches.clear()
+    fetched = []
+
+    def recording_fetch(submission):
+        fetched.append(submission.id)
+        return []
+
+    results, errors = make_engine(reddit).run(['a'], ['x', 'y'], 10, recording_fetch,
+                                              checkpoint=checkpoint, build_row=build_row)
+    assert errors == []
+    assert [search[:2] for search in reddit.searches] == [('a', 'y')]
+    assert fetched == ['p3']
+    assert [result['submission'].id for result in results] == ['p3']
+
+    rows = {row['post_id']: row for row in checkpoint.run_rows()}
+    assert sorted(rows) == ['p1', 'p2', 'p3']
+    assert rows['p2']['search_terms_used'] == ['x', 'y']
+    checkpoint.close()
+
+
+def test_incremental_run_stops_at_the_watermark(tmp_path):
+    reddit = StubReddit({('a', 'x'): [StubSubmission('p1', 10), StubSubmission('p2', 20)]})
+    checkpoint = ScrapeCheckpoint(str(tmp_path / 'checkpoint.sqlite'))
+    make_engine(reddit).run(['a'], ['x'], 10, fetch_comments, checkpoint=checkpoint, build_row=build_row)
+    checkpoint.finish_run()
+
+    reddit.listings[('a', 'x')].append(StubSubmission('p3', 30))
+    results, _ = make_engine(reddit).run(['a'], ['x'], 10, fetch_comments, checkpoint=checkpoint,
+                                         build_row=build_row)
+
+    assert reddit.searches[-1] == ('a', 'x', 'new')
+    assert [result['submission'].id for result in results] == ['p3']
+    assert checkpoint.watermark('a', 'x') == 30
+    checkpoint.close()
@@ -0,0 +1,165 @@
+# tests/test_scrape_jobs.py
+# ScrapeJobManager with an injected scrape function, so no Reddit client is needed.
+import threading
+
+from netlify.functions.rate_limit import FakeClock
+from netlify.functions.scrape_jobs import DONE, FAILED, ScrapeJobManager, scrape_cache_key
+
+PARAMS = {'subreddits': ['Nootropics', 'Peptides'], 'search_terms': ['dihexa', 'selank'],
+          'limit_per_search_term': 10, 'total_post_limit': 50}
+
+
+def make_post(post_id, comment_count=1, body=''):
+    return {'post_id': post_id, 'post_title': f'Title {post_id}', 'subreddit': 'Nootropics', 'post_text': body,
+            'comments': [{'comment_id': f'{post_id}-c{i}', 'comment_text': 'text'} for i in range(comment_count)]}
+
+
+class FakeScrape:
+    """Yields the given posts; if `release` is set, waits for it after the first post."""
+
+    def __init__(self, posts, release=None, error=None):
+        self.posts = posts
+        self.release = release
+        self.error = error
+        self.calls = []
+
+    def __call__(self, errors, **params):
+        self.calls.append(params)
+        for index, post in enumerate(self.posts):
+            yield post
+            if index == 0 and self.release is not None:
+                self.release.wait(5)
+        if self.error is not None:
+            errors.append(self.error)
+
+
+def wait_for(job):
+    """Blocks until the job finishes, returning its final status summary."""
+    for event_type, payload in job.iter_events(heartbeat=0.05):
+        if event_type == 'status':
+            return payload
+
+
+def make_manager(scrape, clock=None, **kwargs):
+    return ScrapeJobManager(scrape=scrape, clock=clock if clock is not None else FakeClock(1000.0), **kwargs)
+
+
+def test_job_runs_to_completion():
+    manager = make_manager(FakeScrape([make_post('p1', 2), make_post('p2', 1)]))
+    job, reused = manager.submit(**PARAMS)
+
+    summary = wait_for(job)
+    assert not reused
+    assert summary['status'] == DONE and summary['post_count'] == 2 and summary['comment_count'] == 3
+    assert job.comments[0]['post_id'] == 'p1' and 'comments' not in job.posts[0]
+    assert manager.get(job.id) is job
+    assert manager.get('unknown') is None
+
+
+def test_scrape_errors_fail_the_job():
+    manager = make_manager(FakeScrape([make_post('p1')], error=('searching r/a', RuntimeError('boom'))))
+    job, _ = manager.submit(**PARAMS)
+    summary = wait_for(job)
+    assert summary['status'] == FAILED and 'boom' in summary['error']
+
+
+def test_results_since_returns_only_unseen_items():
+    manager = make_manager(FakeScrape([make_post('p1', 2), make_post('p2', 1), make_post('p3', 0)]))
+    job, _ = manager.submit(**PARAMS)
+    wait_for(job)
+
+    posts, comments = job.results_since(1, 2)
+    assert [post['post_id'] for post in posts] == ['p2', 'p3']
+    assert [comment['comment_id'] for comment in comments] == ['p2-c0']
+    assert job.results_since(3, 3) == ([], [])
+    assert len(job.results_since(-5, -5)[0]) == 3 # Negative cursors don't wrap around
+
+
+def test_identical_in_flight_requests_share_one_job():
+    release = threading.Event()
+    scrape = FakeScrape([make_post('p1'), make_post('p2')], release=release)
+    manager = make_manager(scrape)
+
+    first, first_reused = manager.submit(**PARAMS)
+    second, second_reused = manager.submit(**PARAMS)
+    release.set()
+    wait_for(first)
+
+    assert second is first and not first_reused and second_reused
+    assert manager.shared == 1 and len(scrape.calls) == 1
+    assert [post['post_id'] for post in second.posts] == ['p1', 'p2']
+
+
+def test_cache_key_ignores_order_case_and_duplicates():
+    reordered = dict(PARAMS, subreddits=[' peptides', 'NOOTROPICS', 'Peptides'], search_terms=['Selank', 'DIHEXA'])
+    assert scrape_cache_key(reordered) == scrape_cache_key(PARAMS)
+    assert scrape_cache_key(dict(PARAMS, total_post_limit=5)) != scrape_cache_key(PARAMS)
+
+    scrape = FakeScrape([make_post('p1')])
+    manager = make_manager(scrape)
+    job, _ = manager.submit(**PARAMS)
+    wait_for(job)
+    cached, reused = manager.submit(**reordered)
+    assert cached is job and reused and manager.cache_hits == 1 and len(scrape.calls) == 1
+
+
+def test_finished_jobs_expire_after_the_ttl():
+    clock = FakeClock(1000.0)
+    scrape = FakeScrape([make_post('p1')])
+    manager = make_manager(scrape, clock, cache_ttl=60)
+    job, _ = manager.submit(**PARAMS)
+    wait_for(job)
+
+    clock.sleep(59)
+    assert manager.submit(**PARAMS) == (job, True)
+    clock.sleep(2)
+    fresh, reused = manager.submit(**PARAMS)
+    wait_for(fresh)
+    assert fresh is not job and not reused and len(scrape.calls) == 2
+
+
+def test_failed_jobs_are_not_reused():
+    scrape = FakeScrape([], error=('searching r/a', RuntimeError('boom')))
+    manager = make_manager(scrape)
+    job, _ = manager.submit(**PARAMS)
+    wait_for(job)
+    retry, reused = manager.submit(**PARAMS)
+    wait_for(retry)
+    assert retry is not job and not reused
+
+
+def run_job(manager, **overrides):
+    job, _ = manager.submit(**dict(PARAMS, **overrides))
+    wait_for(job)
+    return job
+
+
+def test_least_recently_used_job_is_evicted_past_max_finished_jobs():
+    manager = make_manager(FakeScrape([make_post('p1')]), max_finished_jobs=2)
+    first = run_job(manager, total_post_limit=1)
+    second = run_job(manager, total_post_limit=2)
+    manager.get(first.id) # Now the second job is the least recently used
+    third = run_job(manager, total_post_limit=3)
+
+    assert manager.get(second.id) is None
+    assert manager.get(first.id) is first and manager.get(third.id) is third
+    # The evicted job's request starts a new scrape
+    assert manager.submit(**dict(PARAMS, total_post_limit=2))[1] is False
+
+
+def test_jobs_are_evicted_once_results_exceed_the_byte_budget():
+    manager = make_manager(FakeScrape([make_post('p1', body='x' * 1000)]), cache_max_bytes=2500)
+    first = run_job(manager, total_post_limit=1)
+    second = run_job(manager, total_post_limit=2)
+    assert first.size_bytes > 1000
+    assert manager.get(first.id) is first and manager.get(second.id) is second
+
+    third = run_job(manager, total_post_limit=3)
+    assert manager.get(first.id) is None
+    assert manager.get(second.id) is second and manager.get(third.id) is third
+
+
+def test_a_single_oversized_job_is_not_kept():
+    manager = make_manager(FakeScrape([make_post('p1', body='x' * 5000)]), cache_max_bytes=1000)
+    job = run_job(manager)
+    assert manager.get(job.id) is None
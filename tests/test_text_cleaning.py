@@ -0,0 +1,42 @@
+# tests/test_text_cleaning.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from netlify.functions.text_cleaning import clean_series, clean_text
+
+CASES = [
+    ('Tom &amp; Jerry &lt;3 &quot;quoted&quot; &#39;s', 'Tom & Jerry <3 "quoted" \'s'),
+    ('[link text](https://example.com) and ![alt](https://i.redd.it/x.png)', 'link text and alt'),
+    ('**bold** and *italics* and ***both***', 'bold and italics and both'),
+    ('__bold__, _italics_ and ~~struck~~', 'bold, italics and struck'),
+    ('run `pip install x` or ``a`b``', 'run pip install x or a`b'),
+    ('> quoted\n> > nested\n- item\n* item\n## Heading', 'quoted nested item item Heading'),
+    ('>!spoiler!< and ^(tiny)', 'spoiler and tiny'),
+    ('\\*not italics\\* and \\_not\\_ and \\# not a heading', '*not italics* and _not_ and # not a heading'),
+    ('non\xa0breaking and　ideographic  \t spaces\r\n', 'non breaking and ideographic spaces'),
+    # Lone or intraword markers are left as written
+    ('2*3*4 mg', '2*3*4 mg'),
+    ('dose 5 * 3 days', 'dose 5 * 3 days'),
+    ('snake_case__name__', 'snake_case__name__'),
+    ('price*2 and *note*', 'price*2 and note'),
+    ('a lone ` backtick, ~ tilde and _ underscore', 'a lone ` backtick, ~ tilde and _ underscore'),
+    ('', ''),
+]
+
+
+@pytest.mark.parametrize('text, expected', CASES, ids=[text[:20] for text, _ in CASES])
+def test_clean_text(text, expected):
+    assert clean_text(text) == expected
+
+
+@pytest.mark.parametrize('value', [None, np.nan, 5])
+def test_non_strings_become_empty(value):
+    assert clean_text(value) == ''
+
+
+def test_clean_series_matches_clean_text():
+    values = [text for text, _ in CASES] + [None, np.nan, 'plain']
+    cleaned = clean_series(pd.Series(values, dtype=object))
+    assert cleaned.tolist() == [clean_text(value) for value in values]
+    assert cleaned.dtype == object